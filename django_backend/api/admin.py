@@ -8,6 +8,7 @@ from .models import (
     AttendanceRecord, AttendanceDetail, LeaveRequest, StudentLeaveRequest,
     Certificate, Timetable, InternalMark, Announcement, Notification
 )
+from .attendance import set_attendance_status
 import logging
 
 # Set up logging
@@ -203,11 +204,11 @@ class AttendanceDetailAdmin(admin.ModelAdmin):
     list_per_page = 50
 
     def mark_present(self, request, queryset):
-        updated = queryset.update(status=True)
+        updated = set_attendance_status(queryset, True)
         self.message_user(request, f"Marked {updated} attendance records as Present.")
 
     def mark_absent(self, request, queryset):
-        updated = queryset.update(status=False)
+        updated = set_attendance_status(queryset, False)
         self.message_user(request, f"Marked {updated} attendance records as Absent.")
 
 @admin.register(LeaveRequest)
@@ -1,6 +1,34 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.core.signals import request_started
+
+
+def start_background_workers(**kwargs):
+    """On a serving process's first request, start in-process workers so they pick up jobs left by a restart."""
+    request_started.disconnect(dispatch_uid='api-start-background-workers')
+    from .attendance import start_attendance_worker
+    from .reports import start_report_worker
+    start_attendance_worker()
+    start_report_worker()
+
+
+def start_workers_on_first_request() -> None:
+    """Called from the WSGI/ASGI entrypoints only, so management commands and the test client never start workers.
+
+    Deferred to the first request rather than started here: a preloading server imports the
+    entrypoint before forking, and threads do not survive the fork.
+    """
+    request_started.connect(start_background_workers, dispatch_uid='api-start-background-workers')
 
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'api'
\ No newline at end of file
+    name = 'api'
+
+    def ready(self):
+        from . import signals  # noqa: F401  keeps AttendanceSummary in step with single-row edits
+        # Opt-in for workers that serve AI attendance; everything else loads models lazily.
+        # With FACE_SERVICE_SOCKET set the models live only in the face service process.
+        if getattr(settings, 'FACE_MODELS_WARMUP', False) and not getattr(settings, 'FACE_SERVICE_SOCKET', ''):
+            from .views.utils import warm_up_face_models
+            warm_up_face_models()
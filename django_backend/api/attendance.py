@@ -0,0 +1,327 @@
+import os
+import math
+import queue
+import threading
+import logging
+from collections import defaultdict
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+from .models import AttendanceRecord, AttendanceDetail, AttendanceJob, AttendanceSummary, Student, GenericNotification
+
+logger = logging.getLogger(__name__)
+
+# In-process job queue used when ATTENDANCE_JOB_WORKER is 'thread'
+_job_queue: 'queue.Queue[int]' = queue.Queue()
+_worker_thread: Optional[threading.Thread] = None
+_worker_lock = threading.Lock()
+
+
+def recognize_present_students(branch_id: int, semester_id: int, section_id: int, images: List[bytes]) -> Set[int]:
+    """IDs of the section's students recognized in class photos. Slow and read-only, so call it outside transactions."""
+    from .views.utils import extract_face_encodings, get_section_gallery
+    # Detect and encode faces from all photos in parallel, then match them in one pass
+    face_encodings = extract_face_encodings(images)
+    gallery = get_section_gallery(branch_id, semester_id, section_id)
+    return gallery.match(face_encodings, threshold=0.4)
+
+
+def mark_ai_attendance(record: AttendanceRecord, present_ids: Set[int]) -> Tuple[List[Tuple[str, str]], List[Tuple[str, str]]]:
+    """Write attendance details for the record's section from recognize_present_students() output."""
+    students = Student.objects.filter(
+        branch_id=record.branch_id, semester_id=record.semester_id, section_id=record.section_id
+    ).only('id', 'name', 'usn')
+    details = [AttendanceDetail(record=record, student=student, status=student.id in present_ids) for student in students]
+    return _write_attendance_details(details)
+
+
+def mark_manual_attendance(record: AttendanceRecord, entries: List[dict]) -> Tuple[List[Tuple[str, str]], List[Tuple[str, str]]]:
+    """Validate submitted {'student_id', 'status'} entries against the section and write them."""
+    students = Student.objects.filter(
+        branch_id=record.branch_id, semester_id=record.semester_id, section_id=record.section_id
+    ).only('id', 'name', 'usn')
+    student_map = {student.id: student for student in students}
+    # Entries for students outside the section are ignored; a repeated student keeps its last status
+    statuses = {}
+    for entry in entries:
+        student_id = entry.get('student_id')
+        if student_id in student_map:
+            statuses[student_id] = entry.get('status')
+    details = [
+        AttendanceDetail(record=record, student=student_map[student_id], status=status_val)
+        for student_id, status_val in statuses.items()
+    ]
+    return _write_attendance_details(details)
+
+
+def _write_attendance_details(details: List[AttendanceDetail]) -> Tuple[List[Tuple[str, str]], List[Tuple[str, str]]]:
+    """Insert a record's details in one statement, fold them into AttendanceSummary and split them into present/absent (name, usn) lists."""
+    with transaction.atomic():
+        AttendanceDetail.objects.bulk_create(details)
+        apply_summary_deltas({
+            (detail.student_id, detail.record.subject_id): (1 if detail.status else 0, 1) for detail in details
+        })
+    present_students = [(detail.student.name, detail.student.usn) for detail in details if detail.status]
+    absent_students = [(detail.student.name, detail.student.usn) for detail in details if not detail.status]
+    return present_students, absent_students
+
+
+def apply_summary_deltas(deltas: Dict[Tuple[int, int], Tuple[int, int]]) -> None:
+    """Add (present, total) deltas keyed by (student_id, subject_id) to AttendanceSummary.
+
+    Keys sharing a subject and delta are updated in one statement, so a
+    whole session costs an insert plus at most two updates.
+    """
+    deltas = {key: delta for key, delta in deltas.items() if delta != (0, 0)}
+    if not deltas:
+        return
+    groups: Dict[Tuple[int, int, int], List[int]] = defaultdict(list)
+    for (student_id, subject_id), (present, total) in deltas.items():
+        groups[(subject_id, present, total)].append(student_id)
+    with transaction.atomic():
+        # Only new sessions create rows; removals never resurrect a summary for a deleted student
+        AttendanceSummary.objects.bulk_create([
+            AttendanceSummary(student_id=student_id, subject_id=subject_id)
+            for (student_id, subject_id), (_, total) in deltas.items() if total > 0
+        ], ignore_conflicts=True)
+        now = timezone.now()
+        for (subject_id, present, total), student_ids in groups.items():
+            AttendanceSummary.objects.filter(subject_id=subject_id, student_id__in=student_ids).update(
+                present=F('present') + present, total=F('total') + total, updated_at=now
+            )
+
+
+def set_attendance_status(details, status_val: bool) -> int:
+    """Correct a queryset of AttendanceDetail to present/absent, keeping summaries in step. Returns rows updated."""
+    with transaction.atomic():
+        # Lock by primary key so admin querysets with joins or DISTINCT can still be corrected
+        rows = AttendanceDetail.objects.select_for_update(of=('self',)).filter(id__in=list(details.values_list('id', flat=True)))
+        changed = list(rows.exclude(status=status_val).values_list('student_id', 'record__subject_id', 'record__branch_id', 'record__faculty_id'))
+        updated = rows.update(status=status_val)
+        deltas: Dict[Tuple[int, int], Tuple[int, int]] = defaultdict(lambda: (0, 0))
+        for student_id, subject_id, _, _ in changed:
+            present, total = deltas[(student_id, subject_id)]
+            deltas[(student_id, subject_id)] = (present + (1 if status_val else -1), total)
+        apply_summary_deltas(deltas)
+        if changed:
+            from .dashboard import invalidate_dashboards
+            branch_ids = {row[2] for row in changed}
+            user_ids = {row[3] for row in changed}
+            transaction.on_commit(lambda: invalidate_dashboards(branch_ids=branch_ids, user_ids=user_ids))
+    return updated
+
+
+def attendance_percentage(present: int, total: int) -> float:
+    """``100 * present / total`` rounded half up to two decimals, computed exactly in integers."""
+    return (present * 20000 + total) // (total * 2) / 100 if total else 0
+
+
+def low_attendance_cutoff(threshold: float) -> int:
+    """Integer cutoff ``c`` such that ``present * 20000 < total * c`` exactly when
+    ``attendance_percentage(present, total) < threshold``.
+
+    The percentage is rounded half up (``floor(10000 * present / total + 1/2)`` hundredths),
+    not with Python's float ``round``; ``threshold`` is taken to the nearest 1e-6 of a hundredth.
+    """
+    return 2 * math.ceil(round(threshold * 100, 6) - 1) + 1
+
+
+def rebuild_attendance_summaries(students: Optional[Iterable[int]] = None) -> int:
+    """Recompute summaries from AttendanceDetail (all students, or the given IDs). Returns rows written."""
+    details = AttendanceDetail.objects.all()
+    summaries = AttendanceSummary.objects.all()
+    if students is not None:
+        students = list(students)
+        details = details.filter(student_id__in=students)
+        summaries = summaries.filter(student_id__in=students)
+    rows = details.values('student_id', 'record__subject_id').annotate(
+        present=Count('id', filter=Q(status=True)), total=Count('id')
+    ).order_by()
+    with transaction.atomic():
+        summaries.delete()
+        created = AttendanceSummary.objects.bulk_create([
+            AttendanceSummary(student_id=row['student_id'], subject_id=row['record__subject_id'], present=row['present'], total=row['total'])
+            for row in rows
+        ], batch_size=1000)
+    logger.info("Rebuilt %d attendance summaries", len(created))
+    return len(created)
+
+
+def publish_attendance(record: AttendanceRecord, present_students: List[Tuple[str, str]], absent_students: List[Tuple[str, str]]) -> None:
+    """Queue a recorded session for Google Sheets and notify students."""
+    from .sheets_outbox import enqueue_attendance_rows
+    enqueue_attendance_rows(record, list(present_students), list(absent_students), timezone.now().strftime('%Y-%m-%d %H:%M:%S'))
+    faculty_name = record.faculty.username if record.faculty else 'faculty'
+    GenericNotification.objects.create(
+        title="Attendance Recorded",
+        message=f"Attendance taken for {record.subject.name} ({record.section.name}) by {faculty_name}",
+        target_role='student',
+        created_by=record.faculty
+    )
+
+
+def create_attendance_job(record: AttendanceRecord, files) -> AttendanceJob:
+    """Store uploaded class photos and queue a recognition job for a pending record.
+
+    The photos are not transactional: if the caller's transaction rolls back,
+    it must remove them with delete_job_images().
+    """
+    image_paths = []
+    try:
+        for file in files:
+            image_paths.append(default_storage.save(os.path.join('attendance_jobs', str(record.id), os.path.basename(file.name)), file))
+        job = AttendanceJob.objects.create(record=record, image_paths=image_paths)
+    except Exception:
+        delete_job_images(AttendanceJob(image_paths=image_paths))
+        raise
+    logger.info("Queued attendance job %s for record %s with %d images", job.id, record.id, len(image_paths))
+    return job
+
+
+def enqueue_attendance_job(job_id: int) -> None:
+    """Hand a queued job to the in-process worker; 'command' mode leaves it for the management command."""
+    if getattr(settings, 'ATTENDANCE_JOB_WORKER', 'thread') != 'thread':
+        return
+    _ensure_worker_thread()
+    _job_queue.put(job_id)
+
+
+def start_attendance_worker() -> None:
+    """Start the in-process worker and have it sweep jobs left over from a previous run."""
+    if getattr(settings, 'ATTENDANCE_JOB_WORKER', 'thread') != 'thread':
+        return
+    _ensure_worker_thread()
+    _job_queue.put(_SWEEP)
+
+
+# Queue item asking the worker to recover stale jobs and run everything still queued
+_SWEEP = None
+
+
+def _ensure_worker_thread() -> None:
+    global _worker_thread
+    with _worker_lock:
+        if _worker_thread is None or not _worker_thread.is_alive():
+            _worker_thread = threading.Thread(target=_worker_loop, name='attendance-jobs', daemon=True)
+            _worker_thread.start()
+
+
+def _worker_loop() -> None:
+    from django.db import close_old_connections
+    while True:
+        try:
+            job_id = _job_queue.get(timeout=getattr(settings, 'ATTENDANCE_JOB_SWEEP_INTERVAL', 60))
+            from_queue = True
+        except queue.Empty:
+            job_id, from_queue = _SWEEP, False
+        close_old_connections()
+        try:
+            if job_id is _SWEEP:
+                recover_attendance_jobs()
+                run_pending_attendance_jobs()
+            else:
+                run_attendance_job(job_id)
+        except Exception as e:
+            logger.error("Attendance job worker crashed on job %s: %s", job_id, str(e))
+        finally:
+            close_old_connections()
+            if from_queue:
+                _job_queue.task_done()
+
+
+def recover_attendance_jobs() -> int:
+    """Requeue jobs left 'running' past ATTENDANCE_JOB_LEASE by a dead worker; fail them after ATTENDANCE_JOB_MAX_ATTEMPTS."""
+    now = timezone.now()
+    stale = AttendanceJob.objects.filter(
+        status='running', started_at__lt=now - timedelta(seconds=getattr(settings, 'ATTENDANCE_JOB_LEASE', 900))
+    )
+    max_attempts = getattr(settings, 'ATTENDANCE_JOB_MAX_ATTEMPTS', 3)
+    recovered = 0
+    for job in stale.filter(attempts__gte=max_attempts):
+        if AttendanceJob.objects.filter(id=job.id, status='running', started_at=job.started_at).update(
+            status='failed', error='Worker stopped before finishing the job', finished_at=now
+        ):
+            fail_attendance_record(job)
+            delete_job_images(job)
+            recovered += 1
+    recovered += stale.filter(attempts__lt=max_attempts).update(status='queued')
+    if recovered:
+        logger.warning("Recovered %d stale attendance jobs", recovered)
+    return recovered
+
+
+def fail_attendance_record(job: AttendanceJob) -> None:
+    """Resolve the pending record of a job that gave up, so pollers and record listings stop waiting on it."""
+    AttendanceRecord.objects.filter(id=job.record_id, status='pending').update(status='failed')
+
+
+def delete_job_images(job: AttendanceJob) -> None:
+    for path in job.image_paths:
+        try:
+            default_storage.delete(path)
+        except Exception as e:
+            logger.warning("Could not delete job image %s: %s", path, str(e))
+
+
+def claim_attendance_job(job_id: int) -> bool:
+    """Atomically move a queued job to running; False if another worker already took it."""
+    return AttendanceJob.objects.filter(id=job_id, status='queued').update(
+        status='running', started_at=timezone.now(), attempts=F('attempts') + 1
+    ) == 1
+
+
+def run_attendance_job(job_id: int) -> bool:
+    """Claim and process a single job. Returns True if this call processed it."""
+    if not claim_attendance_job(job_id):
+        return False
+    job = AttendanceJob.objects.select_related(
+        'record__branch', 'record__semester', 'record__section', 'record__subject', 'record__faculty'
+    ).get(id=job_id)
+    record = job.record
+    try:
+        images = []
+        for path in job.image_paths:
+            with default_storage.open(path, 'rb') as image:
+                images.append(image.read())
+        # Recognition takes seconds; only the writes below hold a transaction and the record lock
+        present_ids = recognize_present_students(record.branch_id, record.semester_id, record.section_id, images)
+        with transaction.atomic():
+            # A worker whose lease expired may still finish; only the first one to get here writes
+            if AttendanceRecord.objects.select_for_update().filter(pk=record.pk, status='pending').exists():
+                present_students, absent_students = mark_ai_attendance(record, present_ids)
+                record.status = 'completed'
+                record.save(update_fields=['status'])
+                publish_attendance(record, present_students, absent_students)
+                logger.info("Attendance job %s completed: %d present, %d absent", job.id, len(present_students), len(absent_students))
+            else:
+                logger.info("Attendance job %s: record %s was already written by an earlier attempt", job.id, record.id)
+        job.status = 'completed'
+    except Exception as e:
+        # Left queued, the job is retried by the next sweep until its attempts run out
+        retry = job.attempts < getattr(settings, 'ATTENDANCE_JOB_MAX_ATTEMPTS', 3)
+        logger.error("Attendance job %s failed (attempt %d%s): %s", job.id, job.attempts, ", will retry" if retry else "", str(e))
+        job.status = 'queued' if retry else 'failed'
+        job.error = str(e)
+    finally:
+        job.finished_at = None if job.status == 'queued' else timezone.now()
+        # If the job was reclaimed after our lease expired, the new owner finishes it and cleans up
+        if AttendanceJob.objects.filter(id=job.id, status='running', started_at=job.started_at).update(
+            status=job.status, error=job.error, finished_at=job.finished_at
+        ) and job.status != 'queued':
+            if job.status == 'failed':
+                fail_attendance_record(job)
+            delete_job_images(job)
+    return True
+
+
+def run_pending_attendance_jobs(limit: Optional[int] = None) -> int:
+    """Process queued jobs oldest first. Returns the number of jobs processed."""
+    processed = 0
+    for job_id in AttendanceJob.objects.filter(status='queued').values_list('id', flat=True)[:limit]:
+        if run_attendance_job(job_id):
+            processed += 1
+    return processed
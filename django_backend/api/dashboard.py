@@ -0,0 +1,225 @@
+import time
+import logging
+from datetime import date, timedelta
+from typing import Callable, Dict, Iterable, List, Tuple
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce, TruncDay, TruncMonth, TruncWeek
+from django.utils.timezone import now
+from .models import AttendanceDetail, AttendanceSummary, Branch, FacultyAssignment, LeaveRequest, StatsSnapshot, Student, User
+
+logger = logging.getLogger(__name__)
+
+# period -> (truncation, default buckets, max buckets)
+TREND_PERIODS = {
+    'day': (TruncDay, 7, 90),
+    'week': (TruncWeek, 4, 52),
+    'month': (TruncMonth, 6, 24),
+}
+
+
+def _bucket_starts(period: str, buckets: int, today: date) -> List[date]:
+    """Start dates of the last ``buckets`` calendar periods, oldest first, the current one last."""
+    if period == 'day':
+        return [today - timedelta(days=i) for i in range(buckets - 1, -1, -1)]
+    if period == 'week':
+        monday = today - timedelta(days=today.weekday())
+        return [monday - timedelta(weeks=i) for i in range(buckets - 1, -1, -1)]
+    starts = []
+    year, month = today.year, today.month
+    for _ in range(buckets):
+        starts.append(date(year, month, 1))
+        year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+    return starts[::-1]
+
+
+def _bucket_end(period: str, start: date) -> date:
+    if period == 'day':
+        return start
+    if period == 'week':
+        return start + timedelta(days=6)
+    next_month = date(start.year + start.month // 12, start.month % 12 + 1, 1)
+    return next_month - timedelta(days=1)
+
+
+def _percentage(present: int, total: int) -> float:
+    return round((present / total) * 100, 2) if total > 0 else 0
+
+
+def attendance_trend(branch_id: int, period: str = 'week', buckets: int = 4) -> List[Dict]:
+    """Attendance percentage per calendar day/week/month for a branch, from one grouped query."""
+    trunc, _, _ = TREND_PERIODS[period]
+    starts = _bucket_starts(period, buckets, now().date())
+    rows = AttendanceDetail.objects.filter(
+        record__branch_id=branch_id, record__date__gte=starts[0]
+    ).annotate(bucket=trunc('record__date')).values('bucket').annotate(
+        total=Count('id'), present=Count('id', filter=Q(status=True))
+    ).order_by('bucket')
+    counts: Dict[date, Tuple[int, int]] = {}
+    for row in rows:
+        counts[row['bucket']] = (row['present'], row['total'])
+
+    trend = []
+    for index, start in enumerate(starts, 1):
+        present, total = counts.get(start, (0, 0))
+        item = {
+            'label': start.strftime('%Y-%m-%d' if period == 'day' else '%b %Y' if period == 'month' else 'Week of %Y-%m-%d'),
+            'start_date': start.strftime('%Y-%m-%d'),
+            'end_date': _bucket_end(period, start).strftime('%Y-%m-%d'),
+            'attendance_percentage': _percentage(present, total),
+            'total_sessions': total,
+            'present_sessions': present
+        }
+        if period == 'week':
+            item['week'] = f"Week {index}"
+        trend.append(item)
+    return trend
+
+
+def dashboard_cache():
+    return caches[getattr(settings, 'DASHBOARD_CACHE_ALIAS', 'dashboard')]
+
+
+# Dashboard responses are cached under the current "generation" of every scope they
+# depend on ('branch:<id>', 'user:<id>', 'global'). Signals bump generations on writes,
+# which orphans the old entries; DASHBOARD_CACHE_TTL bounds anything not covered.
+DASHBOARD_NAMES = ('hod_dashboard', 'admin_stats', 'faculty_dashboard')
+
+
+def _generation_key(scope: str) -> str:
+    return f"dashboard:gen:{scope}"
+
+
+def _generations(scopes: List[str]) -> List[int]:
+    cache = dashboard_cache()
+    keys = [_generation_key(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            # Start from the clock so a generation lost to eviction never reuses an old number
+            cache.add(key, time.time_ns() // 1000, None)
+            found[key] = cache.get(key)
+    return [found[key] for key in keys]
+
+
+def invalidate_dashboards(branch_ids: Iterable[int] = (), user_ids: Iterable[int] = (), global_scope: bool = False) -> None:
+    """Bump the generation of each affected scope so cached dashboards built on it are ignored."""
+    cache = dashboard_cache()
+    scopes = [f"branch:{branch_id}" for branch_id in set(branch_ids) if branch_id]
+    scopes += [f"user:{user_id}" for user_id in set(user_ids) if user_id]
+    if global_scope:
+        scopes.append('global')
+    for scope in scopes:
+        try:
+            cache.incr(_generation_key(scope))
+        except ValueError:
+            cache.add(_generation_key(scope), time.time_ns() // 1000, None)
+
+
+def _count(name: str, outcome: str) -> None:
+    cache = dashboard_cache()
+    key = f"dashboard:stats:{name}:{outcome}"
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, None)
+        cache.incr(key)
+
+
+def cached_dashboard(name: str, scopes: List[str], key_parts: Iterable, compute: Callable[[], Dict]) -> Dict:
+    """Return ``compute()`` from the dashboard cache, keyed by name, scope generations and ``key_parts``."""
+    cache = dashboard_cache()
+    generations = ':'.join(str(generation) for generation in _generations(scopes))
+    cache_key = f"dashboard:{name}:{generations}:{':'.join(str(part) for part in key_parts)}"
+    data = cache.get(cache_key)
+    if data is not None:
+        _count(name, 'hits')
+        return data
+    _count(name, 'misses')
+    data = compute()
+    cache.set(cache_key, data, getattr(settings, 'DASHBOARD_CACHE_TTL', 60))
+    return data
+
+
+def dashboard_cache_stats() -> Dict[str, Dict]:
+    """Hit/miss counters per dashboard; shared across processes only with a shared (file) backend."""
+    cache = dashboard_cache()
+    counters = cache.get_many([f"dashboard:stats:{name}:{outcome}" for name in DASHBOARD_NAMES for outcome in ('hits', 'misses')])
+    stats = {}
+    for name in DASHBOARD_NAMES:
+        hits = counters.get(f"dashboard:stats:{name}:hits", 0)
+        misses = counters.get(f"dashboard:stats:{name}:misses", 0)
+        stats[name] = {'hits': hits, 'misses': misses, 'hit_rate': round(hits / (hits + misses), 4) if hits + misses else 0}
+    return stats
+
+
+def reset_dashboard_cache_stats() -> None:
+    dashboard_cache().delete_many([f"dashboard:stats:{name}:{outcome}" for name in DASHBOARD_NAMES for outcome in ('hits', 'misses')])
+
+
+def branch_dashboard_stats(branch, user, period: str = 'week', buckets: int = 4) -> Dict:
+    """HOD dashboard numbers for a branch in five queries, served from the dashboard cache."""
+    def compute() -> Dict:
+        overall = AttendanceSummary.objects.filter(subject__branch=branch).aggregate(present=Sum('present'), total=Sum('total'))
+        return {
+            'faculty_count': User.objects.filter(role='teacher', teaching_assignments__branch=branch).distinct().count(),
+            'student_count': Student.objects.filter(branch=branch).count(),
+            'pending_leaves': LeaveRequest.objects.filter(branch=branch, status='PENDING').count(),
+            'average_attendance': _percentage(overall['present'] or 0, overall['total'] or 0),
+            'attendance_trend': attendance_trend(branch.id, period, buckets)
+        }
+    # The trend's current bucket moves with the date, so the date is part of the key
+    return cached_dashboard('hod_dashboard', [f"branch:{branch.id}"], ['hod', branch.id, user.id, period, buckets, now().date()], compute)
+
+
+def _count_per_branch(queryset):
+    """Correlated COUNT(*) of ``queryset`` rows for the outer Branch."""
+    counts = queryset.filter(branch=OuterRef('pk')).order_by().values('branch').annotate(n=Count('pk')).values('n')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def system_stats() -> Dict:
+    """Admin overview totals in two queries: one GROUP BY role, one annotated branch list."""
+    roles = dict(User.objects.order_by().values_list('role').annotate(n=Count('id')))
+    branches = Branch.objects.annotate(
+        student_count=_count_per_branch(Student.objects.all()),
+        faculty_count=_count_per_branch(FacultyAssignment.objects.all())
+    ).order_by('id').values('name', 'student_count', 'faculty_count')
+    branch_distribution = [{'name': b['name'], 'students': b['student_count'], 'faculty': b['faculty_count']} for b in branches]
+    # Every student belongs to a branch, so the per-branch counts add up to the total
+    total_students = sum(b['students'] for b in branch_distribution)
+    return {
+        'total_students': total_students,
+        'total_faculty': roles.get('teacher', 0),
+        'total_hods': roles.get('hod', 0),
+        'total_branches': len(branch_distribution),
+        'branch_distribution': branch_distribution,
+        'role_distribution': {
+            'students': total_students,
+            'faculty': roles.get('teacher', 0),
+            'hods': roles.get('hod', 0),
+            'admins': roles.get('admin', 0)
+        }
+    }
+
+
+def take_stats_snapshot() -> StatsSnapshot:
+    """Record today's system_stats(); re-running on the same day overwrites that day's snapshot."""
+    snapshot, _ = StatsSnapshot.objects.update_or_create(date=now().date(), defaults={'data': system_stats()})
+    return snapshot
+
+
+def stats_history(days: int) -> List[Dict]:
+    """Daily snapshots from the last ``days`` days, oldest first, flattened for trend lines."""
+    snapshots = StatsSnapshot.objects.filter(date__gt=now().date() - timedelta(days=days)).order_by('date')
+    return [
+        {
+            'date': snapshot.date.strftime('%Y-%m-%d'),
+            'total_students': snapshot.data.get('total_students', 0),
+            'total_faculty': snapshot.data.get('total_faculty', 0),
+            'total_hods': snapshot.data.get('total_hods', 0),
+            'total_branches': snapshot.data.get('total_branches', 0),
+            'branch_distribution': snapshot.data.get('branch_distribution', [])
+        } for snapshot in snapshots
+    ]
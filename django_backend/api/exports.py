@@ -0,0 +1,196 @@
+import os
+import csv
+import time
+import uuid
+import threading
+import logging
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Tuple
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from googleapiclient.errors import HttpError
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; file writes are then serialized per process only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# (branch_name, subject_name, section_name, semester_number), the identity of one attendance archive
+ExportKey = Tuple[str, str, str, int]
+
+
+class ExportBackend:
+    """Destination for attendance archives: rows are appended per tab ('Present'/'Absent') per class."""
+
+    def write(self, key: ExportKey, rows_by_tab: Dict[str, List[List[str]]]) -> None:
+        raise NotImplementedError
+
+    def flush(self) -> None:
+        """Make every accepted write durable; called before outbox entries are marked sent."""
+
+    def discard(self) -> None:
+        """Drop accepted writes that a failed flush() left pending; the caller will send them again."""
+
+
+class GoogleSheetsExportBackend(ExportBackend):
+    """Appends to the class's Google Sheet; each write is one batchUpdate request."""
+
+    def __init__(self, sheets_service=None):
+        self.sheets_service = sheets_service
+
+    def write(self, key: ExportKey, rows_by_tab: Dict[str, List[List[str]]]) -> None:
+        from .views.utils import get_google_sheet_id, append_sheet_rows
+        sheet_id = get_google_sheet_id(*key)
+        if not sheet_id:
+            raise ValueError("Could not resolve sheet for %s_%s_%s_%s" % key)
+        try:
+            append_sheet_rows(sheet_id, rows_by_tab, self.sheets_service)
+        except HttpError as e:
+            if e.resp.status != 404:
+                raise
+            # The registered sheet was deleted; re-verify (which recreates it) and write once more
+            sheet_id = get_google_sheet_id(*key, force_verify=True)
+            if not sheet_id:
+                raise
+            append_sheet_rows(sheet_id, rows_by_tab, self.sheets_service)
+
+
+class LocalFileExportBackend(ExportBackend):
+    """Append-only local archive: one file (or Parquet part directory) per class and tab.
+
+    Rows are buffered in memory and written in bulk once ``buffer_rows`` is
+    reached or on flush(). CSV appends in place; Parquet adds one uniquely
+    named part file per flush since Parquet files cannot be reopened for
+    appending; XLSX appends to a workbook per class with a sheet per tab.
+    CSV and XLSX writes hold an fcntl lock on the target so several worker
+    processes can share the directory.
+    """
+
+    FORMATS = ('csv', 'xlsx', 'parquet')
+
+    def __init__(self, directory: str, file_format: str = 'csv', buffer_rows: int = 500):
+        if file_format not in self.FORMATS:
+            raise ImproperlyConfigured(f"Unsupported attendance export format {file_format!r}")
+        self.directory = directory
+        self.file_format = file_format
+        self.buffer_rows = buffer_rows
+        self._buffer: 'OrderedDict[Tuple[ExportKey, str], List[List[str]]]' = OrderedDict()
+        self._buffered = 0
+        self._lock = threading.Lock()
+
+    def write(self, key: ExportKey, rows_by_tab: Dict[str, List[List[str]]]) -> None:
+        with self._lock:
+            for tab, rows in rows_by_tab.items():
+                if rows:
+                    self._buffer.setdefault((key, tab), []).extend(rows)
+                    self._buffered += len(rows)
+            should_flush = self._buffered >= self.buffer_rows
+        if should_flush:
+            try:
+                self.flush()
+            except Exception as e:
+                # The rows stay buffered, so this write is accepted; the caller's flush() reports the failure
+                logger.warning("Attendance export flush to %s failed: %s", self.directory, str(e))
+
+    def flush(self) -> None:
+        """Write every buffered group; on failure the unwritten groups stay buffered and the error is raised."""
+        with self._lock:
+            if not self._buffer:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            writer = getattr(self, f'_write_{self.file_format}')
+            flushed = 0
+            for (key, tab), rows in list(self._buffer.items()):
+                writer(self._base_path(key), tab, rows)
+                del self._buffer[(key, tab)]
+                self._buffered -= len(rows)
+                flushed += 1
+        logger.info("Flushed %d attendance export buffers to %s", flushed, self.directory)
+
+    def discard(self) -> None:
+        with self._lock:
+            self._buffer, self._buffered = OrderedDict(), 0
+
+    def _base_path(self, key: ExportKey) -> str:
+        branch_name, subject_name, section_name, semester_number = key
+        name = f'attendance_{branch_name}_{semester_number}_{subject_name}_{section_name}'
+        return os.path.join(self.directory, ''.join(ch if ch.isalnum() or ch in '-_' else '_' for ch in name))
+
+    @contextmanager
+    def _file_lock(self, path: str) -> Iterator[None]:
+        """Hold an exclusive lock on ``path`` against other processes writing the same archive."""
+        if fcntl is None:
+            yield
+            return
+        with open(f'{path}.lock', 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def _write_csv(self, base_path: str, tab: str, rows: List[List[str]]) -> None:
+        path = f'{base_path}_{tab}.csv'
+        with self._file_lock(path), open(path, 'a', newline='', encoding='utf-8') as f:
+            csv.writer(f).writerows(rows)
+
+    def _write_xlsx(self, base_path: str, tab: str, rows: List[List[str]]) -> None:
+        from openpyxl import Workbook, load_workbook
+        path = f'{base_path}.xlsx'
+        # The whole workbook is rewritten, so the load and save must not interleave with another process
+        with self._file_lock(path):
+            if os.path.exists(path):
+                workbook = load_workbook(path)
+            else:
+                workbook = Workbook()
+                workbook.remove(workbook.active)
+            sheet = workbook[tab] if tab in workbook.sheetnames else workbook.create_sheet(tab)
+            for row in rows:
+                sheet.append(row)
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            workbook.save(tmp_path)
+            os.replace(tmp_path, path)
+
+    def _write_parquet(self, base_path: str, tab: str, rows: List[List[str]]) -> None:
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImproperlyConfigured("ATTENDANCE_EXPORT_FORMAT='parquet' requires pyarrow")
+        part_dir = f'{base_path}_{tab}'
+        os.makedirs(part_dir, exist_ok=True)
+        table = pa.table({
+            'timestamp': [row[0] if row else '' for row in rows],
+            'students': [list(row[1:]) for row in rows]
+        })
+        # Time-ordered, unique names; O_EXCL guarantees no other process claimed the same part
+        part_path = os.path.join(part_dir, f'part-{time.time_ns():020d}-{uuid.uuid4().hex[:8]}.parquet')
+        with os.fdopen(os.open(part_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644), 'wb') as f:
+            pq.write_table(table, f)
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_export_backend() -> ExportBackend:
+    """Return the configured export backend; 'auto' uses Google only when credentials are present."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            choice = getattr(settings, 'ATTENDANCE_EXPORT_BACKEND', 'auto')
+            if choice == 'auto':
+                from .views.utils import GOOGLE_CREDENTIALS_FILE
+                has_google = os.path.exists(GOOGLE_CREDENTIALS_FILE) or getattr(settings, 'GOOGLE_SHEETS_FAKE', False)
+                choice = 'google' if has_google else 'local'
+            if choice == 'google':
+                _backend = GoogleSheetsExportBackend()
+            elif choice == 'local':
+                _backend = LocalFileExportBackend(
+                    settings.ATTENDANCE_EXPORT_DIR,
+                    getattr(settings, 'ATTENDANCE_EXPORT_FORMAT', 'csv'),
+                    getattr(settings, 'ATTENDANCE_EXPORT_BUFFER_ROWS', 500)
+                )
+            else:
+                raise ImproperlyConfigured(f"Unknown ATTENDANCE_EXPORT_BACKEND {choice!r}")
+            logger.info("Using %s for attendance exports", type(_backend).__name__)
+        return _backend
@@ -0,0 +1,282 @@
+import os
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone as dt_timezone
+from typing import Dict, List, Optional, Set, Tuple
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max
+from .models import Student, FACE_ENCODING_DIM
+
+logger = logging.getLogger(__name__)
+
+
+def _sq_distances(queries: np.ndarray, vectors: np.ndarray, vector_sq_norms: np.ndarray) -> np.ndarray:
+    return np.einsum('ij,ij->i', queries, queries)[:, None] + vector_sq_norms[None, :] - 2.0 * (queries @ vectors.T)
+
+
+def _kmeans(data: np.ndarray, k: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centroids = data[rng.choice(len(data), k, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = _sq_distances(data, centroids, np.einsum('ij,ij->i', centroids, centroids)).argmin(axis=1)
+        for cluster in range(k):
+            members = data[assignments == cluster]
+            if len(members):
+                centroids[cluster] = members.mean(axis=0)
+    return centroids
+
+
+class BranchFaceIndex:
+    """Inverted-file (IVF) index over every enrolled encoding in a branch.
+
+    Encodings are clustered around coarse k-means centroids and stored
+    grouped by cluster, so a query only scans the ``nprobe`` closest lists
+    instead of the whole branch. Enrollment changes are applied by assigning
+    encodings to the existing centroids; the centroids are retrained only
+    once the index has grown well past the size it was trained on.
+    """
+
+    RETRAIN_GROWTH = 4
+
+    def __init__(self, centroids: np.ndarray, vectors: np.ndarray, owners: np.ndarray,
+                 lists: np.ndarray, trained_size: int, stamp: Tuple[int, float]):
+        self.centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+        self.centroid_sq_norms = np.einsum('ij,ij->i', self.centroids, self.centroids)
+        self.trained_size = trained_size
+        self.stamp = stamp
+        self._set_rows(vectors, owners, lists)
+
+    def _set_rows(self, vectors: np.ndarray, owners: np.ndarray, lists: np.ndarray) -> None:
+        order = np.argsort(lists, kind='stable')
+        self.vectors = np.ascontiguousarray(vectors[order], dtype=np.float32).reshape(-1, FACE_ENCODING_DIM)
+        self.owners = np.ascontiguousarray(owners[order], dtype=np.int64)
+        self.lists = np.ascontiguousarray(lists[order], dtype=np.intp)
+        self.sq_norms = np.einsum('ij,ij->i', self.vectors, self.vectors)
+        self.offsets = np.searchsorted(self.lists, np.arange(len(self.centroids) + 1))
+        owner_ids, counts = np.unique(self.owners, return_counts=True)
+        # Same rule as is_same_person: at least two close matches, or one if only one is enrolled
+        self.required_matches: Dict[int, int] = {int(sid): int(min(count, 2)) for sid, count in zip(owner_ids, counts)}
+
+    @classmethod
+    def train(cls, encodings: np.ndarray, owners: np.ndarray, stamp: Tuple[int, float] = (0, 0.0)) -> 'BranchFaceIndex':
+        """Cluster encodings into roughly sqrt(n) lists and build the index."""
+        encodings = np.asarray(encodings, dtype=np.float32).reshape(-1, FACE_ENCODING_DIM)
+        if not len(encodings):
+            return cls(np.zeros((1, FACE_ENCODING_DIM), dtype=np.float32), encodings,
+                       np.empty(0, dtype=np.int64), np.empty(0, dtype=np.intp), 0, stamp)
+        nlist = max(1, int(np.sqrt(len(encodings))))
+        centroids = _kmeans(encodings, nlist)
+        index = cls(centroids, encodings, np.asarray(owners), np.empty(0, dtype=np.intp), len(encodings), stamp)
+        index._set_rows(encodings, np.asarray(owners), index._assign(encodings))
+        return index
+
+    def __len__(self) -> int:
+        return len(self.vectors)
+
+    def _assign(self, encodings: np.ndarray) -> np.ndarray:
+        return _sq_distances(encodings, self.centroids, self.centroid_sq_norms).argmin(axis=1)
+
+    def update_student(self, student_id: int, encodings: np.ndarray) -> None:
+        """Replace a student's encodings; an empty array removes the student."""
+        keep = self.owners != student_id
+        encodings = np.asarray(encodings, dtype=np.float32).reshape(-1, FACE_ENCODING_DIM)
+        self._set_rows(
+            np.vstack([self.vectors[keep], encodings]),
+            np.concatenate([self.owners[keep], np.full(len(encodings), student_id, dtype=np.int64)]),
+            np.concatenate([self.lists[keep], self._assign(encodings)]),
+        )
+
+    def remove_students(self, student_ids) -> None:
+        keep = ~np.isin(self.owners, list(student_ids))
+        self._set_rows(self.vectors[keep], self.owners[keep], self.lists[keep])
+
+    def needs_retrain(self) -> bool:
+        return len(self) > self.RETRAIN_GROWTH * max(self.trained_size, 1)
+
+    def _candidates(self, query: np.ndarray, nprobe: int) -> np.ndarray:
+        centroid_dists = _sq_distances(query[None, :], self.centroids, self.centroid_sq_norms)[0]
+        probes = np.argsort(centroid_dists)[:nprobe]
+        return np.concatenate([np.arange(self.offsets[c], self.offsets[c + 1]) for c in probes])
+
+    def search(self, face_encodings: List[np.ndarray], k: int = 5, nprobe: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """k nearest enrolled encodings per face: (student ids, distances), padded with -1 / inf."""
+        nprobe = nprobe or getattr(settings, 'FACE_INDEX_NPROBE', 4)
+        faces = np.asarray(face_encodings, dtype=np.float32).reshape(-1, FACE_ENCODING_DIM)
+        ids = np.full((len(faces), k), -1, dtype=np.int64)
+        dists = np.full((len(faces), k), np.inf, dtype=np.float32)
+        for row, face in enumerate(faces):
+            candidates = self._candidates(face, nprobe)
+            if not len(candidates):
+                continue
+            sq = _sq_distances(face[None, :], self.vectors[candidates], self.sq_norms[candidates])[0]
+            top = np.argsort(sq)[:k]
+            ids[row, :len(top)] = self.owners[candidates[top]]
+            dists[row, :len(top)] = np.sqrt(np.maximum(sq[top], 0))
+        return ids, dists
+
+    def match(self, face_encodings: List[np.ndarray], threshold: float = 0.4, nprobe: Optional[int] = None) -> Set[int]:
+        """Return IDs of students matched by any face, with the same rule as FaceGallery.match."""
+        nprobe = nprobe or getattr(settings, 'FACE_INDEX_NPROBE', 4)
+        matched = set()
+        if not face_encodings or not len(self):
+            return matched
+        for face in np.asarray(face_encodings, dtype=np.float32).reshape(-1, FACE_ENCODING_DIM):
+            candidates = self._candidates(face, nprobe)
+            if not len(candidates):
+                continue
+            sq = _sq_distances(face[None, :], self.vectors[candidates], self.sq_norms[candidates])[0]
+            owner_ids, close_counts = np.unique(self.owners[candidates[sq < threshold * threshold]], return_counts=True)
+            matched.update(int(sid) for sid, count in zip(owner_ids, close_counts) if count >= self.required_matches[int(sid)])
+        return matched
+
+    def save(self, path: str) -> None:
+        """Write the index atomically as an uncompressed .npz (no pickled objects)."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, centroids=self.centroids, vectors=self.vectors, owners=self.owners, lists=self.lists,
+                     trained_size=np.int64(self.trained_size), stamp=np.array(self.stamp, dtype=np.float64))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'BranchFaceIndex':
+        with np.load(path, allow_pickle=False) as data:
+            stamp = (int(data['stamp'][0]), float(data['stamp'][1]))
+            return cls(data['centroids'], data['vectors'], data['owners'], data['lists'], int(data['trained_size']), stamp)
+
+
+# Process-wide cache of loaded branch indexes keyed by branch_id. Cached indexes are never
+# modified: refreshes work on a fresh copy from disk and swap it in when done.
+_index_cache: Dict[int, BranchFaceIndex] = {}
+_index_cache_lock = threading.Lock()
+_branch_locks: Dict[int, threading.Lock] = {}
+
+# Enrollment changes are folded in by one background thread, never on the request path
+_refresh_pool: Optional[ThreadPoolExecutor] = None
+_pending_refreshes: Set[int] = set()
+
+
+def branch_index_path(branch_id: int) -> str:
+    return os.path.join(settings.FACE_INDEX_DIR, f'branch_{branch_id}.npz')
+
+
+def _branch_stamp(students) -> Tuple[int, float]:
+    stamp = students.aggregate(count=Count('id'), last_modified=Max('last_modified'))
+    last_modified = stamp['last_modified'].timestamp() if stamp['last_modified'] else 0.0
+    return stamp['count'], last_modified
+
+
+def _enrolled_students(branch_id: int):
+    return Student.objects.filter(branch_id=branch_id, face_encodings__isnull=False)
+
+
+def build_branch_index(branch_id: int) -> BranchFaceIndex:
+    """Train a fresh index from every enrolled student in the branch and persist it."""
+    students = _enrolled_students(branch_id)
+    stamp = _branch_stamp(students)
+    blocks = []
+    owners = []
+    for student in students.only('id', 'face_encodings'):
+        encodings = student.get_face_encoding_matrix()
+        if len(encodings):
+            blocks.append(encodings)
+            owners.extend([student.id] * len(encodings))
+    encodings = np.vstack(blocks) if blocks else np.empty((0, FACE_ENCODING_DIM), dtype=np.float32)
+    index = BranchFaceIndex.train(encodings, np.asarray(owners, dtype=np.int64), stamp)
+    index.save(branch_index_path(branch_id))
+    logger.info("Built face index for branch %s: %d encodings in %d lists", branch_id, len(index), len(index.centroids))
+    return index
+
+
+def _refresh_branch_index(branch_id: int, index: BranchFaceIndex) -> BranchFaceIndex:
+    """Apply enrollment changes made since the index was last saved."""
+    students = _enrolled_students(branch_id)
+    stamp = _branch_stamp(students)
+    if stamp == index.stamp:
+        return index
+    since = datetime.fromtimestamp(index.stamp[1], tz=dt_timezone.utc)
+    changed = 0
+    for student in students.filter(last_modified__gte=since).only('id', 'face_encodings'):
+        index.update_student(student.id, student.get_face_encoding_matrix())
+        changed += 1
+    current_ids = set(students.values_list('id', flat=True))
+    removed = set(index.required_matches) - current_ids
+    if removed:
+        index.remove_students(removed)
+    if index.needs_retrain():
+        return build_branch_index(branch_id)
+    index.stamp = stamp
+    index.save(branch_index_path(branch_id))
+    logger.info("Refreshed face index for branch %s: %d updated, %d removed", branch_id, changed, len(removed))
+    return index
+
+
+def _branch_lock(branch_id: int) -> threading.Lock:
+    with _index_cache_lock:
+        return _branch_locks.setdefault(branch_id, threading.Lock())
+
+
+def refresh_branch_index(branch_id: int) -> BranchFaceIndex:
+    """Load the saved index, catch up on enrollments (or build it) and publish it to the cache. Slow."""
+    with _branch_lock(branch_id):
+        path = branch_index_path(branch_id)
+        index = BranchFaceIndex.load(path) if os.path.exists(path) else build_branch_index(branch_id)
+        index = _refresh_branch_index(branch_id, index)
+        with _index_cache_lock:
+            _index_cache[branch_id] = index
+        return index
+
+
+def get_branch_index(branch_id: int) -> Optional[BranchFaceIndex]:
+    """Return the branch index for queries without building anything on the calling thread.
+
+    A stale index is returned as is while a refresh runs in the background;
+    None means no index has been built yet (one is now being built).
+    """
+    with _index_cache_lock:
+        index = _index_cache.get(branch_id)
+    if index is None:
+        path = branch_index_path(branch_id)
+        if os.path.exists(path):
+            index = BranchFaceIndex.load(path)
+            with _index_cache_lock:
+                index = _index_cache.setdefault(branch_id, index)
+    if index is None or index.stamp != _branch_stamp(_enrolled_students(branch_id)):
+        schedule_branch_index_refresh(branch_id)
+    return index
+
+
+def schedule_branch_index_refresh(branch_id: int) -> None:
+    """Queue a background refresh; requests for a branch already waiting in the queue are merged."""
+    global _refresh_pool
+    with _index_cache_lock:
+        if branch_id in _pending_refreshes:
+            return
+        _pending_refreshes.add(branch_id)
+        if _refresh_pool is None:
+            _refresh_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='face-index')
+    _refresh_pool.submit(_refresh_in_background, branch_id)
+
+
+def _refresh_in_background(branch_id: int) -> None:
+    from django.db import close_old_connections
+    # Changes committed after this point queue another refresh
+    with _index_cache_lock:
+        _pending_refreshes.discard(branch_id)
+    close_old_connections()
+    try:
+        refresh_branch_index(branch_id)
+    except Exception as e:
+        logger.warning("Could not update face index for branch %s: %s", branch_id, str(e))
+    finally:
+        close_old_connections()
+
+
+def update_branch_index(branch_id: int) -> None:
+    """Enrollment hook: fold new encodings into the branch index, in the background, if indexing is enabled."""
+    if not getattr(settings, 'FACE_INDEX_ENABLED', False):
+        return
+    transaction.on_commit(lambda: schedule_branch_index_refresh(branch_id))
@@ -0,0 +1,134 @@
+import os
+import time
+import queue
+import hashlib
+import threading
+import logging
+from multiprocessing.connection import Client, Listener
+from typing import List, Optional
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _authkey() -> bytes:
+    """Shared secret for the socket; connections are pickled, so only trusted peers may connect."""
+    return hashlib.sha256(('face-service:' + settings.SECRET_KEY).encode()).digest()
+
+
+def request_face_encodings(images: List[bytes]) -> List[Optional[List[np.ndarray]]]:
+    """Send images to the face service and return per-image encodings, like utils.encode_faces_per_image."""
+    address = settings.FACE_SERVICE_SOCKET
+    try:
+        conn = Client(address, family='AF_UNIX', authkey=_authkey())
+    except (OSError, EOFError) as e:
+        raise ValueError(f"Face service unavailable at {address}: {e}")
+    try:
+        conn.send(('encode', images))
+        if not conn.poll(getattr(settings, 'FACE_SERVICE_TIMEOUT', 120)):
+            raise ValueError("Face service timed out")
+        outcome, payload = conn.recv()
+    except (OSError, EOFError) as e:
+        raise ValueError(f"Face service connection failed: {e}")
+    finally:
+        conn.close()
+    if outcome != 'ok':
+        raise ValueError(f"Face service error: {payload}")
+    return payload
+
+
+class _PendingRequest:
+    def __init__(self, images: List[bytes]):
+        self.images = images
+        self.response = None
+        self.done = threading.Event()
+
+
+class FaceEmbeddingServer:
+    """Owns the dlib models and serves encodings to Django workers over a Unix socket.
+
+    Requests arriving within the batch window are merged so detection fans out
+    across the shared thread pool and descriptors run in one batched call.
+    """
+
+    def __init__(self, address: str, batch_window: float = 0.02, max_batch_images: int = 32):
+        self.address = address
+        self.batch_window = batch_window
+        self.max_batch_images = max_batch_images
+        self._requests: 'queue.Queue[_PendingRequest]' = queue.Queue()
+
+    def serve_forever(self) -> None:
+        from .views.utils import warm_up_face_models
+        warm_up_face_models()
+        if os.path.exists(self.address):
+            os.remove(self.address)
+        os.makedirs(os.path.dirname(self.address) or '.', exist_ok=True)
+        listener = Listener(self.address, family='AF_UNIX', authkey=_authkey())
+        os.chmod(self.address, 0o660)
+        threading.Thread(target=self._batch_loop, name='face-service-batcher', daemon=True).start()
+        logger.info("Face service listening on %s", self.address)
+        try:
+            while True:
+                try:
+                    conn = listener.accept()
+                except Exception as e:
+                    logger.warning("Rejected face service connection: %s", str(e))
+                    continue
+                threading.Thread(target=self._handle_connection, args=(conn,), daemon=True).start()
+        finally:
+            listener.close()
+
+    def _handle_connection(self, conn) -> None:
+        try:
+            while True:
+                try:
+                    op, payload = conn.recv()
+                except EOFError:
+                    break
+                if op != 'encode':
+                    conn.send(('error', f"Unknown operation {op!r}"))
+                    continue
+                pending = _PendingRequest(payload)
+                self._requests.put(pending)
+                pending.done.wait()
+                conn.send(pending.response)
+        except Exception as e:
+            logger.error("Face service connection error: %s", str(e))
+        finally:
+            conn.close()
+
+    def _next_batch(self) -> List[_PendingRequest]:
+        batch = [self._requests.get()]
+        size = len(batch[0].images)
+        deadline = time.monotonic() + self.batch_window
+        while size < self.max_batch_images:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                pending = self._requests.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(pending)
+            size += len(pending.images)
+        return batch
+
+    def _batch_loop(self) -> None:
+        from .views.utils import _encode_faces_locally
+        while True:
+            batch = self._next_batch()
+            images = [image for pending in batch for image in pending.images]
+            try:
+                results = _encode_faces_locally(images)
+                offset = 0
+                for pending in batch:
+                    pending.response = ('ok', results[offset:offset + len(pending.images)])
+                    offset += len(pending.images)
+                logger.info("Face service encoded %d images for %d requests", len(images), len(batch))
+            except Exception as e:
+                logger.error("Face service batch failed: %s", str(e))
+                for pending in batch:
+                    pending.response = ('error', str(e))
+            for pending in batch:
+                pending.done.set()
@@ -0,0 +1,117 @@
+import uuid
+import threading
+from typing import Dict, List
+import httplib2
+from googleapiclient.errors import HttpError
+
+
+class _Call:
+    """Mimics a googleapiclient request: nothing happens until execute()."""
+
+    def __init__(self, func, *args, **kwargs):
+        self._func = func
+        self._args = args
+        self._kwargs = kwargs
+
+    def execute(self):
+        return self._func(*self._args, **self._kwargs)
+
+
+class FakeSheetsService:
+    """In-memory stand-in for the Sheets v4 client, for local development and tests.
+
+    Set GOOGLE_SHEETS_FAKE=True to have get_google_services() return it.
+    Every HTTP round trip is counted in ``calls`` so batching can be checked.
+    """
+
+    def __init__(self):
+        self.spreadsheets_data: Dict[str, Dict] = {}
+        self.calls: List[str] = []
+        self._lock = threading.Lock()
+
+    def spreadsheets(self):
+        return _Spreadsheets(self)
+
+    def _record(self, name: str) -> None:
+        with self._lock:
+            self.calls.append(name)
+
+    def _sheet(self, spreadsheet_id: str) -> Dict:
+        if spreadsheet_id not in self.spreadsheets_data:
+            raise HttpError(httplib2.Response({'status': 404}), b'Requested entity was not found.')
+        return self.spreadsheets_data[spreadsheet_id]
+
+    def rows(self, spreadsheet_id: str, tab: str) -> List[List[str]]:
+        return self._sheet(spreadsheet_id)['tabs'][tab]
+
+
+class _Spreadsheets:
+    def __init__(self, service: FakeSheetsService):
+        self._service = service
+
+    def get(self, spreadsheetId, **kwargs):
+        return _Call(self._get, spreadsheetId)
+
+    def _get(self, spreadsheet_id):
+        self._service._record('get')
+        return self._get_unrecorded(spreadsheet_id)
+
+    def create(self, body):
+        return _Call(self._create, body)
+
+    def _create(self, body):
+        self._service._record('create')
+        spreadsheet_id = uuid.uuid4().hex
+        tabs = [sheet['properties']['title'] for sheet in body.get('sheets', [])] or ['Sheet1']
+        self._service.spreadsheets_data[spreadsheet_id] = {
+            'properties': body.get('properties', {}),
+            'tabs': {title: [] for title in tabs}
+        }
+        return self._get_unrecorded(spreadsheet_id)
+
+    def _get_unrecorded(self, spreadsheet_id):
+        sheet = self._service._sheet(spreadsheet_id)
+        return {
+            'spreadsheetId': spreadsheet_id,
+            'properties': sheet['properties'],
+            'sheets': [{'properties': {'sheetId': index, 'title': title}} for index, title in enumerate(sheet['tabs'])]
+        }
+
+    def batchUpdate(self, spreadsheetId, body):
+        return _Call(self._batch_update, spreadsheetId, body)
+
+    def _batch_update(self, spreadsheet_id, body):
+        self._service._record('batchUpdate')
+        tabs = self._service._sheet(spreadsheet_id)['tabs']
+        titles = list(tabs)
+        for request in body['requests']:
+            append = request['appendCells']
+            tabs[titles[append['sheetId']]].extend(
+                [cell['userEnteredValue']['stringValue'] for cell in row['values']] for row in append['rows']
+            )
+        return {'spreadsheetId': spreadsheet_id, 'replies': [{} for _ in body['requests']]}
+
+    def values(self):
+        return _Values(self._service)
+
+
+class _Values:
+    def __init__(self, service: FakeSheetsService):
+        self._service = service
+
+    def append(self, spreadsheetId, range, body, **kwargs):
+        return _Call(self._append, spreadsheetId, range, body)
+
+    def _append(self, spreadsheet_id, range_name, body):
+        self._service._record('values.append')
+        tab = range_name.split('!')[0]
+        self._service._sheet(spreadsheet_id)['tabs'][tab].extend(body['values'])
+        return {'spreadsheetId': spreadsheet_id, 'updates': {'updatedRows': len(body['values'])}}
+
+
+class FakeDriveService:
+    def permissions(self):
+        return self
+
+    def create(self, fileId, body):
+        return _Call(lambda: {'id': uuid.uuid4().hex})
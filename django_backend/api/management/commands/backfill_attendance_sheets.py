@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from dateutil.parser import parse
+from api.models import AttendanceRecord
+from api.sheets_outbox import backfill_attendance_sheets
+
+
+class Command(BaseCommand):
+    help = "Re-sync stored attendance sessions into the export backend, a chunk of sessions per request."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--branch', type=int, help='Branch ID to limit the backfill to.')
+        parser.add_argument('--semester', type=int, help='Semester ID to limit the backfill to.')
+        parser.add_argument('--section', type=int, help='Section ID to limit the backfill to.')
+        parser.add_argument('--subject', type=int, help='Subject ID to limit the backfill to.')
+        parser.add_argument('--since', help='Only sessions on or after this date (YYYY-MM-DD).')
+        parser.add_argument('--include-sent', action='store_true', help='Also resend sessions the outbox already delivered.')
+        parser.add_argument('--chunk', type=int, default=200, help='Sessions per Sheets request.')
+
+    def handle(self, *args, **options):
+        records = AttendanceRecord.objects.all()
+        for field in ('branch', 'semester', 'section', 'subject'):
+            if options[field]:
+                records = records.filter(**{f'{field}_id': options[field]})
+        if options['since']:
+            records = records.filter(date__gte=parse(options['since']).date())
+        sent = backfill_attendance_sheets(records, include_sent=options['include_sent'], sessions_per_call=options['chunk'])
+        self.stdout.write(f"Backfilled {sent} session(s)")
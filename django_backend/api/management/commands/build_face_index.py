@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from api.models import Branch
+from api.face_index import build_branch_index
+
+
+class Command(BaseCommand):
+    help = "Train and persist the branch-wide face index (all branches unless --branch is given)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--branch', type=int, action='append', help='Branch ID to rebuild; may be repeated.')
+
+    def handle(self, *args, **options):
+        branch_ids = options['branch'] or list(Branch.objects.values_list('id', flat=True))
+        for branch_id in branch_ids:
+            index = build_branch_index(branch_id)
+            self.stdout.write(f"Branch {branch_id}: indexed {len(index)} encodings")
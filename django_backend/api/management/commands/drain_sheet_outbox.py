@@ -0,0 +1,21 @@
+import time
+from django.core.management.base import BaseCommand
+from api.sheets_outbox import drain_sheet_outbox
+
+
+class Command(BaseCommand):
+    help = "Send pending attendance export writes from the outbox (use with SHEETS_OUTBOX_WORKER='command')."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain the current outbox and exit.')
+        parser.add_argument('--interval', type=float, default=10.0, help='Seconds to sleep when nothing is due.')
+
+    def handle(self, *args, **options):
+        while True:
+            sent = drain_sheet_outbox()
+            if sent:
+                self.stdout.write(f"Sent {sent} sheet write(s)")
+            if options['once']:
+                break
+            if not sent:
+                time.sleep(options['interval'])
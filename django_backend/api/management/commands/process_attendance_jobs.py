@@ -0,0 +1,22 @@
+import time
+from django.core.management.base import BaseCommand
+from api.attendance import recover_attendance_jobs, run_pending_attendance_jobs
+
+
+class Command(BaseCommand):
+    help = "Process queued AI attendance jobs (use with ATTENDANCE_JOB_WORKER='command')."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Process the current queue and exit.')
+        parser.add_argument('--interval', type=float, default=2.0, help='Seconds to sleep when the queue is empty.')
+
+    def handle(self, *args, **options):
+        while True:
+            recover_attendance_jobs()
+            processed = run_pending_attendance_jobs()
+            if processed:
+                self.stdout.write(f"Processed {processed} attendance job(s)")
+            if options['once']:
+                break
+            if not processed:
+                time.sleep(options['interval'])
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from api.attendance import rebuild_attendance_summaries
+
+
+class Command(BaseCommand):
+    help = "Recompute per-student, per-subject attendance summaries from AttendanceDetail (all students unless --student is given)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--student', type=int, action='append', help='Student ID to rebuild; may be repeated.')
+
+    def handle(self, *args, **options):
+        written = rebuild_attendance_summaries(options['student'])
+        self.stdout.write(f"Rebuilt {written} attendance summaries")
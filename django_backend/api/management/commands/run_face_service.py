@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from api.face_service import FaceEmbeddingServer
+
+
+class Command(BaseCommand):
+    help = "Run the shared face-embedding service that Django workers reach via FACE_SERVICE_SOCKET."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--socket', default=None, help='Unix socket path (defaults to FACE_SERVICE_SOCKET).')
+
+    def handle(self, *args, **options):
+        address = options['socket'] or settings.FACE_SERVICE_SOCKET
+        if not address:
+            raise CommandError('Set FACE_SERVICE_SOCKET or pass --socket')
+        server = FaceEmbeddingServer(
+            address,
+            batch_window=settings.FACE_SERVICE_BATCH_WINDOW_MS / 1000,
+            max_batch_images=settings.FACE_SERVICE_MAX_BATCH_IMAGES,
+        )
+        self.stdout.write(f"Face service listening on {address}")
+        server.serve_forever()
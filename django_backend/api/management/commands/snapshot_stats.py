@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from api.dashboard import take_stats_snapshot
+
+
+class Command(BaseCommand):
+    help = "Record today's admin overview totals for stats_overview?history=<days>; schedule daily (e.g. cron)."
+
+    def handle(self, *args, **options):
+        snapshot = take_stats_snapshot()
+        self.stdout.write(f"Recorded stats snapshot for {snapshot.date}")
@@ -0,0 +1,64 @@
+import json
+import struct
+
+from django.db import migrations, models
+
+# Frozen copy of the v1 binary layout from api.models so this migration never changes underneath us
+HEADER = struct.Struct('<2sBBHH')
+MAGIC = b'FE'
+VERSION = 1
+FLOAT32 = 1
+DIM = 128
+
+
+def _decode_json(value):
+    # Old rows hold a json.dumps() string inside the JSONField, so values may be double-encoded
+    if isinstance(value, str):
+        value = json.loads(value)
+    return value or []
+
+
+def json_to_binary(apps, schema_editor):
+    Student = apps.get_model('api', 'Student')
+    for student in Student.objects.exclude(face_encodings__isnull=True).only('id', 'face_encodings').iterator():
+        encodings = [enc for enc in _decode_json(student.face_encodings) if len(enc) == DIM]
+        if not encodings:
+            continue
+        payload = b''.join(struct.pack(f'<{DIM}f', *enc) for enc in encodings)
+        blob = HEADER.pack(MAGIC, VERSION, FLOAT32, len(encodings), DIM) + payload
+        Student.objects.filter(pk=student.pk).update(face_encodings_blob=blob)
+
+
+def binary_to_json(apps, schema_editor):
+    Student = apps.get_model('api', 'Student')
+    for student in Student.objects.exclude(face_encodings_blob__isnull=True).only('id', 'face_encodings_blob').iterator():
+        data = bytes(student.face_encodings_blob)
+        _, _, _, count, dim = HEADER.unpack_from(data)
+        values = struct.unpack_from(f'<{count * dim}f', data, HEADER.size)
+        encodings = [list(values[i * dim:(i + 1) * dim]) for i in range(count)]
+        Student.objects.filter(pk=student.pk).update(face_encodings=json.dumps(encodings))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='student',
+            name='face_encodings_blob',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.RunPython(json_to_binary, binary_to_json),
+        migrations.RemoveField(
+            model_name='student',
+            name='face_encodings',
+        ),
+        migrations.RenameField(
+            model_name='student',
+            old_name='face_encodings_blob',
+            new_name='face_encodings',
+        ),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_attendancesheet'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendancesheet',
+            name='tab_ids',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
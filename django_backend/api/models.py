@@ -5,7 +5,7 @@ from django.core.exceptions import ValidationError
 from django.core.validators import FileExtensionValidator, MinValueValidator, MaxValueValidator
 import numpy as np
 import os
-import json
+import struct
 
 
 def validate_image_size(value):
@@ -22,6 +22,41 @@ def validate_file_size(value):
         raise ValidationError(f"File size must not exceed 10MB. Current size: {value.size / 1024 / 1024:.2f}MB")
 
 
+# Binary face-encoding format: 8-byte header (magic, version, dtype code, count, dim) + packed floats
+FACE_ENCODING_MAGIC = b'FE'
+FACE_ENCODING_VERSION = 1
+FACE_ENCODING_HEADER = struct.Struct('<2sBBHH')
+FACE_ENCODING_DIM = 128
+FACE_ENCODING_DTYPES = {1: np.dtype('<f4'), 2: np.dtype('<f2')}
+
+
+def pack_face_encodings(encodings, dtype=np.float32):
+    """Pack a list of 128-d encodings into the versioned binary format."""
+    dtype = np.dtype(dtype).newbyteorder('<')
+    codes = {v: k for k, v in FACE_ENCODING_DTYPES.items()}
+    if dtype not in codes:
+        raise ValidationError(f"Unsupported face encoding dtype: {dtype}")
+    matrix = np.asarray(encodings, dtype=dtype).reshape(-1, FACE_ENCODING_DIM)
+    header = FACE_ENCODING_HEADER.pack(FACE_ENCODING_MAGIC, FACE_ENCODING_VERSION, codes[dtype], matrix.shape[0], FACE_ENCODING_DIM)
+    return header + matrix.tobytes()
+
+
+def unpack_face_encodings(data):
+    """Return a zero-copy (count, 128) view over packed face encodings."""
+    if not data:
+        return np.empty((0, FACE_ENCODING_DIM), dtype=np.float32)
+    buffer = memoryview(data)
+    if len(buffer) < FACE_ENCODING_HEADER.size:
+        raise ValidationError("Invalid face encodings data: truncated header")
+    magic, version, dtype_code, count, dim = FACE_ENCODING_HEADER.unpack_from(buffer)
+    if magic != FACE_ENCODING_MAGIC or version != FACE_ENCODING_VERSION or dtype_code not in FACE_ENCODING_DTYPES:
+        raise ValidationError(f"Invalid face encodings data: unsupported header (version {version}, dtype {dtype_code})")
+    dtype = FACE_ENCODING_DTYPES[dtype_code]
+    if len(buffer) != FACE_ENCODING_HEADER.size + count * dim * dtype.itemsize:
+        raise ValidationError("Invalid face encodings data: payload size mismatch")
+    return np.frombuffer(buffer, dtype=dtype, count=count * dim, offset=FACE_ENCODING_HEADER.size).reshape(count, dim)
+
+
 class User(AbstractUser):
     ROLE_CHOICES = (
         ('student', 'Student'),
@@ -149,23 +184,26 @@ class Student(models.Model):
         limit_choices_to={'role': 'teacher'}
     )
     last_modified = models.DateTimeField(auto_now=True)
-    face_encodings = models.JSONField(null=True, blank=True)
+    face_encodings = models.BinaryField(null=True, blank=True)
 
     def set_face_encodings(self, encodings):
         if not isinstance(encodings, list) or not all(isinstance(enc, np.ndarray) for enc in encodings):
             raise ValidationError("Encodings must be a list of NumPy arrays")
-        if any(enc.size != 128 for enc in encodings):
+        if any(enc.size != FACE_ENCODING_DIM for enc in encodings):
             raise ValidationError("Each encoding must be a 128-dimensional array")
-        self.face_encodings = json.dumps([enc.tolist() for enc in encodings])
+        self.face_encodings = pack_face_encodings(encodings)
         self.save()
+        from .views.utils import invalidate_section_gallery
+        invalidate_section_gallery(self.branch_id, self.semester_id, self.section_id)
+        from .face_index import update_branch_index
+        update_branch_index(self.branch_id)
+
+    def get_face_encoding_matrix(self):
+        """Return stored encodings as a zero-copy (count, 128) array view."""
+        return unpack_face_encodings(self.face_encodings)
 
     def get_face_encodings(self):
-        if self.face_encodings:
-            try:
-                return [np.array(enc, dtype=np.float64) for enc in json.loads(self.face_encodings)]
-            except ValueError as e:
-                raise ValidationError(f"Invalid face encodings data: {str(e)}")
-        return []
+        return list(self.get_face_encoding_matrix())
 
     def __str__(self):
         return f"{self.name} ({self.usn}) - {self.branch.name}"
@@ -302,9 +340,13 @@ class AttendanceRecord(models.Model):
     )
     status = models.CharField(
         max_length=20,
-        choices=(('pending', 'Pending'), ('completed', 'Completed')),
+        choices=(('pending', 'Pending'), ('completed', 'Completed'), ('failed', 'Failed')),
         default='completed'
     )
+    idempotency_key = models.CharField(max_length=64, blank=True, null=True)  # client-supplied, makes retries safe
+
+    class Meta:
+        unique_together = ('faculty', 'idempotency_key')
 
     def __str__(self):
         faculty_name = f"{self.faculty.first_name} {self.faculty.last_name}" if self.faculty else "Unknown"
@@ -339,6 +381,126 @@ class AttendanceDetail(models.Model):
         return f"{self.student.name} - {status}"
 
 
+class AttendanceSummary(models.Model):
+    """Running present/total counts per student and subject, kept in step with AttendanceDetail."""
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='attendance_summaries')
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE, related_name='attendance_summaries')
+    present = models.IntegerField(default=0)
+    total = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.student.usn} - {self.subject.name}: {self.present}/{self.total}"
+
+    @property
+    def percentage(self):
+        return round((self.present / self.total) * 100, 2) if self.total else 0
+
+    class Meta:
+        unique_together = ('student', 'subject')
+
+
+class AttendanceJob(models.Model):
+    STATUS_CHOICES = (
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    )
+    record = models.OneToOneField(AttendanceRecord, on_delete=models.CASCADE, related_name='job')
+    image_paths = models.JSONField(default=list)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Attendance job {self.id} for record {self.record_id} ({self.status})"
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [models.Index(fields=['status', 'created_at'])]
+
+
+class SheetOutboxEntry(models.Model):
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    )
+    record = models.ForeignKey(AttendanceRecord, on_delete=models.CASCADE, related_name='sheet_writes')
+    rows = models.JSONField(default=dict)  # {'Present': [[...]], 'Absent': [[...]]}
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claim_token = models.CharField(max_length=32, blank=True, null=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Sheet write {self.id} for record {self.record_id} ({self.status})"
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [models.Index(fields=['status', 'next_attempt_at'])]
+
+
+class ReportJob(models.Model):
+    STATUS_CHOICES = (
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    )
+    requested_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='report_jobs')
+    params = models.JSONField(default=dict)  # branch_id and optional semester_id/section_id/subject_id/start_date/end_date
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    progress = models.PositiveSmallIntegerField(default=0)  # percent
+    filename = models.CharField(max_length=255, blank=True, null=True)
+    error = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+
+    def __str__(self):
+        return f"Report job {self.id} by {self.requested_by_id} ({self.status})"
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [models.Index(fields=['status', 'created_at'])]
+
+
+class StatsSnapshot(models.Model):
+    """Daily copy of the admin overview totals, for trend lines."""
+    date = models.DateField(unique=True)
+    data = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Stats snapshot {self.date}"
+
+    class Meta:
+        ordering = ['date']
+
+
+class AttendanceSheet(models.Model):
+    """Registry of Google Sheets used for attendance, keyed like the old *_sheet_id.txt files."""
+    sheet_key = models.CharField(max_length=255, unique=True)  # '<branch>_<subject>_<section>_<semester>'
+    sheet_id = models.CharField(max_length=255)
+    tab_ids = models.JSONField(default=dict, blank=True)  # {'Present': <sheetId>, 'Absent': <sheetId>}
+    verified_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.sheet_key} -> {self.sheet_id}"
+
+
 class LeaveRequest(models.Model):
     STATUS_CHOICES = (
         ('PENDING', 'Pending'),
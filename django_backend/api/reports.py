@@ -0,0 +1,369 @@
+import os
+import json
+import time
+import uuid
+import hashlib
+import threading
+import logging
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from datetime import timedelta
+from multiprocessing import get_context
+from typing import Dict, Optional, Tuple
+from django.conf import settings
+from django.db.models import Count, Exists, F, OuterRef, Q
+from django.utils import timezone
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; single-flight is then per process only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Per-path locks so concurrent requests in one process render a report once
+_render_locks: Dict[str, threading.Lock] = {}
+_render_locks_guard = threading.Lock()
+
+
+def report_cache_dir() -> str:
+    directory = getattr(settings, 'REPORT_CACHE_DIR', os.path.join(settings.MEDIA_ROOT, 'reports'))
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+def report_data_version(record, stats: Dict[str, Tuple[int, float]], total_sessions: int) -> str:
+    """Hash of everything printed in the report except the generation time."""
+    payload = json.dumps({
+        'record': record.id,
+        'title': [record.branch.name, record.semester.number, record.subject.name, record.section.name],
+        'total_sessions': total_sessions,
+        'stats': sorted((name, count, round(float(percentage), 4)) for name, (count, percentage) in stats.items())
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+def _render_lock(path: str) -> threading.Lock:
+    with _render_locks_guard:
+        return _render_locks.setdefault(path, threading.Lock())
+
+
+def get_record_report(record, stats: Dict[str, Tuple[int, float]]) -> str:
+    """Return the filename of the cached PDF for a record, rendering it only if its data changed."""
+    from .views.utils import generate_pdf, count_attendance_sessions, attendance_log_path
+    log_path = attendance_log_path(record.file_path) if record.file_path else None
+    total_sessions = count_attendance_sessions(log_path) if log_path and os.path.exists(log_path) else 0
+    filename = f"stats_{record.id}_{report_data_version(record, stats, total_sessions)}.pdf"
+    path = os.path.join(report_cache_dir(), filename)
+    if os.path.exists(path):
+        logger.debug("Report cache hit for %s", filename)
+        _touch(path)
+        return filename
+    with _render_lock(path):
+        lock_file = open(f"{path}.lock", 'w') if fcntl else None
+        try:
+            if lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)  # another process may be rendering the same report
+            if not os.path.exists(path):
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                generate_pdf(stats, tmp_path, record, total_sessions=total_sessions)
+                os.replace(tmp_path, path)
+                _remove_stale_versions(record.id, filename)
+                logger.info("Rendered report %s", filename)
+        finally:
+            if lock_file:
+                lock_file.close()  # the lock file itself is left for evict_reports to age out
+    evict_reports()
+    return filename
+
+
+def _touch(path: str) -> None:
+    """Mark a report as just served so it is not removed while the client downloads it."""
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def _remove_stale_versions(record_id: int, current: str) -> None:
+    """Delete older versions of a record's report that have not been served for REPORT_STALE_GRACE seconds.
+
+    A concurrent request may have returned an older version just before this
+    one was rendered; the grace period leaves it in place until downloaded.
+    """
+    prefix = f"stats_{record_id}_"
+    grace = getattr(settings, 'REPORT_STALE_GRACE', 600)
+    now = time.time()
+    for name in os.listdir(report_cache_dir()):
+        if name.startswith(prefix) and name.endswith('.pdf') and name != current:
+            path = os.path.join(report_cache_dir(), name)
+            try:
+                if now - os.path.getmtime(path) > grace:
+                    os.remove(path)
+            except OSError:
+                pass
+
+
+def evict_reports() -> int:
+    """Delete reports not served for REPORT_CACHE_MAX_AGE, then the least recently served until under REPORT_CACHE_MAX_BYTES."""
+    directory = report_cache_dir()
+    max_age = getattr(settings, 'REPORT_CACHE_MAX_AGE', 7 * 24 * 3600)
+    max_bytes = getattr(settings, 'REPORT_CACHE_MAX_BYTES', 500 * 1024 * 1024)
+    now = time.time()
+    files = []
+    removed = 0
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if name.endswith('.lock'):
+            if now - os.path.getmtime(path) > max_age:
+                _try_remove(path)
+            continue
+        if not name.endswith('.pdf'):
+            continue
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        if now - stat.st_mtime > max_age:
+            removed += _try_remove(path)
+        else:
+            files.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in files)
+    for _, size, path in sorted(files):
+        if total <= max_bytes:
+            break
+        removed += _try_remove(path)
+        total -= size
+    if removed:
+        logger.info("Evicted %d cached reports", removed)
+    return removed
+
+
+def _try_remove(path: str) -> int:
+    try:
+        os.remove(path)
+        return 1
+    except OSError:
+        return 0
+
+
+def report_path(filename: str) -> str:
+    """Resolve a report filename from the cache, falling back to MEDIA_ROOT for older reports."""
+    filename = os.path.basename(filename)
+    cached = os.path.join(report_cache_dir(), filename)
+    return cached if os.path.exists(cached) else os.path.join(settings.MEDIA_ROOT, filename)
+
+
+# Report jobs: a thread per running job gathers data and tracks progress, while
+# ReportLab rendering (pure Python, GIL-bound) runs in a process pool
+_report_threads: Optional[ThreadPoolExecutor] = None
+_report_processes: Optional[ProcessPoolExecutor] = None
+_report_pool_lock = threading.Lock()
+
+
+def _init_render_process() -> None:
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+
+
+def _get_report_pools() -> Tuple[ThreadPoolExecutor, ProcessPoolExecutor]:
+    global _report_threads, _report_processes
+    with _report_pool_lock:
+        if _report_threads is None:
+            workers = getattr(settings, 'REPORT_WORKERS', 2)
+            _report_threads = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='report-jobs')
+            # Spawned, not forked: a fork would copy this process's DB connections and held locks
+            _report_processes = ProcessPoolExecutor(max_workers=workers, mp_context=get_context('spawn'), initializer=_init_render_process)
+        return _report_threads, _report_processes
+
+
+def create_report_job(user, params: Dict):
+    from .models import ReportJob
+    job = ReportJob.objects.create(requested_by=user, params=params)
+    logger.info("Queued report job %s for %s: %s", job.id, user.username, params)
+    return job
+
+
+def enqueue_report_job(job_id: int) -> None:
+    """Hand a queued job to the local pool; 'command' mode leaves it for process_report_jobs."""
+    if getattr(settings, 'REPORT_JOB_WORKER', 'thread') != 'thread':
+        return
+    threads, _ = _get_report_pools()
+    threads.submit(_run_report_job_in_thread, job_id)
+
+
+_sweep_thread: Optional[threading.Thread] = None
+
+
+def start_report_worker() -> None:
+    """Start a thread that periodically recovers stale report jobs and runs any still queued."""
+    global _sweep_thread
+    if getattr(settings, 'REPORT_JOB_WORKER', 'thread') != 'thread':
+        return
+    with _report_pool_lock:
+        if _sweep_thread is None or not _sweep_thread.is_alive():
+            _sweep_thread = threading.Thread(target=_sweep_loop, name='report-jobs-sweep', daemon=True)
+            _sweep_thread.start()
+
+
+def _sweep_loop() -> None:
+    from django.db import close_old_connections
+    while True:
+        close_old_connections()
+        try:
+            recover_report_jobs()
+            run_pending_report_jobs()
+        except Exception as e:
+            logger.error("Report job sweep failed: %s", str(e))
+        finally:
+            close_old_connections()
+        time.sleep(getattr(settings, 'REPORT_JOB_SWEEP_INTERVAL', 60))
+
+
+def recover_report_jobs() -> int:
+    """Requeue jobs left 'running' past REPORT_JOB_LEASE by a dead worker; fail them after REPORT_JOB_MAX_ATTEMPTS."""
+    from .models import ReportJob
+    now = timezone.now()
+    stale = ReportJob.objects.filter(
+        status='running', started_at__lt=now - timedelta(seconds=getattr(settings, 'REPORT_JOB_LEASE', 1800))
+    )
+    max_attempts = getattr(settings, 'REPORT_JOB_MAX_ATTEMPTS', 2)
+    recovered = stale.filter(attempts__gte=max_attempts).update(
+        status='failed', error='Worker stopped before finishing the report', finished_at=now
+    )
+    recovered += stale.filter(attempts__lt=max_attempts).update(status='queued', progress=0)
+    if recovered:
+        logger.warning("Recovered %d stale report jobs", recovered)
+    return recovered
+
+
+def _run_report_job_in_thread(job_id: int) -> bool:
+    from django.db import close_old_connections
+    close_old_connections()
+    try:
+        return run_report_job(job_id)
+    except Exception as e:
+        logger.error("Report job worker crashed on job %s: %s", job_id, str(e))
+        return False
+    finally:
+        close_old_connections()
+
+
+def report_job_data(params: Dict, faculty_id: Optional[int] = None) -> Tuple[str, int, Dict[str, Tuple[int, float]]]:
+    """Title, session count and per-student (present, percentage) for a report scope.
+
+    With ``faculty_id`` only classes that faculty member is assigned to are counted.
+    """
+    from .models import AttendanceRecord, AttendanceDetail, Branch, FacultyAssignment, Semester, Section, Subject
+    filters = {'branch_id': params['branch_id']}
+    for field in ('semester_id', 'section_id', 'subject_id'):
+        if params.get(field):
+            filters[field] = params[field]
+    if params.get('start_date'):
+        filters['date__gte'] = params['start_date']
+    if params.get('end_date'):
+        filters['date__lte'] = params['end_date']
+    records = AttendanceRecord.objects.filter(status='completed', **filters)
+    if faculty_id is not None:
+        records = records.filter(Exists(FacultyAssignment.objects.filter(
+            faculty_id=faculty_id, branch=OuterRef('branch'), semester=OuterRef('semester'),
+            section=OuterRef('section'), subject=OuterRef('subject')
+        )))
+    rows = AttendanceDetail.objects.filter(record__in=records).values('student__name', 'student__usn').annotate(
+        present=Count('id', filter=Q(status=True)), total=Count('id')
+    ).order_by('student__usn')
+    stats = {f"{row['student__name']} ({row['student__usn']})": (row['present'], (row['present'] / row['total']) * 100) for row in rows}
+
+    title = f"Attendance Report - {Branch.objects.get(id=params['branch_id']).name}"
+    if params.get('semester_id'):
+        title += f" Semester {Semester.objects.get(id=params['semester_id']).number}"
+    if params.get('subject_id'):
+        title += f" {Subject.objects.get(id=params['subject_id']).name}"
+    if params.get('section_id'):
+        title += f" ({Section.objects.get(id=params['section_id']).name})"
+    return title, records.count(), stats
+
+
+def render_report_file(title: str, total_sessions: int, stats: Dict[str, Tuple[int, float]], output_path: str, progress_path: str) -> None:
+    """Runs in a worker process: render the PDF and report progress through a small sidecar file."""
+    from .views.utils import draw_statistics_pdf
+
+    def progress(done: int, total: int) -> None:
+        with open(progress_path, 'w') as f:
+            f.write(str(int(done * 100 / total) if total else 100))
+
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    draw_statistics_pdf(title, total_sessions, stats, tmp_path, progress)
+    os.replace(tmp_path, output_path)
+
+
+def _read_progress(progress_path: str) -> int:
+    try:
+        with open(progress_path) as f:
+            return int(f.read() or 0)
+    except (OSError, ValueError):
+        return 0
+
+
+def claim_report_job(job_id: int) -> bool:
+    """Atomically move a queued job to running; False if another worker already took it."""
+    from .models import ReportJob
+    return ReportJob.objects.filter(id=job_id, status='queued').update(
+        status='running', started_at=timezone.now(), attempts=F('attempts') + 1
+    ) == 1
+
+
+def run_report_job(job_id: int) -> bool:
+    """Claim and render a single report job. Returns True if this call processed it."""
+    from .models import ReportJob
+    if not claim_report_job(job_id):
+        return False
+    job = ReportJob.objects.get(id=job_id)
+    progress_path = os.path.join(report_cache_dir(), f"report_{job.id}.progress")
+    try:
+        title, total_sessions, stats = report_job_data(job.params, job.requested_by_id)
+        ReportJob.objects.filter(id=job.id).update(progress=10)
+        filename = f"report_{job.id}_{uuid.uuid4().hex[:8]}.pdf"
+        _, processes = _get_report_pools()
+        future = processes.submit(render_report_file, title, total_sessions, stats, os.path.join(report_cache_dir(), filename), progress_path)
+        last_progress = 10
+        while True:
+            try:
+                future.result(timeout=1)
+                break
+            except FutureTimeoutError:
+                # Data gathering is the first 10%, rendering the rest
+                current = 10 + _read_progress(progress_path) * 9 // 10
+                if current != last_progress:
+                    ReportJob.objects.filter(id=job.id).update(progress=current)
+                    last_progress = current
+        job.status = 'completed'
+        job.progress = 100
+        job.filename = filename
+        logger.info("Report job %s completed: %s (%d students)", job.id, filename, len(stats))
+    except Exception as e:
+        logger.error("Report job %s failed: %s", job.id, str(e))
+        job.status = 'failed'
+        job.error = str(e)
+    finally:
+        _try_remove(progress_path)
+        # Only if the job was not recovered and handed to another worker in the meantime
+        finished = ReportJob.objects.filter(id=job.id, status='running', started_at=job.started_at).update(
+            status=job.status, progress=job.progress, filename=job.filename, error=job.error, finished_at=timezone.now()
+        )
+        if not finished:
+            logger.warning("Report job %s was recovered by another worker; discarding this result", job.id)
+            if job.filename:
+                _try_remove(os.path.join(report_cache_dir(), job.filename))
+    evict_reports()
+    return True
+
+
+def run_pending_report_jobs(limit: Optional[int] = None) -> int:
+    """Render queued report jobs oldest first, REPORT_WORKERS at a time. Returns the number processed."""
+    from .models import ReportJob
+    threads, _ = _get_report_pools()
+    job_ids = list(ReportJob.objects.filter(status='queued').values_list('id', flat=True)[:limit])
+    futures = [threads.submit(_run_report_job_in_thread, job_id) for job_id in job_ids]
+    return sum(1 for future in futures if future.result())
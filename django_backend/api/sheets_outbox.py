@@ -0,0 +1,189 @@
+import uuid
+import threading
+import logging
+from collections import OrderedDict
+from datetime import timedelta
+from typing import List, Optional, Tuple
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Prefetch, Q
+from django.utils import timezone
+from .models import AttendanceRecord, AttendanceDetail, SheetOutboxEntry
+
+logger = logging.getLogger(__name__)
+
+# Wakes the in-process drainer when SHEETS_OUTBOX_WORKER is 'thread'
+_drainer_wake = threading.Event()
+_drainer_thread: Optional[threading.Thread] = None
+_drainer_lock = threading.Lock()
+
+
+def enqueue_attendance_rows(record: AttendanceRecord, present_students: List[Tuple[str, str]], absent_students: List[Tuple[str, str]], timestamp: str) -> SheetOutboxEntry:
+    """Queue a session's Present/Absent rows for the record's sheet; the drainer sends them later."""
+    from .views.utils import attendance_sheet_rows
+    entry = SheetOutboxEntry.objects.create(record=record, rows=attendance_sheet_rows(present_students, absent_students, timestamp))
+    transaction.on_commit(wake_sheet_drainer)
+    return entry
+
+
+def wake_sheet_drainer() -> None:
+    """Nudge the in-process drainer; 'command' mode leaves the outbox to drain_sheet_outbox."""
+    if getattr(settings, 'SHEETS_OUTBOX_WORKER', getattr(settings, 'ATTENDANCE_JOB_WORKER', 'thread')) != 'thread':
+        return
+    _ensure_drainer_thread()
+    _drainer_wake.set()
+
+
+def _ensure_drainer_thread() -> None:
+    global _drainer_thread
+    with _drainer_lock:
+        if _drainer_thread is None or not _drainer_thread.is_alive():
+            _drainer_thread = threading.Thread(target=_drainer_loop, name='sheet-outbox', daemon=True)
+            _drainer_thread.start()
+
+
+def _drainer_loop() -> None:
+    from django.db import close_old_connections
+    while True:
+        _drainer_wake.wait(timeout=getattr(settings, 'SHEETS_OUTBOX_POLL_INTERVAL', 30))
+        _drainer_wake.clear()
+        close_old_connections()
+        try:
+            while drain_sheet_outbox():
+                pass
+        except Exception as e:
+            logger.error("Sheet outbox drainer crashed: %s", str(e))
+        finally:
+            close_old_connections()
+
+
+def _backoff(attempts: int) -> timedelta:
+    base = getattr(settings, 'SHEETS_OUTBOX_BACKOFF_BASE', 30)
+    return timedelta(seconds=min(base * (2 ** (attempts - 1)), getattr(settings, 'SHEETS_OUTBOX_BACKOFF_MAX', 3600)))
+
+
+def claim_sheet_writes(limit: int = 200) -> List[SheetOutboxEntry]:
+    """Claim due entries for this drainer; entries stuck in 'sending' past the lease are reclaimed."""
+    now = timezone.now()
+    lease = timedelta(seconds=getattr(settings, 'SHEETS_OUTBOX_LEASE', 300))
+    due = Q(status='pending', next_attempt_at__lte=now) | Q(status='sending', claimed_at__lt=now - lease)
+    ids = list(SheetOutboxEntry.objects.filter(due).values_list('id', flat=True)[:limit])
+    if not ids:
+        return []
+    token = uuid.uuid4().hex
+    SheetOutboxEntry.objects.filter(due, id__in=ids).update(status='sending', claim_token=token, claimed_at=now)
+    return list(SheetOutboxEntry.objects.filter(claim_token=token, status='sending').select_related(
+        'record__branch', 'record__semester', 'record__section', 'record__subject'
+    ))
+
+
+def drain_sheet_outbox(backend=None, limit: int = 200) -> int:
+    """Send claimed writes, coalesced into one write per archive. Returns entries sent.
+
+    ``backend`` defaults to get_export_backend(); pass a
+    GoogleSheetsExportBackend around a FakeSheetsService to exercise the
+    outbox without network access.
+    """
+    from .exports import get_export_backend
+    backend = backend or get_export_backend()
+    entries = claim_sheet_writes(limit)
+    groups: 'OrderedDict[Tuple, List[SheetOutboxEntry]]' = OrderedDict()
+    for entry in entries:
+        record = entry.record
+        groups.setdefault((record.branch.name, record.subject.name, record.section.name, record.semester.number), []).append(entry)
+
+    written = []
+    for sheet_key, group in groups.items():
+        rows_by_tab = OrderedDict()
+        for entry in group:
+            for tab, rows in entry.rows.items():
+                rows_by_tab.setdefault(tab, []).extend(rows)
+        try:
+            backend.write(sheet_key, rows_by_tab)
+        except Exception as e:
+            _mark_failed(group, str(e))
+            logger.warning("Sheet outbox write for %s failed (%d entries): %s", sheet_key, len(group), str(e))
+            continue
+        written.extend(group)
+    if not written:
+        return 0
+    try:
+        backend.flush()
+    except Exception as e:
+        # The entries are retried from the outbox, so rows the backend kept must not be written as well
+        backend.discard()
+        _mark_failed(written, str(e))
+        logger.warning("Sheet outbox flush failed (%d entries): %s", len(written), str(e))
+        return 0
+    SheetOutboxEntry.objects.filter(id__in=[entry.id for entry in written]).update(
+        status='sent', sent_at=timezone.now(), last_error=None, claim_token=None
+    )
+    logger.info("Sheet outbox sent %d sessions to %d archives", len(written), len(groups))
+    return len(written)
+
+
+def _mark_failed(entries: List[SheetOutboxEntry], error: str) -> None:
+    max_attempts = getattr(settings, 'SHEETS_OUTBOX_MAX_ATTEMPTS', 8)
+    now = timezone.now()
+    for entry in entries:
+        entry.attempts += 1
+        entry.last_error = error
+        entry.claim_token = None
+        if entry.attempts >= max_attempts:
+            entry.status = 'failed'
+        else:
+            entry.status = 'pending'
+            entry.next_attempt_at = now + _backoff(entry.attempts)
+    SheetOutboxEntry.objects.bulk_update(entries, ['attempts', 'last_error', 'claim_token', 'status', 'next_attempt_at'])
+
+
+def backfill_attendance_sheets(records, include_sent: bool = False, sessions_per_call: int = 200, backend=None) -> int:
+    """Push stored sessions from AttendanceRecord/AttendanceDetail into their archives. Returns sessions sent.
+
+    Sessions are grouped per archive and written ``sessions_per_call`` at a
+    time, both tabs per request. Unless ``include_sent`` is set, sessions
+    the outbox already delivered are skipped, and outbox entries for the
+    sessions written here are closed so they are not sent twice.
+    """
+    from .exports import get_export_backend
+    from .views.utils import attendance_sheet_rows
+    backend = backend or get_export_backend()
+    records = records.filter(status='completed')
+    if not include_sent:
+        records = records.exclude(sheet_writes__status='sent')
+    records = records.select_related('branch', 'semester', 'section', 'subject').prefetch_related(
+        Prefetch('details', queryset=AttendanceDetail.objects.select_related('student').only(
+            'record_id', 'status', 'student__name', 'student__usn'
+        ))
+    ).order_by('date', 'id')
+
+    groups: 'OrderedDict[Tuple, List[AttendanceRecord]]' = OrderedDict()
+    for record in records:
+        groups.setdefault((record.branch.name, record.subject.name, record.section.name, record.semester.number), []).append(record)
+
+    sent = 0
+    for sheet_key, group in groups.items():
+        for start in range(0, len(group), sessions_per_call):
+            chunk = group[start:start + sessions_per_call]
+            rows_by_tab = OrderedDict()
+            for record in chunk:
+                details = list(record.details.all())
+                rows = attendance_sheet_rows(
+                    [(d.student.name, d.student.usn) for d in details if d.status],
+                    [(d.student.name, d.student.usn) for d in details if not d.status],
+                    record.date.strftime('%Y-%m-%d')
+                )
+                for tab, tab_rows in rows.items():
+                    rows_by_tab.setdefault(tab, []).extend(tab_rows)
+            try:
+                backend.write(sheet_key, rows_by_tab)
+                backend.flush()
+            except Exception:
+                backend.discard()
+                raise
+            SheetOutboxEntry.objects.filter(record__in=chunk).exclude(status='sent').update(
+                status='sent', sent_at=timezone.now(), claim_token=None
+            )
+            sent += len(chunk)
+        logger.info("Backfilled %d sessions for %s", len(group), sheet_key)
+    return sent
@@ -0,0 +1,104 @@
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from .models import AttendanceDetail, AttendanceRecord, Branch, FacultyAssignment, LeaveRequest, Student, User
+
+
+# Bulk paths (bulk_create, queryset.update) send no signals; they go through
+# apply_summary_deltas / set_attendance_status in api.attendance instead.
+# These receivers cover single-row edits such as the admin change form and cascades.
+
+def _contribution(student_id, subject_id, status_val):
+    return (student_id, subject_id), (1 if status_val else 0, 1)
+
+
+@receiver(pre_save, sender=AttendanceDetail)
+def remember_previous_detail(sender, instance, raw=False, **kwargs):
+    instance._summary_previous = None
+    if raw or instance.pk is None:
+        return
+    instance._summary_previous = AttendanceDetail.objects.filter(pk=instance.pk).values_list(
+        'student_id', 'record__subject_id', 'status'
+    ).first()
+
+
+@receiver(post_save, sender=AttendanceDetail)
+def summarize_saved_detail(sender, instance, created, raw=False, **kwargs):
+    from .attendance import apply_summary_deltas
+    if raw:
+        return
+    deltas = {}
+    previous = getattr(instance, '_summary_previous', None)
+    if previous:
+        key, (present, total) = _contribution(*previous)
+        deltas[key] = (-present, -total)
+    subject_id, branch_id, faculty_id = AttendanceRecord.objects.filter(pk=instance.record_id).values_list(
+        'subject_id', 'branch_id', 'faculty_id'
+    ).first()
+    key, (present, total) = _contribution(instance.student_id, subject_id, instance.status)
+    old_present, old_total = deltas.get(key, (0, 0))
+    deltas[key] = (old_present + present, old_total + total)
+    apply_summary_deltas(deltas)
+    _invalidate_on_commit(branch_ids=[branch_id], user_ids=[faculty_id])
+
+
+@receiver(post_delete, sender=AttendanceDetail)
+def summarize_deleted_detail(sender, instance, **kwargs):
+    from .attendance import apply_summary_deltas
+    record = AttendanceRecord.objects.filter(pk=instance.record_id).values_list('subject_id', 'branch_id', 'faculty_id').first()
+    if record is None:
+        return
+    subject_id, branch_id, faculty_id = record
+    key, (present, total) = _contribution(instance.student_id, subject_id, instance.status)
+    apply_summary_deltas({key: (-present, -total)})
+    _invalidate_on_commit(branch_ids=[branch_id], user_ids=[faculty_id])
+
+
+# Dashboard cache invalidation. Bumps wait for commit so a dashboard recomputed
+# mid-transaction cannot be cached under the new generation with old data.
+
+def _invalidate_on_commit(**scopes):
+    from .dashboard import invalidate_dashboards
+    transaction.on_commit(lambda: invalidate_dashboards(**scopes))
+
+
+@receiver([post_save, post_delete], sender=AttendanceRecord)
+def invalidate_record_dashboards(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    user_ids = [instance.faculty_id]
+    if instance.assignment_id:
+        user_ids += FacultyAssignment.objects.filter(pk=instance.assignment_id).values_list('faculty_id', flat=True)
+    _invalidate_on_commit(branch_ids=[instance.branch_id], user_ids=user_ids)
+
+
+@receiver([post_save, post_delete], sender=LeaveRequest)
+def invalidate_leave_dashboards(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _invalidate_on_commit(branch_ids=[instance.branch_id])
+
+
+@receiver([post_save, post_delete], sender=Student)
+def invalidate_student_dashboards(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _invalidate_on_commit(branch_ids=[instance.branch_id], global_scope=True)
+
+
+@receiver([post_save, post_delete], sender=FacultyAssignment)
+def invalidate_assignment_dashboards(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _invalidate_on_commit(branch_ids=[instance.branch_id], user_ids=[instance.faculty_id], global_scope=True)
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_user_dashboards(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Logins only touch last_login, which no dashboard shows
+    if raw or (update_fields is not None and set(update_fields) == {'last_login'}):
+        return
+    _invalidate_on_commit(user_ids=[instance.pk], global_scope=True)
+
+
+@receiver([post_save, post_delete], sender=Branch)
+def invalidate_branch_dashboards(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _invalidate_on_commit(branch_ids=[instance.pk], global_scope=True)
@@ -0,0 +1,28 @@
+from itertools import count
+from api.models import AttendanceRecord, Branch, FacultyAssignment, Section, Semester, Student, Subject, User
+
+_ids = count(1)
+
+
+def make_user(role: str, **fields) -> User:
+    n = next(_ids)
+    return User.objects.create(username=f'{role}{n}', email=f'{role}{n}@example.com', first_name=role.title(), role=role, **fields)
+
+
+def make_class(branch_name: str = 'CSE', students: int = 3):
+    """A branch with one semester, section and subject, an assigned teacher and ``students`` students."""
+    branch = Branch.objects.create(name=f'{branch_name}{next(_ids)}', hod=make_user('hod'))
+    semester = Semester.objects.create(branch=branch, number=3)
+    section = Section.objects.create(branch=branch, semester=semester, name='A')
+    subject = Subject.objects.create(name='Maths', subject_code=f'MA{next(_ids)}', branch=branch, semester=semester)
+    teacher = make_user('teacher')
+    FacultyAssignment.objects.create(faculty=teacher, branch=branch, semester=semester, section=section, subject=subject)
+    roster = [
+        Student.objects.create(name=f'Student {i}', usn=f'{branch.name}{i:03d}', branch=branch, semester=semester, section=section)
+        for i in range(students)
+    ]
+    return branch, semester, section, subject, teacher, roster
+
+
+def make_record(branch, semester, section, subject, teacher, **fields) -> AttendanceRecord:
+    return AttendanceRecord.objects.create(branch=branch, semester=semester, section=section, subject=subject, faculty=teacher, **fields)
@@ -0,0 +1,64 @@
+import tempfile
+from datetime import timedelta
+from unittest import mock
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from api.attendance import create_attendance_job, recover_attendance_jobs, run_attendance_job
+from api.models import AttendanceJob
+from .factories import make_class, make_record
+
+
+@override_settings(ATTENDANCE_JOB_WORKER='command', ATTENDANCE_JOB_MAX_ATTEMPTS=2, ATTENDANCE_JOB_LEASE=900)
+class AttendanceJobTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        media_root = override_settings(MEDIA_ROOT=media.name)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+
+        self.branch, self.semester, self.section, self.subject, self.teacher, self.students = make_class()
+        self.record = make_record(self.branch, self.semester, self.section, self.subject, self.teacher, status='pending')
+        self.job = create_attendance_job(self.record, [ContentFile(b'photo', name='class.jpg')])
+
+    def refresh(self):
+        self.job.refresh_from_db()
+        self.record.refresh_from_db()
+
+    def test_successful_job_completes_the_record(self):
+        with mock.patch('api.attendance.recognize_present_students', return_value={self.students[0].id}):
+            self.assertTrue(run_attendance_job(self.job.id))
+
+        self.refresh()
+        self.assertEqual((self.job.status, self.record.status), ('completed', 'completed'))
+        self.assertEqual(self.record.details.filter(status=True).count(), 1)
+        self.assertFalse(default_storage.exists(self.job.image_paths[0]))
+
+    def test_failed_job_is_retried_then_fails_its_record(self):
+        with mock.patch('api.attendance.recognize_present_students', side_effect=RuntimeError("model crashed")):
+            run_attendance_job(self.job.id)
+            self.refresh()
+            # Still queued for the next sweep, with its photos kept for the retry
+            self.assertEqual((self.job.status, self.job.attempts, self.record.status), ('queued', 1, 'pending'))
+            self.assertEqual(self.job.error, "model crashed")
+            self.assertTrue(default_storage.exists(self.job.image_paths[0]))
+
+            run_attendance_job(self.job.id)
+
+        self.refresh()
+        self.assertEqual((self.job.status, self.job.attempts, self.record.status), ('failed', 2, 'failed'))
+        self.assertIsNotNone(self.job.finished_at)
+        self.assertFalse(self.record.details.exists())
+        self.assertFalse(default_storage.exists(self.job.image_paths[0]))
+
+    def test_stale_job_out_of_attempts_fails_its_record(self):
+        AttendanceJob.objects.filter(id=self.job.id).update(
+            status='running', attempts=2, started_at=timezone.now() - timedelta(seconds=901)
+        )
+
+        self.assertEqual(recover_attendance_jobs(), 1)
+
+        self.refresh()
+        self.assertEqual((self.job.status, self.record.status), ('failed', 'failed'))
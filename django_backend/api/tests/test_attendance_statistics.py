@@ -0,0 +1,81 @@
+import os
+import tempfile
+from datetime import datetime
+from django.test import SimpleTestCase
+from api.views.utils import (
+    _update_attendance_accumulator, calculate_statistics, count_attendance_sessions, iter_attendance_sessions, parse_attendance
+)
+
+FIRST_SESSIONS = """--- Attendance Session: 2024-01-01 10:00:00 ---
+Faculty: T1
+Present Students: Asha (1), Ben (2)
+Absent Students: Chen (3)
+
+--- Attendance Session: 2024-01-02 10:00:00 ---
+Faculty: T1
+Present Students: Chen (3), Dev (4)
+Absent Students: Asha (1), Ben (2)
+
+--- Attendance Session: 2024-01-02 12:00:00 ---
+Faculty: T2
+
+"""
+LAST_SESSION = """--- Attendance Session: 2024-01-03 10:00:00 ---
+Faculty: T1
+Present Students: Asha (1), Dev (4)
+Absent Students: Ben (2), Chen (3), Eve (5)
+"""
+
+# What the original nested-loop calculate_statistics returned for the full log, in its key order;
+# the empty 12:00 session is skipped by the parser
+BASELINE_STATS = {
+    'Asha (1)': (2, 2 / 3 * 100),
+    'Ben (2)': (1, 1 / 3 * 100),
+    'Chen (3)': (1, 1 / 3 * 100),
+    'Eve (5)': (0, 0.0),
+    'Dev (4)': (2, 2 / 3 * 100),
+}
+
+
+class AttendanceStatisticsTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.log_path = os.path.join(directory.name, 'CSE_3_Maths_A.txt')
+        self.write(FIRST_SESSIONS + LAST_SESSION)
+
+    def write(self, text, mode='w'):
+        with open(self.log_path, mode, encoding='utf-8') as f:
+            f.write(text)
+
+    def test_statistics_match_the_baseline(self):
+        stats = calculate_statistics(parse_attendance(self.log_path))
+
+        self.assertEqual(list(stats.items()), list(BASELINE_STATS.items()))
+        self.assertEqual(count_attendance_sessions(self.log_path), 3)
+
+    def test_persisted_counters_match_the_baseline_as_the_log_grows(self):
+        self.write(FIRST_SESSIONS)
+        self.assertEqual(_update_attendance_accumulator(self.log_path).total_sessions, 2)
+        self.assertTrue(os.path.exists(f'{self.log_path}.stats'))
+
+        self.write(LAST_SESSION, mode='a')
+        accumulator = _update_attendance_accumulator(self.log_path)
+
+        self.assertEqual(list(accumulator.statistics().items()), list(BASELINE_STATS.items()))
+        # A second read picks up the saved counters and still agrees
+        self.assertEqual(list(_update_attendance_accumulator(self.log_path).statistics().items()), list(BASELINE_STATS.items()))
+
+    def test_corrupt_stats_sidecar_is_rebuilt(self):
+        _update_attendance_accumulator(self.log_path)
+        with open(f'{self.log_path}.stats', 'w', encoding='utf-8') as f:
+            f.write('{"size": 12, "offs')
+
+        self.assertEqual(list(_update_attendance_accumulator(self.log_path).statistics().items()), list(BASELINE_STATS.items()))
+
+    def test_date_range_seeks_with_the_index(self):
+        sessions = list(iter_attendance_sessions(self.log_path, start_date=datetime(2024, 1, 2)))
+
+        self.assertEqual([s['date'] for s in sessions], [datetime(2024, 1, 2), datetime(2024, 1, 3)])
+        self.assertEqual(sessions[0]['present'], ['Chen (3)', 'Dev (4)'])
+        self.assertTrue(os.path.exists(f'{self.log_path}.idx'))
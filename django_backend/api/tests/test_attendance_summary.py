@@ -0,0 +1,86 @@
+from django.test import TestCase
+from api.attendance import apply_summary_deltas, mark_manual_attendance, rebuild_attendance_summaries, set_attendance_status
+from api.models import AttendanceDetail, AttendanceSummary
+from .factories import make_class, make_record
+
+
+class AttendanceSummaryTests(TestCase):
+    def setUp(self):
+        self.branch, self.semester, self.section, self.subject, self.teacher, self.students = make_class(students=3)
+
+    def summary(self, student):
+        row = AttendanceSummary.objects.filter(student=student, subject=self.subject).values_list('present', 'total').first()
+        return row or (0, 0)
+
+    def take_session(self, present):
+        record = make_record(self.branch, self.semester, self.section, self.subject, self.teacher)
+        mark_manual_attendance(record, [{'student_id': s.id, 'status': s in present} for s in self.students])
+        return record
+
+    def assert_matches_rebuild(self):
+        # Incremental removals leave empty rows behind; a rebuild does not create them
+        rows = AttendanceSummary.objects.filter(total__gt=0).values_list('student_id', 'subject_id', 'present', 'total')
+        incremental = set(rows)
+        rebuild_attendance_summaries()
+        rebuilt = set(rows.all())
+        self.assertEqual(incremental, rebuilt)
+
+    def test_deltas_create_and_accumulate_rows(self):
+        first, second, third = self.students
+        apply_summary_deltas({(first.id, self.subject.id): (1, 1), (second.id, self.subject.id): (0, 1)})
+        apply_summary_deltas({(first.id, self.subject.id): (1, 1), (second.id, self.subject.id): (1, 1)})
+
+        self.assertEqual(self.summary(first), (2, 2))
+        self.assertEqual(self.summary(second), (1, 2))
+        self.assertEqual(self.summary(third), (0, 0))
+
+    def test_removals_never_create_rows_and_zero_deltas_are_ignored(self):
+        first, second, _ = self.students
+        apply_summary_deltas({(first.id, self.subject.id): (-1, -1), (second.id, self.subject.id): (0, 0)})
+
+        self.assertFalse(AttendanceSummary.objects.exists())
+
+    def test_sessions_update_summaries(self):
+        first, second, third = self.students
+        self.take_session(present=[first, second])
+        self.take_session(present=[first])
+
+        self.assertEqual(self.summary(first), (2, 2))
+        self.assertEqual(self.summary(second), (1, 2))
+        self.assertEqual(self.summary(third), (0, 2))
+        self.assert_matches_rebuild()
+
+    def test_corrections_move_only_the_present_count(self):
+        first, second, _ = self.students
+        record = self.take_session(present=[first])
+
+        updated = set_attendance_status(AttendanceDetail.objects.filter(record=record, student=second), True)
+        # Re-applying the same status changes nothing
+        set_attendance_status(AttendanceDetail.objects.filter(record=record, student=second), True)
+
+        self.assertEqual(updated, 1)
+        self.assertEqual(self.summary(second), (1, 1))
+        self.assert_matches_rebuild()
+
+    def test_single_row_edits_and_deletes_go_through_signals(self):
+        first, second, _ = self.students
+        record = self.take_session(present=[first])
+
+        detail = AttendanceDetail.objects.get(record=record, student=first)
+        detail.status = False
+        detail.save()
+        self.assertEqual(self.summary(first), (0, 1))
+
+        AttendanceDetail.objects.get(record=record, student=second).delete()
+        self.assertEqual(self.summary(second), (0, 0))
+        self.assert_matches_rebuild()
+
+    def test_deleting_a_record_removes_its_sessions(self):
+        first, _, _ = self.students
+        self.take_session(present=[first])
+        record = self.take_session(present=[first])
+
+        record.delete()
+
+        self.assertEqual(self.summary(first), (1, 1))
+        self.assert_matches_rebuild()
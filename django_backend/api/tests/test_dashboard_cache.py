@@ -0,0 +1,75 @@
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from api.dashboard import cached_dashboard, dashboard_cache, dashboard_cache_stats, invalidate_dashboards
+from api.models import Branch, LeaveRequest, Student
+from .factories import make_class, make_user
+
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests-default'},
+    'dashboard': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests-dashboard'},
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHES, DASHBOARD_CACHE_TTL=60)
+class DashboardCacheTests(TestCase):
+    def setUp(self):
+        dashboard_cache().clear()
+        self.computed = 0
+
+    def compute(self):
+        self.computed += 1
+        return {'version': self.computed}
+
+    def fetch(self, scopes):
+        return cached_dashboard('admin_stats', scopes, scopes, self.compute)
+
+    def test_result_is_cached_until_a_scope_is_invalidated(self):
+        self.assertEqual(self.fetch(['branch:1']), {'version': 1})
+        self.assertEqual(self.fetch(['branch:1']), {'version': 1})
+
+        invalidate_dashboards(branch_ids=[2])
+        self.assertEqual(self.fetch(['branch:1']), {'version': 1})
+
+        invalidate_dashboards(branch_ids=[1])
+        self.assertEqual(self.fetch(['branch:1']), {'version': 2})
+        self.assertEqual(dashboard_cache_stats()['admin_stats'], {'hits': 2, 'misses': 2, 'hit_rate': 0.5})
+
+    def test_invalidation_survives_an_evicted_generation(self):
+        self.fetch(['global'])
+        dashboard_cache().delete('dashboard:gen:global')
+
+        self.assertEqual(self.fetch(['global']), {'version': 2})
+
+    def test_writes_bump_generations_after_commit(self):
+        branch, semester, section, _, teacher, _ = make_class()
+        self.fetch(['global'])
+        self.fetch([f'branch:{branch.id}'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Student.objects.create(name='New', usn='NEW001', branch=branch, semester=semester, section=section)
+
+        self.assertEqual(self.fetch(['global']), {'version': 3})
+        self.assertEqual(self.fetch([f'branch:{branch.id}']), {'version': 4})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            LeaveRequest.objects.create(faculty=teacher, branch=branch, start_date=timezone.now().date(),
+                                        end_date=timezone.now().date(), reason='Conference')
+        self.assertEqual(self.fetch(['global']), {'version': 3})
+        self.assertEqual(self.fetch([f'branch:{branch.id}']), {'version': 5})
+
+    def test_user_and_branch_writes_bump_global(self):
+        self.fetch(['global'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            user = make_user('teacher')
+        self.assertEqual(self.fetch(['global']), {'version': 2})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Branch.objects.create(name='Civil')
+        self.assertEqual(self.fetch(['global']), {'version': 3})
+
+        # Logins only touch last_login, which no dashboard shows
+        with self.captureOnCommitCallbacks(execute=True):
+            user.last_login = timezone.now()
+            user.save(update_fields=['last_login'])
+        self.assertEqual(self.fetch(['global']), {'version': 3})
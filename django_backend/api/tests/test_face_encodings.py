@@ -0,0 +1,77 @@
+import json
+import numpy as np
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import SimpleTestCase, TransactionTestCase
+from api.models import FACE_ENCODING_HEADER, pack_face_encodings, unpack_face_encodings
+
+
+class FaceEncodingFormatTests(SimpleTestCase):
+    def setUp(self):
+        self.encodings = [np.random.default_rng(seed).uniform(-0.5, 0.5, 128) for seed in range(3)]
+
+    def test_float32_roundtrip(self):
+        data = pack_face_encodings(self.encodings)
+        matrix = unpack_face_encodings(data)
+
+        self.assertEqual(len(data), FACE_ENCODING_HEADER.size + 3 * 128 * 4)
+        self.assertEqual((matrix.shape, matrix.dtype), ((3, 128), np.dtype('<f4')))
+        np.testing.assert_array_equal(matrix, np.asarray(self.encodings, dtype=np.float32))
+
+    def test_float16_roundtrip(self):
+        matrix = unpack_face_encodings(pack_face_encodings(self.encodings, dtype=np.float16))
+
+        self.assertEqual(matrix.dtype, np.dtype('<f2'))
+        np.testing.assert_array_equal(matrix, np.asarray(self.encodings, dtype=np.float16))
+
+    def test_unpack_is_a_view_over_the_stored_bytes(self):
+        data = pack_face_encodings(self.encodings)
+
+        self.assertFalse(unpack_face_encodings(data).flags.owndata)
+
+    def test_empty_and_invalid_data(self):
+        self.assertEqual(unpack_face_encodings(None).shape, (0, 128))
+        data = pack_face_encodings(self.encodings)
+        for bad in (data[:4], b'XX' + data[2:], data[:-1]):
+            with self.assertRaises(ValidationError):
+                unpack_face_encodings(bad)
+        with self.assertRaises(ValidationError):
+            pack_face_encodings(self.encodings, dtype=np.float64)
+
+
+class FaceEncodingMigrationTests(TransactionTestCase):
+    before = [('api', '0001_initial')]
+    after = [('api', '0002_student_face_encodings_binary')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes('api'))
+
+    def test_json_encodings_survive_the_binary_migration_and_back(self):
+        apps = self.migrate(self.before)
+        Branch, Semester, Section, Student = (apps.get_model('api', name) for name in ('Branch', 'Semester', 'Section', 'Student'))
+        branch = Branch.objects.create(name='CSE')
+        semester = Semester.objects.create(branch=branch, number=3)
+        section = Section.objects.create(branch=branch, semester=semester, name='A')
+        encodings = [[round(0.001 * (i + j), 3) for i in range(128)] for j in range(2)]
+        # Old rows hold a json.dumps() string inside the JSONField
+        student = Student.objects.create(name='Old', usn='OLD001', branch=branch, semester=semester, section=section,
+                                         face_encodings=json.dumps(encodings))
+        Student.objects.create(name='None', usn='OLD002', branch=branch, semester=semester, section=section)
+
+        apps = self.migrate(self.after)
+        Student = apps.get_model('api', 'Student')
+        matrix = unpack_face_encodings(Student.objects.get(pk=student.pk).face_encodings)
+        np.testing.assert_array_equal(matrix, np.asarray(encodings, dtype=np.float32))
+        self.assertIsNone(Student.objects.get(usn='OLD002').face_encodings)
+
+        apps = self.migrate(self.before)
+        restored = json.loads(apps.get_model('api', 'Student').objects.get(pk=student.pk).face_encodings)
+        np.testing.assert_array_equal(np.asarray(restored, dtype=np.float32), np.asarray(encodings, dtype=np.float32))
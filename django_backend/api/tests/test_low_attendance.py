@@ -0,0 +1,77 @@
+from decimal import Decimal, ROUND_HALF_UP
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from api.attendance import attendance_percentage, low_attendance_cutoff
+from api.models import AttendanceSummary
+from .factories import make_class
+
+
+def rounded_percentage(present: int, total: int) -> Decimal:
+    return (Decimal(100 * present) / Decimal(total)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+class LowAttendanceCutoffTests(TestCase):
+    def test_percentage_rounds_half_up(self):
+        self.assertEqual(attendance_percentage(1, 32), 3.13)
+        self.assertEqual(attendance_percentage(0, 0), 0)
+        for total in range(1, 201):
+            for present in range(total + 1):
+                self.assertEqual(Decimal(str(attendance_percentage(present, total))), rounded_percentage(present, total), (present, total))
+
+    def test_cutoff_agrees_with_the_rounded_percentage(self):
+        for threshold in (75, 60.5, 33.33, 0.29, 1.1, 3.13, 66.67, 99.99, 100, 0.01):
+            cutoff = low_attendance_cutoff(threshold)
+            for total in range(1, 121):
+                for present in range(total + 1):
+                    expected = rounded_percentage(present, total) < Decimal(str(threshold))
+                    self.assertEqual(present * 20000 < total * cutoff, expected, (threshold, present, total))
+
+
+class LowAttendanceEndpointTests(TestCase):
+    def setUp(self):
+        self.branch, _, _, self.subject, _, self.students = make_class(students=4)
+        # 2/3 = 66.67%, 3/4 = 75%, 1/1 = 100%, and one student with no sessions
+        for student, (present, total) in zip(self.students, [(2, 3), (3, 4), (1, 1)]):
+            AttendanceSummary.objects.create(student=student, subject=self.subject, present=present, total=total)
+        self.client = APIClient()
+        self.client.force_authenticate(self.branch.hod)
+
+    def listed(self, **params):
+        response = self.client.get(reverse('api:hod_low_attendance'), params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data['data']['students']
+
+    def usns(self, **params):
+        return sorted(student['usn'] for student in self.listed(**params))
+
+    def test_threshold_is_compared_with_the_rounded_percentage(self):
+        first, second, _, no_sessions = self.students
+        self.assertEqual(self.usns(threshold=75), sorted([first.usn, no_sessions.usn]))
+        self.assertEqual(self.usns(threshold=66.67), [no_sessions.usn])
+        self.assertEqual(self.usns(threshold=66.68), sorted([first.usn, no_sessions.usn]))
+        self.assertEqual(self.usns(threshold=75.01), sorted([first.usn, second.usn, no_sessions.usn]))
+
+    def test_zero_threshold_matches_nobody(self):
+        self.assertEqual(self.usns(threshold=0), [])
+
+    def test_non_finite_threshold_is_rejected(self):
+        for threshold in ('inf', '-inf', 'nan', 'abc'):
+            response = self.client.get(reverse('api:hod_low_attendance'), {'threshold': threshold})
+            self.assertEqual(response.status_code, 400, threshold)
+
+    def test_listed_students_agree_with_their_reported_percentage(self):
+        # Ratios whose exact percentage ends in 5 in the third decimal: 3.125, 9.375, 1.5625, 6.25, 0.3125
+        _, _, _, subject, _, students = make_class(students=5)
+        self.client.force_authenticate(students[0].branch.hod)
+        for student, (present, total) in zip(students, [(1, 32), (3, 32), (1, 64), (1, 16), (1, 320)]):
+            AttendanceSummary.objects.create(student=student, subject=subject, present=present, total=total)
+
+        reported = {student['usn']: student['attendance_percentage'] for student in self.listed(threshold=100.01)}
+        self.assertEqual(reported, {
+            students[0].usn: 3.13, students[1].usn: 9.38, students[2].usn: 1.56,
+            students[3].usn: 6.25, students[4].usn: 0.31
+        })
+        for threshold in (0.31, 0.32, 1.56, 1.57, 3.12, 3.13, 3.14, 6.25, 6.26, 9.38, 9.39):
+            listed = {student['usn'] for student in self.listed(threshold=threshold)}
+            self.assertEqual(listed, {usn for usn, percentage in reported.items() if percentage < threshold}, threshold)
@@ -0,0 +1,43 @@
+from unittest import mock
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from api.models import AttendanceSheet
+from api.views import utils
+
+
+@override_settings(GOOGLE_SHEETS_FAKE=True, GOOGLE_SHEET_VERIFY_TTL=86400)
+class SheetRegistryTests(TestCase):
+    def setUp(self):
+        utils._google_services = None
+        utils._sheet_id_cache.clear()
+        utils._sheet_tab_ids.clear()
+        self.sheets, _ = utils.get_google_services()
+
+    def tearDown(self):
+        utils._google_services = None
+
+    def sheet_id(self, **kwargs):
+        return utils.get_google_sheet_id('CSE', 'Maths', 'A', 3, **kwargs)
+
+    def test_first_use_registers_the_new_sheet(self):
+        sheet_id = self.sheet_id()
+
+        self.assertEqual(AttendanceSheet.objects.get(sheet_key='CSE_Maths_A_3').sheet_id, sheet_id)
+        self.assertEqual(self.sheet_id(), sheet_id)
+        self.assertEqual(self.sheets.calls.count('create'), 1)
+
+    def test_replacement_made_by_another_process_is_reused(self):
+        old_id = self.sheet_id()
+        del self.sheets.spreadsheets_data[old_id]
+        # Another process already replaced the sheet, after this one cached the old ID
+        AttendanceSheet.objects.filter(sheet_key='CSE_Maths_A_3').update(sheet_id='replacement', verified_at=timezone.now())
+
+        with mock.patch('api.views.utils.create_google_sheet') as create:
+            self.assertEqual(utils._create_google_sheet_once('CSE', 'Maths', 'A', 3, old_id), 'replacement')
+        create.assert_not_called()
+
+    def test_failed_creation_leaves_no_registry_row(self):
+        with mock.patch('api.views.utils.create_google_sheet', return_value=None):
+            self.assertIsNone(self.sheet_id())
+
+        self.assertFalse(AttendanceSheet.objects.exists())
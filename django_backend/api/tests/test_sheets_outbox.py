@@ -0,0 +1,113 @@
+import tempfile
+from datetime import timedelta
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from api.exports import ExportBackend, GoogleSheetsExportBackend, LocalFileExportBackend
+from api.models import SheetOutboxEntry
+from api.sheets_outbox import _backoff, claim_sheet_writes, drain_sheet_outbox, enqueue_attendance_rows
+from api.views import utils
+from .factories import make_class, make_record
+
+
+class FailingBackend(ExportBackend):
+    def write(self, key, rows_by_tab):
+        raise ValueError("sheet unavailable")
+
+
+@override_settings(
+    GOOGLE_SHEETS_FAKE=True, SHEETS_OUTBOX_WORKER='command', SHEETS_OUTBOX_LEASE=300,
+    SHEETS_OUTBOX_BACKOFF_BASE=30, SHEETS_OUTBOX_BACKOFF_MAX=3600, SHEETS_OUTBOX_MAX_ATTEMPTS=3
+)
+class SheetOutboxTests(TestCase):
+    def setUp(self):
+        # A fresh fake Sheets service and empty sheet caches for every test
+        utils._google_services = None
+        utils._sheet_id_cache.clear()
+        utils._sheet_tab_ids.clear()
+        self.sheets, _ = utils.get_google_services()
+        self.branch, self.semester, self.section, self.subject, self.teacher, self.students = make_class()
+
+    def tearDown(self):
+        utils._google_services = None
+
+    def enqueue_session(self, timestamp='2024-01-01 10:00:00'):
+        record = make_record(self.branch, self.semester, self.section, self.subject, self.teacher)
+        present = [(self.students[0].name, self.students[0].usn)]
+        absent = [(student.name, student.usn) for student in self.students[1:]]
+        return enqueue_attendance_rows(record, present, absent, timestamp)
+
+    def test_sessions_for_one_sheet_are_sent_in_one_batch_update(self):
+        for day in range(1, 4):
+            self.enqueue_session(f'2024-01-0{day} 10:00:00')
+
+        self.assertEqual(drain_sheet_outbox(GoogleSheetsExportBackend()), 3)
+
+        self.assertEqual(self.sheets.calls.count('batchUpdate'), 1)
+        self.assertEqual(SheetOutboxEntry.objects.filter(status='sent').count(), 3)
+        sheet_id = utils.get_google_sheet_id(self.branch.name, self.subject.name, self.section.name, self.semester.number)
+        present_rows = self.sheets.rows(sheet_id, 'Present')
+        self.assertEqual([row[0] for row in present_rows], ['2024-01-01 10:00:00', '2024-01-02 10:00:00', '2024-01-03 10:00:00'])
+        self.assertEqual(present_rows[0][1], f"{self.students[0].name} ({self.students[0].usn})")
+
+    def test_deleted_sheet_is_recreated_and_written(self):
+        self.enqueue_session()
+        drain_sheet_outbox(GoogleSheetsExportBackend())
+        old_id = utils.get_google_sheet_id(self.branch.name, self.subject.name, self.section.name, self.semester.number)
+        del self.sheets.spreadsheets_data[old_id]
+
+        self.enqueue_session('2024-01-02 10:00:00')
+        self.assertEqual(drain_sheet_outbox(GoogleSheetsExportBackend()), 1)
+
+        new_id = utils.get_google_sheet_id(self.branch.name, self.subject.name, self.section.name, self.semester.number)
+        self.assertNotEqual(new_id, old_id)
+        self.assertEqual(len(self.sheets.rows(new_id, 'Present')), 1)
+
+    def test_claimed_entries_are_not_claimed_again_until_the_lease_expires(self):
+        entry = self.enqueue_session()
+
+        first = claim_sheet_writes()
+        self.assertEqual([e.id for e in first], [entry.id])
+        self.assertEqual(claim_sheet_writes(), [])
+
+        SheetOutboxEntry.objects.filter(id=entry.id).update(claimed_at=timezone.now() - timedelta(seconds=301))
+        reclaimed = claim_sheet_writes()
+        self.assertEqual([e.id for e in reclaimed], [entry.id])
+        self.assertNotEqual(reclaimed[0].claim_token, first[0].claim_token)
+
+    def test_failed_writes_back_off_exponentially_then_give_up(self):
+        entry = self.enqueue_session()
+
+        for attempt, delay in ((1, 30), (2, 60)):
+            before = timezone.now()
+            self.assertEqual(drain_sheet_outbox(FailingBackend()), 0)
+            entry.refresh_from_db()
+            self.assertEqual((entry.status, entry.attempts, entry.last_error), ('pending', attempt, 'sheet unavailable'))
+            self.assertGreaterEqual(entry.next_attempt_at, before + timedelta(seconds=delay))
+            # Not due yet, so nothing is claimed until the backoff has passed
+            self.assertEqual(claim_sheet_writes(), [])
+            SheetOutboxEntry.objects.filter(id=entry.id).update(next_attempt_at=timezone.now())
+
+        drain_sheet_outbox(FailingBackend())
+        entry.refresh_from_db()
+        self.assertEqual((entry.status, entry.attempts), ('failed', 3))
+
+    def test_backoff_is_capped(self):
+        self.assertEqual(_backoff(1), timedelta(seconds=30))
+        self.assertEqual(_backoff(4), timedelta(seconds=240))
+        self.assertEqual(_backoff(20), timedelta(seconds=3600))
+
+    def test_failed_flush_leaves_entries_pending_and_nothing_buffered(self):
+        self.enqueue_session()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        backend = LocalFileExportBackend(directory.name, 'csv', buffer_rows=1000)
+
+        def fail(*args):
+            raise OSError("disk full")
+        backend._write_csv = fail
+
+        self.assertEqual(drain_sheet_outbox(backend), 0)
+
+        entry = SheetOutboxEntry.objects.get()
+        self.assertEqual((entry.status, entry.attempts), ('pending', 1))
+        self.assertEqual(backend._buffered, 0)
@@ -0,0 +1,57 @@
+from unittest import mock
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from api.models import AttendanceDetail, AttendanceRecord, SheetOutboxEntry
+from .factories import make_class
+
+
+@override_settings(SHEETS_OUTBOX_WORKER='command', ATTENDANCE_JOB_WORKER='command')
+class IdempotentAttendanceTests(TestCase):
+    def setUp(self):
+        self.branch, self.semester, self.section, self.subject, self.teacher, self.students = make_class()
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+        self.fields = {
+            'branch_id': self.branch.id, 'semester_id': self.semester.id,
+            'section_id': self.section.id, 'subject_id': self.subject.id
+        }
+
+    def submit_manual(self, key, present):
+        attendance = [{'student_id': student.id, 'status': student in present} for student in self.students]
+        return self.client.post(reverse('api:take_attendance'), {**self.fields, 'method': 'manual', 'attendance': attendance},
+                                format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_replay_returns_the_original_record(self):
+        first = self.submit_manual('retry-1', present=self.students[:1])
+        # The retry carries different data; the stored session wins
+        replay = self.submit_manual('retry-1', present=self.students)
+
+        self.assertEqual(first.status_code, 200, first.data)
+        self.assertEqual(replay.status_code, 200, replay.data)
+        self.assertEqual(replay.data['data']['record_id'], first.data['data']['record_id'])
+        self.assertEqual(AttendanceRecord.objects.count(), 1)
+        self.assertEqual(AttendanceDetail.objects.filter(status=True).count(), 1)
+        self.assertEqual(SheetOutboxEntry.objects.count(), 1)
+
+    def test_a_new_key_records_a_new_session(self):
+        self.submit_manual('retry-1', present=self.students[:1])
+        self.submit_manual('retry-2', present=self.students[:1])
+
+        self.assertEqual(AttendanceRecord.objects.count(), 2)
+
+    def test_ai_replay_skips_recognition(self):
+        def submit():
+            photo = SimpleUploadedFile('class.jpg', b'photo', content_type='image/jpeg')
+            return self.client.post(reverse('api:take_attendance'), {**self.fields, 'method': 'ai', 'class_images': [photo]},
+                                    HTTP_IDEMPOTENCY_KEY='ai-1')
+
+        with mock.patch('api.views.faculty_views.recognize_present_students', return_value={self.students[0].id}) as recognize:
+            first = submit()
+            replay = submit()
+
+        self.assertEqual(first.status_code, 200, first.data)
+        self.assertEqual(replay.data['data']['record_id'], first.data['data']['record_id'])
+        self.assertEqual(recognize.call_count, 1)
+        self.assertEqual(AttendanceRecord.objects.count(), 1)
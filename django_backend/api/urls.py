@@ -33,6 +33,8 @@ urlpatterns = [
     # Faculty endpoints
     path('faculty/dashboard/', faculty_views.dashboard_overview, name='faculty_dashboard'),
     path('faculty/take-attendance/', faculty_views.take_attendance, name='take_attendance'),
+    path('faculty/attendance-jobs/<int:job_id>/', faculty_views.attendance_job_status, name='attendance_job_status'),
+    path('faculty/identify-students/', faculty_views.identify_students, name='identify_students'),
     path('faculty/upload-marks/', faculty_views.upload_internal_marks, name='upload_internal_marks'),
     path('faculty/apply-leave/', faculty_views.apply_leave, name='apply_leave'),
     path('faculty/attendance-records/', faculty_views.view_attendance_records, name='view_attendance_records'),
@@ -45,6 +47,8 @@ urlpatterns = [
     path('faculty/schedule-mentoring/', faculty_views.schedule_mentoring, name='schedule_mentoring'),
     path('faculty/generate-statistics/', faculty_views.generate_statistics, name='generate_statistics'),
     path('faculty/download-pdf/<str:filename>/', faculty_views.download_pdf, name='download_pdf'),
+    path('faculty/reports/', faculty_views.request_report, name='request_report'),
+    path('faculty/reports/<int:job_id>/', faculty_views.report_job_status, name='report_job_status'),
 
     # HOD endpoints
     path('hod/dashboard-stats/', hod_views.dashboard_stats, name='hod_stats'),
@@ -66,6 +70,7 @@ urlpatterns = [
 
     # Admin endpoints
     path('admin/stats-overview/', admin_views.stats_overview, name='admin_stats_overview'),
+    path('admin/dashboard-cache/', admin_views.dashboard_cache_status, name='admin_dashboard_cache'),
     path('admin/enroll-user/', admin_views.enroll_user, name='admin_enroll_user'),
     path('admin/bulk-upload-faculty/', admin_views.bulk_upload_faculty, name='admin_bulk_upload_faculty'),
     path('admin/branches/', admin_views.manage_branches, name='admin_manage_branches'),
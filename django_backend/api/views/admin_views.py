@@ -2,7 +2,7 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework import status
 from ..permissions import IsAdmin
-from ..models import User, Branch, Student, Subject, Semester, Section, LeaveRequest, GenericNotification
+from ..models import User, Branch, Subject, Semester, Section, LeaveRequest, GenericNotification
 import logging
 from django.contrib.auth.hashers import make_password
 from django.utils import timezone
@@ -12,6 +12,7 @@ import re
 from datetime import datetime, timedelta
 from calendar import monthrange
 from uuid import uuid4
+from ..dashboard import cached_dashboard, dashboard_cache_stats, reset_dashboard_cache_stats, system_stats, stats_history
 
 logger = logging.getLogger(__name__)
 
@@ -19,33 +20,32 @@ logger = logging.getLogger(__name__)
 @api_view(['GET'])
 @permission_classes([IsAdmin])
 def stats_overview(request):
+    """System totals; ``history=<days>`` adds daily snapshots recorded by snapshot_stats."""
     try:
-        total_students = Student.objects.count()
-        total_faculty = User.objects.filter(role='teacher').count()
-        total_hods = User.objects.filter(role='hod').count()
-        total_branches = Branch.objects.count()
-        branch_distribution = [
-            {'name': b.name, 'students': b.students.count(), 'faculty': b.faculty_assignments.count()}
-            for b in Branch.objects.all()
-        ]
-        data = {
-            'total_students': total_students,
-            'total_faculty': total_faculty,
-            'total_hods': total_hods,
-            'total_branches': total_branches,
-            'branch_distribution': branch_distribution,
-            'role_distribution': {
-                'students': total_students,
-                'faculty': total_faculty,
-                'hods': total_hods,
-                'admins': User.objects.filter(role='admin').count()
-            }
-        }
+        history_days = int(request.query_params.get('history', 0))
+    except ValueError:
+        return Response({'success': False, 'message': 'history must be a number of days'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        data = cached_dashboard('admin_stats', ['global'], ['admin'], system_stats)
+        if history_days > 0:
+            data = dict(data, history=stats_history(min(history_days, 366)))
         return Response({'success': True, 'data': data}, status=status.HTTP_200_OK)
     except Exception as e:
         logger.error(f"Error fetching stats: {str(e)}")
         return Response({'success': False, 'message': f'Error: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@api_view(['GET', 'DELETE'])
+@permission_classes([IsAdmin])
+def dashboard_cache_status(request):
+    """Hit/miss counters of the dashboard cache; DELETE resets them."""
+    try:
+        if request.method == 'DELETE':
+            reset_dashboard_cache_stats()
+        return Response({'success': True, 'data': dashboard_cache_stats()}, status=status.HTTP_200_OK)
+    except Exception as e:
+        logger.error(f"Error fetching dashboard cache stats: {str(e)}")
+        return Response({'success': False, 'message': f'Error: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
 # 2. User Enrollment (Manual HOD/Faculty)
 @api_view(['POST'])
 @permission_classes([IsAdmin])
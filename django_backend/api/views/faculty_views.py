@@ -6,20 +6,30 @@ from ..permissions import IsTeacher
 from ..models import (
     User, Student, Subject, Semester, Section, LeaveRequest, StudentLeaveRequest,
     FacultyAssignment, Branch, Timetable, InternalMark, Announcement, ChatChannel,
-    ChatMessage, Notification
+    ChatMessage, Notification, AttendanceRecord, AttendanceDetail, AttendanceJob, ReportJob
 )
 import logging
+from django.conf import settings
 from django.utils import timezone
-from django.db.models import Avg, Count ,  Q
+from django.db import IntegrityError, transaction
+from django.db.models import Avg, Count ,  Q, F, FloatField, IntegerField, OuterRef, Prefetch, Subquery, Window
+from django.db.models.functions import Cast, Coalesce, RowNumber
+from django.core.paginator import Paginator
 from datetime import datetime, timedelta
+from dateutil.parser import parse
 import pandas as pd
 import os
-import cv2
-import numpy as np
 from django.core.files.storage import default_storage
 from django.core.exceptions import ValidationError
 from django.core.validators import FileExtensionValidator
-from .utils import get_google_sheet_id, update_attendance_in_sheet, compute_face_distance, is_same_person , validate_image_size
+from .utils import validate_image_size, extract_face_encodings
+from ..dashboard import cached_dashboard
+from ..face_index import get_branch_index
+from ..reports import get_record_report, report_path, create_report_job, enqueue_report_job
+from ..attendance import (
+    recognize_present_students, mark_ai_attendance, mark_manual_attendance, publish_attendance,
+    create_attendance_job, enqueue_attendance_job, delete_job_images
+)
 
 logger = logging.getLogger(__name__)
 
@@ -31,34 +41,37 @@ def dashboard_overview(request):
         today = timezone.now().date()
         assignments = FacultyAssignment.objects.filter(faculty=faculty).select_related('branch', 'semester', 'section', 'subject')
         
-        # Today's classes
-        classes = Timetable.objects.filter(
-            faculty_assignment__faculty=faculty,
-            day=timezone.now().strftime('%a').upper()[:3]
-        ).select_related('faculty_assignment__subject', 'faculty_assignment__section')
-        classes_data = [
-            {
-                'subject': t.faculty_assignment.subject.name,
-                'section': t.faculty_assignment.section.name,
-                'start_time': t.start_time.strftime('%H:%M'),
-                'end_time': t.end_time.strftime('%H:%M'),
-                'room': t.room
-            } for t in classes
-        ]
+        def compute():
+            # Today's classes
+            classes = Timetable.objects.filter(
+                faculty_assignment__faculty=faculty,
+                day=timezone.now().strftime('%a').upper()[:3]
+            ).select_related('faculty_assignment__subject', 'faculty_assignment__section')
+            classes_data = [
+                {
+                    'subject': t.faculty_assignment.subject.name,
+                    'section': t.faculty_assignment.section.name,
+                    'start_time': t.start_time.strftime('%H:%M'),
+                    'end_time': t.end_time.strftime('%H:%M'),
+                    'room': t.room
+                } for t in classes
+            ]
+            
+            # Attendance snapshot
+            attendance_avg = AttendanceDetail.objects.filter(
+                record__assignment__faculty=faculty,
+                record__date__gte=today - timedelta(days=30)
+            ).aggregate(avg=Avg('status'))['avg'] or 0
+            return {'today_classes': classes_data, 'attendance_snapshot': round(attendance_avg * 100, 2)}
         
-        # Attendance snapshot
-        attendance_avg = AttendanceDetail.objects.filter(
-            record__assignment__faculty=faculty,
-            record__date__gte=today - timedelta(days=30)
-        ).aggregate(avg=Avg('status'))['avg'] or 0
-        attendance_avg = round(attendance_avg * 100, 2)
+        data = cached_dashboard('faculty_dashboard', [f"user:{faculty.id}"], ['teacher', faculty.id, today], compute)
         
         logger.info("Dashboard overview retrieved for %s", faculty.username)
         return Response({
             'success': True,
             'data': {
-                'today_classes': classes_data,
-                'attendance_snapshot': attendance_avg,
+                'today_classes': data['today_classes'],
+                'attendance_snapshot': data['attendance_snapshot'],
                 'quick_actions': ['take_attendance', 'upload_marks', 'apply_leave']
             }
         }, status=status.HTTP_200_OK)
@@ -77,14 +90,32 @@ def take_attendance(request):
     section_id = request.data.get('section_id')
     semester_id = request.data.get('semester_id')
     method = request.data.get('method')  # 'manual' or 'ai'
+    run_async = str(request.data.get('async', '')).lower() in ('1', 'true', 'yes')  # AI only: queue a job and return its id
     files = request.FILES.getlist('class_images') if method == 'ai' else []
     manual_attendance = request.data.get('attendance', [])  # List of {'student_id': id, 'status': bool}
+    # Client-generated key (e.g. a UUID per submission); a retry with the same key returns the original result
+    idempotency_key = request.headers.get('Idempotency-Key') or request.data.get('idempotency_key')
     
     if not all([branch_id, subject_id, section_id, semester_id, method]):
         return Response({
             'success': False,
             'message': 'All fields required'
         }, status=status.HTTP_400_BAD_REQUEST)
+    if method == 'ai' and not files:
+        return Response({
+            'success': False,
+            'message': 'Images required for AI attendance'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    if method != 'ai' and not manual_attendance:
+        return Response({
+            'success': False,
+            'message': 'Attendance data required for manual method'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    if idempotency_key and len(idempotency_key) > 64:
+        return Response({
+            'success': False,
+            'message': 'Idempotency key must be at most 64 characters'
+        }, status=status.HTTP_400_BAD_REQUEST)
     
     try:
         branch = Branch.objects.get(id=branch_id)
@@ -110,119 +141,58 @@ def take_attendance(request):
                 'message': 'Not assigned to this class'
             }, status=status.HTTP_403_FORBIDDEN)
         
-        attendance_record = AttendanceRecord.objects.create(
-            branch=branch,
-            semester=semester,
-            section=section,
-            subject=subject,
-            faculty=faculty,
-            assignment=FacultyAssignment.objects.get(
-                faculty=faculty, branch=branch, semester=semester, section=section, subject=subject
-            ),
-            status='completed',
-            date=timezone.now()
-        )
+        if idempotency_key:
+            existing = AttendanceRecord.objects.filter(faculty=faculty, idempotency_key=idempotency_key).first()
+            if existing:
+                logger.info("Replaying attendance submission %s for %s", idempotency_key, faculty.username)
+                return _attendance_submission_response(existing)
         
-        students = Student.objects.filter(branch=branch, semester=semester, section=section)
-        present_students = set()
-        absent_students = set()
+        if method == 'ai' and not run_async:
+            # Recognize before opening the transaction so it is held only for the writes
+            present_ids = recognize_present_students(branch.id, semester.id, section.id, [file.read() for file in files])
         
-        if method == 'ai':
-            if not files:
-                return Response({
-                    'success': False,
-                    'message': 'Images required for AI attendance'
-                }, status=status.HTTP_400_BAD_REQUEST)
-            
-            for file in files:
-                img_bytes = file.read()
-                nparr = np.frombuffer(img_bytes, np.uint8)
-                img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-                gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-                
-                try:
-                    # Detect faces using DLib
-                    from .utils import face_detector, shape_predictor, face_recognizer
-                    if not face_detector:
-                        raise ValueError("Face recognition models not initialized")
-                    
-                    faces = face_detector(gray)
-                    if not faces:
-                        continue
-                        
-                    for face in faces:
-                        shape = shape_predictor(img, face)
-                        face_encoding = np.array(face_recognizer.compute_face_descriptor(img, shape))
-                        
-                        # Match against student encodings
-                        for student in students:
-                            student_encodings = student.get_face_encodings()
-                            if student_encodings and is_same_person(student_encodings, face_encoding, threshold=0.4):
-                                present_students.add(student.id)
-                except Exception as e:
-                    logger.warning("AI face recognition failed for image: %s", str(e))
-                    continue
-            
-            # Mark attendance
-            for student in students:
-                status = student.id in present_students
-                AttendanceDetail.objects.create(
-                    record=attendance_record,
-                    student=student,
-                    status=status
+        # Record and details are written together or not at all
+        job = None
+        try:
+            with transaction.atomic():
+                attendance_record = AttendanceRecord.objects.create(
+                    branch=branch,
+                    semester=semester,
+                    section=section,
+                    subject=subject,
+                    faculty=faculty,
+                    assignment=FacultyAssignment.objects.get(
+                        faculty=faculty, branch=branch, semester=semester, section=section, subject=subject
+                    ),
+                    status='pending' if method == 'ai' and run_async else 'completed',
+                    date=timezone.now(),
+                    idempotency_key=idempotency_key or None
                 )
-                if status:
-                    present_students.add((student.name, student.usn))
-                else:
-                    absent_students.add((student.name, student.usn))
-                    
-        else:  # Manual method
-            if not manual_attendance:
-                return Response({
-                    'success': False,
-                    'message': 'Attendance data required for manual method'
-                }, status=status.HTTP_400_BAD_REQUEST)
-            
-            valid_student_ids = set(students.values_list('id', flat=True))
-            for entry in manual_attendance:
-                student_id = entry.get('student_id')
-                status_val = entry.get('status')
-                if student_id not in valid_student_ids:
-                    continue
-                student = students.get(id=student_id)
-                if student:
-                    AttendanceDetail.objects.create(
-                        record=attendance_record,
-                        student=student,
-                        status=status_val
-                    )
-                    if status_val:
-                        present_students.add((student.name, student.usn))
-                    else:
-                        absent_students.add((student.name, student.usn))
-        
-        # Google Sheets integration
-        sheet_id = get_google_sheet_id(branch.name, subject.name, section.name, semester.number)
-        if sheet_id:
-            update_attendance_in_sheet(
-                sheet_id,
-                [(name, usn) for name, usn in present_students if isinstance(name, str)],
-                [(name, usn) for name, usn in absent_students if isinstance(name, str)],
-                timezone.now().strftime('%Y-%m-%d %H:%M:%S')
-            )
-        
-        # Notify students
-        Notification.objects.create(
-            title="Attendance Recorded",
-            message=f"Attendance taken for {subject.name} ({section.name}) by {faculty.username}",
-            target_role='student',
-            created_by=faculty
-        )
+                
+                if method == 'ai' and run_async:
+                    job = create_attendance_job(attendance_record, files)
+                    transaction.on_commit(lambda: enqueue_attendance_job(job.id))
+                elif method == 'ai':
+                    present_students, absent_students = mark_ai_attendance(attendance_record, present_ids)
+                else:  # Manual method
+                    present_students, absent_students = mark_manual_attendance(attendance_record, manual_attendance)
+                if method != 'ai' or not run_async:
+                    # Sheet rows go to the outbox in the same transaction; students are notified
+                    publish_attendance(attendance_record, present_students, absent_students)
+        except IntegrityError:
+            if job is not None:
+                delete_job_images(job)  # the job row was rolled back with the record
+            # A concurrent retry with the same key won the race; return its result
+            existing = AttendanceRecord.objects.filter(faculty=faculty, idempotency_key=idempotency_key).first() if idempotency_key else None
+            if not existing:
+                raise
+            return _attendance_submission_response(existing)
+        except Exception:
+            if job is not None:
+                delete_job_images(job)
+            raise
         
-        return Response({
-            'success': True,
-            'message': 'Attendance recorded successfully'
-        }, status=status.HTTP_200_OK)
+        return _attendance_submission_response(attendance_record)
     
     except Branch.DoesNotExist:
         return Response({
@@ -256,6 +226,130 @@ def take_attendance(request):
             'message': 'Failed to record attendance. Try manual method.'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+def _attendance_submission_response(record):
+    """Response for a stored submission, shared by first attempts and idempotent retries."""
+    job = AttendanceJob.objects.filter(record=record).first()
+    if job:
+        return Response({
+            'success': True,
+            'message': 'Attendance job queued',
+            'data': {
+                'job_id': str(job.id),
+                'record_id': str(record.id),
+                'status': job.status
+            }
+        }, status=status.HTTP_202_ACCEPTED)
+    return Response({
+        'success': True,
+        'message': 'Attendance recorded successfully',
+        'data': {
+            'record_id': str(record.id)
+        }
+    }, status=status.HTTP_200_OK)
+
+@api_view(['GET'])
+@permission_classes([IsTeacher])
+def attendance_job_status(request, job_id):
+    try:
+        job = AttendanceJob.objects.select_related('record').get(id=job_id, record__faculty=request.user)
+        data = {
+            'job_id': str(job.id),
+            'record_id': str(job.record_id),
+            'status': job.status,
+            'record_status': job.record.status,
+            'created_at': job.created_at,
+            'finished_at': job.finished_at,
+            'error': job.error
+        }
+        if job.status == 'completed':
+            counts = job.record.details.aggregate(total=Count('id'), present=Count('id', filter=Q(status=True)))
+            data['present_count'] = counts['present']
+            data['absent_count'] = counts['total'] - counts['present']
+        return Response({
+            'success': True,
+            'data': data
+        }, status=status.HTTP_200_OK)
+    except AttendanceJob.DoesNotExist:
+        return Response({
+            'success': False,
+            'message': 'Job not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+    except Exception as e:
+        logger.error("Error getting attendance job status: %s", str(e))
+        return Response({
+            'success': False,
+            'message': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@api_view(['POST'])
+@permission_classes([IsTeacher])
+def identify_students(request):
+    """Nearest enrolled students in the whole branch for each face in the photos, e.g. for mixed-section labs."""
+    branch_id = request.data.get('branch_id')
+    files = request.FILES.getlist('class_images')
+    if not branch_id or not files:
+        return Response({
+            'success': False,
+            'message': 'Branch ID and images required'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    if not getattr(settings, 'FACE_INDEX_ENABLED', False):
+        return Response({
+            'success': False,
+            'message': 'Branch-wide face search is not enabled'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        k = min(max(int(request.data.get('k', 3)), 1), 10)
+    except ValueError:
+        return Response({
+            'success': False,
+            'message': 'k must be a number'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        if not FacultyAssignment.objects.filter(faculty=request.user, branch_id=branch_id).exists():
+            return Response({
+                'success': False,
+                'message': 'Not assigned to this branch'
+            }, status=status.HTTP_403_FORBIDDEN)
+        index = get_branch_index(int(branch_id))
+        if index is None:
+            return Response({
+                'success': False,
+                'message': 'Face index is being built; try again shortly'
+            }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        
+        encodings = extract_face_encodings([file.read() for file in files])
+        ids, distances = index.search(encodings, k=k)
+        students = Student.objects.filter(id__in={int(i) for i in ids.ravel() if i >= 0}).select_related('semester', 'section')
+        student_map = {student.id: student for student in students}
+        faces = []
+        for face_ids, face_distances in zip(ids, distances):
+            faces.append({
+                'candidates': [
+                    {
+                        'student_id': str(student_id),
+                        'name': student_map[student_id].name,
+                        'usn': student_map[student_id].usn,
+                        'semester': student_map[student_id].semester.number,
+                        'section': student_map[student_id].section.name,
+                        'distance': round(float(distance), 4),
+                        'match': bool(distance < 0.4)  # same threshold as AI attendance
+                    } for student_id, distance in zip(face_ids.tolist(), face_distances.tolist()) if student_id in student_map
+                ]
+            })
+        return Response({
+            'success': True,
+            'data': {
+                'faces': faces
+            }
+        }, status=status.HTTP_200_OK)
+    except Exception as e:
+        logger.error("Error identifying students: %s", str(e))
+        return Response({
+            'success': False,
+            'message': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
 @api_view(['POST'])
 @permission_classes([IsTeacher])
 def upload_internal_marks(request):
@@ -425,16 +519,15 @@ def view_attendance_records(request):
                 'message': 'Not assigned to this class'
             }, status=status.HTTP_403_FORBIDDEN)
         
-        records = AttendanceRecord.objects.filter(
-            branch=branch, semester=semester, section=section, subject=subject, faculty=faculty
-        ).select_related('section', 'subject')
+        # Only this faculty member's sessions, for every student that attended them;
+        # AttendanceSummary has no per-faculty counts, so this one reads the details
         stats = AttendanceDetail.objects.filter(
-            record__in=records
+            record__branch=branch, record__semester=semester, record__section=section,
+            record__subject=subject, record__faculty=faculty
         ).values('student__name', 'student__usn').annotate(
             total=Count('id'),
-            present=Count('id', filter=Q(status=True)),
-            percentage=Avg('status') * 100
-        )
+            present=Count('id', filter=Q(status=True))
+        ).order_by('student__usn')
         
         return Response({
             'success': True,
@@ -444,7 +537,7 @@ def view_attendance_records(request):
                     'usn': s['student__usn'],
                     'total_sessions': s['total'],
                     'present': s['present'],
-                    'percentage': round(s['percentage'], 2)
+                    'percentage': round(s['present'] / s['total'] * 100, 2)
                 } for s in stats
             ]
         }, status=status.HTTP_200_OK)
@@ -513,22 +606,52 @@ def create_announcement(request):
 @api_view(['GET'])
 @permission_classes([IsTeacher])
 def get_proctor_students(request):
+    """Proctees with their 30-day attendance and latest pending leave; optional ``page``/``page_size``."""
+    try:
+        page = int(request.query_params['page']) if 'page' in request.query_params else None
+        page_size = min(int(request.query_params.get('page_size', 50)), 500)
+    except ValueError:
+        return Response({
+            'success': False,
+            'message': 'page and page_size must be numbers'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    if page is not None and (page < 1 or page_size < 1):
+        return Response({
+            'success': False,
+            'message': 'Invalid page'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
     try:
         faculty = request.user
-        students = Student.objects.filter(proctor=faculty).select_related('branch', 'semester', 'section')
+        # A rolling 30-day window, which AttendanceSummary's lifetime counts cannot answer
+        recent_attendance = AttendanceDetail.objects.filter(
+            student=OuterRef('pk'),
+            record__date__gte=timezone.now().date() - timedelta(days=30)
+        ).order_by().values('student').annotate(avg=Avg(Cast('status', IntegerField()))).values('avg')
+        latest_pending = StudentLeaveRequest.objects.filter(status='PENDING').annotate(
+            rank=Window(RowNumber(), partition_by=[F('student_id')], order_by=F('submitted_at').desc())
+        ).filter(rank=1)
+        students = Student.objects.filter(proctor=faculty).select_related('user').annotate(
+            attendance=Coalesce(Subquery(recent_attendance, output_field=FloatField()), 0.0)
+        ).prefetch_related(
+            Prefetch('user__student_leave_requests', queryset=latest_pending, to_attr='latest_pending_leaves')
+        ).only('name', 'usn', 'user').order_by('usn')
+        
+        pagination = None
+        if page is not None:
+            paginator = Paginator(students, page_size)
+            page = min(page, paginator.num_pages)
+            students = paginator.page(page).object_list
+            pagination = {'page': page, 'page_size': page_size, 'total_pages': paginator.num_pages, 'count': paginator.count}
+        
         student_data = []
         for s in students:
-            attendance = AttendanceDetail.objects.filter(
-                student=s,
-                record__date__gte=timezone.now().date() - timedelta(days=30)
-            ).aggregate(avg=Avg('status'))['avg'] or 0
-            leave = StudentLeaveRequest.objects.filter(
-                student=s, status='PENDING'
-            ).order_by('-submitted_at').first()
+            leaves = s.user.latest_pending_leaves if s.user else []
+            leave = leaves[0] if leaves else None
             student_data.append({
                 'name': s.name,
                 'usn': s.usn,
-                'attendance': round(attendance * 100, 2),
+                'attendance': round(s.attendance * 100, 2),
                 'latest_request': {
                     'id': str(leave.id),
                     'start_date': leave.start_date.strftime('%Y-%m-%d'),
@@ -536,10 +659,13 @@ def get_proctor_students(request):
                 } if leave else None
             })
         
-        return Response({
+        response = {
             'success': True,
             'data': student_data
-        }, status=status.HTTP_200_OK)
+        }
+        if pagination:
+            response['pagination'] = pagination
+        return Response(response, status=status.HTTP_200_OK)
     except Exception as e:
         logger.error("Error getting proctor students: %s", str(e))
         return Response({
@@ -895,12 +1021,10 @@ def generate_statistics(request):
     
     try:
         record = AttendanceRecord.objects.get(id=file_id, faculty=request.user)
-        stats = AttendanceDetail.objects.filter(record=record).values('student__name').annotate(
+        stats = list(AttendanceDetail.objects.filter(record=record).values('student__name').annotate(
             percentage=Avg('status') * 100
-        )
-        pdf_filename = f"stats_{record.subject.name}_{record.date.strftime('%Y%m%d')}.pdf"
-        pdf_path = os.path.join(settings.MEDIA_ROOT, pdf_filename)
-        generate_pdf({s['student__name']: (0, s['percentage']) for s in stats}, pdf_path, record)
+        ))
+        pdf_filename = get_record_report(record, {s['student__name']: (0, s['percentage']) for s in stats})
         
         return Response({
             'success': True,
@@ -924,10 +1048,91 @@ def generate_statistics(request):
 @api_view(['GET'])
 @permission_classes([IsTeacher])
 def download_pdf(request, filename):
-    file_path = os.path.join(settings.MEDIA_ROOT, filename)
-    if os.path.exists(file_path):
+    file_path = report_path(filename)
+    # Report job output is only served to the faculty member who requested it
+    is_own_report = not filename.startswith('report_') or ReportJob.objects.filter(filename=filename, requested_by=request.user).exists()
+    if is_own_report and os.path.exists(file_path):
         return FileResponse(open(file_path, 'rb'), as_attachment=True, filename=filename)
     return Response({
         'success': False,
         'message': 'File not found'
-    }, status=status.HTTP_404_NOT_FOUND)
\ No newline at end of file
+    }, status=status.HTTP_404_NOT_FOUND)
+
+@api_view(['POST'])
+@permission_classes([IsTeacher])
+def request_report(request):
+    branch_id = request.data.get('branch_id')
+    if not branch_id:
+        return Response({
+            'success': False,
+            'message': 'Branch ID required'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    params = {'branch_id': branch_id}
+    for field in ('semester_id', 'section_id', 'subject_id', 'start_date', 'end_date'):
+        if request.data.get(field):
+            params[field] = request.data.get(field)
+    
+    try:
+        for field in ('start_date', 'end_date'):
+            if field in params:
+                params[field] = parse(params[field]).date().isoformat()
+        # The job only counts classes the teacher is assigned to, so a broader scope is narrowed, not widened
+        assignment_filters = {key: value for key, value in params.items() if key.endswith('_id')}
+        if not FacultyAssignment.objects.filter(faculty=request.user, **assignment_filters).exists():
+            return Response({
+                'success': False,
+                'message': 'Not assigned to this scope'
+            }, status=status.HTTP_403_FORBIDDEN)
+        
+        job = create_report_job(request.user, params)
+        transaction.on_commit(lambda: enqueue_report_job(job.id))
+        return Response({
+            'success': True,
+            'message': 'Report queued',
+            'data': {
+                'job_id': str(job.id),
+                'status': job.status
+            }
+        }, status=status.HTTP_202_ACCEPTED)
+    except (ValueError, OverflowError):
+        return Response({
+            'success': False,
+            'message': 'Invalid date format'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        logger.error("Error queuing report: %s", str(e))
+        return Response({
+            'success': False,
+            'message': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@api_view(['GET'])
+@permission_classes([IsTeacher])
+def report_job_status(request, job_id):
+    try:
+        job = ReportJob.objects.get(id=job_id, requested_by=request.user)
+        data = {
+            'job_id': str(job.id),
+            'status': job.status,
+            'progress': job.progress,
+            'created_at': job.created_at,
+            'finished_at': job.finished_at,
+            'error': job.error
+        }
+        if job.status == 'completed':
+            data['pdf_url'] = f"/api/faculty/download-pdf/{job.filename}"
+        return Response({
+            'success': True,
+            'data': data
+        }, status=status.HTTP_200_OK)
+    except ReportJob.DoesNotExist:
+        return Response({
+            'success': False,
+            'message': 'Job not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+    except Exception as e:
+        logger.error("Error getting report job status: %s", str(e))
+        return Response({
+            'success': False,
+            'message': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -4,22 +4,25 @@ from rest_framework.response import Response
 from ..permissions import IsHOD, IsTeacherOrHOD
 from ..models import (
     AttendanceRecord, LeaveRequest, Student, FacultyAssignment, Branch, User,
-    Timetable, InternalMark, Announcement, AttendanceDetail, Notification,
-    Semester, Section, Subject, ChatChannel, ChatMessage, GenericNotification
+    Timetable, InternalMark, Announcement, Notification,
+    Semester, Section, Subject, ChatChannel, ChatMessage, GenericNotification, AttendanceSummary
 )
 import os
+import math
 from django.conf import settings
 import logging
 from django.utils import timezone
-from django.db.models import Count, Q
+from django.db.models import Q, Sum, F, Value, FloatField
+from django.db.models.functions import Cast, Coalesce, NullIf
+from django.core.paginator import Paginator
 from rest_framework import status
 from django.db import IntegrityError
-from datetime import timedelta
-from django.utils.timezone import now
 from django.core.files.storage import default_storage
 from django.core.exceptions import ValidationError
 from django.core.validators import FileExtensionValidator
-from .utils import validate_image_size
+from .utils import validate_image_size, invalidate_section_gallery
+from ..dashboard import TREND_PERIODS, branch_dashboard_stats
+from ..attendance import attendance_percentage, low_attendance_cutoff
 
 logger = logging.getLogger(__name__)
 
@@ -41,42 +44,23 @@ def create_notification(recipient=None, message=None):
 @api_view(['GET'])
 @permission_classes([IsHOD])
 def dashboard_stats(request):
-    """Get HOD dashboard statistics."""
+    """Get HOD dashboard statistics; ``period`` (day, week, month) and ``buckets`` shape the trend."""
+    period = request.query_params.get('period', 'week')
+    if period not in TREND_PERIODS:
+        return Response({'success': False, 'message': 'period must be day, week or month'}, status=status.HTTP_400_BAD_REQUEST)
+    _, default_buckets, max_buckets = TREND_PERIODS[period]
+    try:
+        buckets = int(request.query_params.get('buckets', default_buckets))
+    except ValueError:
+        return Response({'success': False, 'message': 'buckets must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+    if not 1 <= buckets <= max_buckets:
+        return Response({'success': False, 'message': f'buckets must be between 1 and {max_buckets}'}, status=status.HTTP_400_BAD_REQUEST)
     try:
         hod = request.user
         branch = Branch.objects.get(hod=hod)
-        faculty_count = User.objects.filter(role='teacher', teaching_assignments__branch=branch).distinct().count()
-        student_count = Student.objects.filter(branch=branch).count()
-        pending_leaves = LeaveRequest.objects.filter(branch=branch, status='PENDING').count()
-        attendance_stats = AttendanceDetail.objects.filter(record__branch=branch).aggregate(
-            total=Count('id'), present=Count('id', filter=Q(status=True))
-        )
-        avg_attendance = round((attendance_stats['present'] / attendance_stats['total']) * 100, 2) if attendance_stats['total'] > 0 else 0
-        trend = []
-        today = now().date()
-        for weeks_ago in range(4):
-            start_date = today - timedelta(days=(weeks_ago + 1) * 7)
-            end_date = today - timedelta(days=weeks_ago * 7)
-            weekly_stats = AttendanceDetail.objects.filter(
-                record__branch=branch, record__date__range=[start_date, end_date]
-            ).aggregate(total=Count('id'), present=Count('id', filter=Q(status=True)))
-            percentage = round((weekly_stats['present'] / weekly_stats['total']) * 100, 2) if weekly_stats['total'] > 0 else 0
-            trend.append({
-                'week': f"Week {4 - weeks_ago}",
-                'start_date': start_date.strftime('%Y-%m-%d'),
-                'end_date': end_date.strftime('%Y-%m-%d'),
-                'attendance_percentage': percentage
-            })
-        trend.reverse()
         return Response({
             'success': True,
-            'data': {
-                'faculty_count': faculty_count,
-                'student_count': student_count,
-                'pending_leaves': pending_leaves,
-                'average_attendance': avg_attendance,
-                'attendance_trend': trend
-            }
+            'data': branch_dashboard_stats(branch, hod, period, buckets)
         })
     except Branch.DoesNotExist:
         return Response({'success': False, 'message': 'Branch not assigned'}, status=status.HTTP_404_NOT_FOUND)
@@ -84,33 +68,91 @@ def dashboard_stats(request):
         logger.error("Error in dashboard_stats: %s", str(e))
         return Response({'success': False, 'message': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+LOW_ATTENDANCE_SORTS = {
+    'percentage': ('attendance_ratio', 'usn'),
+    '-percentage': ('-attendance_ratio', 'usn'),
+    'usn': ('usn',),
+}
+
+
 @api_view(['GET'])
 @permission_classes([IsHOD])
 def low_attendance_students(request):
-    """List students with low attendance."""
-    threshold = float(request.query_params.get('threshold', 75))
+    """List students with low attendance.
+
+    Optional query params: ``sort`` (percentage, -percentage or usn),
+    ``page``/``page_size`` and ``breakdown=subject`` for per-subject counts.
+    """
+    try:
+        threshold = float(request.query_params.get('threshold', 75))
+        page = int(request.query_params['page']) if 'page' in request.query_params else None
+        page_size = min(int(request.query_params.get('page_size', 50)), 500)
+    except ValueError:
+        return Response({'success': False, 'message': 'threshold, page and page_size must be numbers'}, status=status.HTTP_400_BAD_REQUEST)
+    if not math.isfinite(threshold):
+        return Response({'success': False, 'message': 'threshold must be a finite number'}, status=status.HTTP_400_BAD_REQUEST)
+    sort = request.query_params.get('sort', 'percentage')
+    if sort not in LOW_ATTENDANCE_SORTS or (page is not None and (page < 1 or page_size < 1)):
+        return Response({'success': False, 'message': 'Invalid sort or page'}, status=status.HTTP_400_BAD_REQUEST)
     try:
         hod = request.user
         branch = Branch.objects.get(hod=hod)
-        students = Student.objects.filter(branch=branch).select_related('user')
+        in_branch = Q(attendance_summaries__subject__branch=branch)
+        students = Student.objects.filter(branch=branch).annotate(
+            present=Coalesce(Sum('attendance_summaries__present', filter=in_branch), 0),
+            total=Coalesce(Sum('attendance_summaries__total', filter=in_branch), 0)
+        ).annotate(
+            attendance_ratio=Coalesce(Cast('present', FloatField()) / NullIf('total', 0), Value(0.0)),
+            scaled_present=F('present') * 20000
+        )
+        if threshold > 0:
+            # Integer HAVING clause that agrees exactly with attendance_percentage below
+            students = students.filter(Q(total=0) | Q(scaled_present__lt=F('total') * low_attendance_cutoff(threshold)))
+        else:
+            students = students.none()
+        students = students.order_by(*LOW_ATTENDANCE_SORTS[sort]).only('user_id', 'name', 'usn')
+
+        pagination = None
+        if page is not None:
+            paginator = Paginator(students, page_size)
+            students = paginator.page(min(page, paginator.num_pages)).object_list
+            pagination = {'page': min(page, paginator.num_pages), 'page_size': page_size, 'total_pages': paginator.num_pages, 'count': paginator.count}
+        students = list(students)
+
+        breakdown = request.query_params.get('breakdown') == 'subject'
+        subjects_by_student = {}
+        if breakdown:
+            summaries = AttendanceSummary.objects.filter(
+                student__in=students, subject__branch=branch, total__gt=0
+            ).select_related('subject').order_by('subject__name')
+            for summary in summaries:
+                subjects_by_student.setdefault(summary.student_id, []).append({
+                    'subject_id': str(summary.subject_id),
+                    'subject': summary.subject.name,
+                    'attendance_percentage': attendance_percentage(summary.present, summary.total),
+                    'total_sessions': summary.total,
+                    'present_sessions': summary.present
+                })
+
         low_attendance = []
         for student in students:
-            details = student.attendance_details.filter(record__branch=branch)
-            total = details.count()
-            present = details.filter(status=True).count()
-            percentage = round((present / total) * 100, 2) if total > 0 else 0
-            if percentage < threshold:
-                low_attendance.append({
-                    'student_id': str(student.user.id),
-                    'name': student.name,
-                    'usn': student.usn,
-                    'attendance_percentage': percentage,
-                    'total_sessions': total,
-                    'present_sessions': present
-                })
+            entry = {
+                'student_id': str(student.user_id),
+                'name': student.name,
+                'usn': student.usn,
+                'attendance_percentage': attendance_percentage(student.present, student.total),
+                'total_sessions': student.total,
+                'present_sessions': student.present
+            }
+            if breakdown:
+                entry['subjects'] = subjects_by_student.get(student.id, [])
+            low_attendance.append(entry)
+        data = {'students': low_attendance}
+        if pagination:
+            data['pagination'] = pagination
         return Response({
             'success': True,
-            'data': {'students': low_attendance}
+            'data': data
         })
     except Branch.DoesNotExist:
         return Response({'success': False, 'message': 'Branch not assigned'}, status=status.HTTP_404_NOT_FOUND)
@@ -262,6 +304,7 @@ def manage_students(request):
             student = Student.objects.get(user__id=student_id, branch=branch)
             semester = Semester.objects.get(id=semester_id, branch=branch)
             section = Section.objects.get(id=section_id, branch=branch, semester=semester)
+            old_section_key = (student.branch_id, student.semester_id, student.section_id)
             if usn:
                 usn = usn.strip()
                 if usn != student.usn and User.objects.filter(username=usn).exists():
@@ -280,6 +323,9 @@ def manage_students(request):
             student.section = section
             student.user.save()
             student.save()
+            if old_section_key != (student.branch_id, student.semester_id, student.section_id):
+                invalidate_section_gallery(*old_section_key)
+                invalidate_section_gallery(student.branch_id, student.semester_id, student.section_id)
             create_notification(
                 recipient=student.user,
                 message=f"Your profile updated by HOD {hod.username}."
@@ -293,6 +339,7 @@ def manage_students(request):
                 return Response({'success': False, 'message': 'Student ID required'}, status=status.HTTP_400_BAD_REQUEST)
             student = Student.objects.get(user__id=student_id, branch=branch)
             student.user.delete()
+            invalidate_section_gallery(student.branch_id, student.semester_id, student.section_id)
             return Response({'success': True, 'data': {}})
         elif action == 'bulk_update':
             if not all([semester_id, section_id]):
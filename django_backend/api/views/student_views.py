@@ -11,7 +11,7 @@ from ..permissions import IsStudent
 from ..models import (
     User, Student, AttendanceRecord, AttendanceDetail, StudentLeaveRequest,
     FacultyAssignment, Branch, Timetable, InternalMark, Announcement, Semester,
-    Section, Notification, Certificate, Subject, ChatChannel, ChatMessage
+    Section, Notification, Certificate, Subject, ChatChannel, ChatMessage, AttendanceSummary
 )
 from rest_framework import status, views
 import logging
@@ -272,14 +272,10 @@ def dashboard_overview(request):
                 'room': t.room
             } for t in timetable
         ]
-        attendance = AttendanceDetail.objects.filter(student=student).aggregate(
-            avg=models.Avg('status')
-        )['avg'] or 0
-        below_75 = AttendanceDetail.objects.filter(
-            student=student
-        ).values('record__subject__name').annotate(
-            percentage=models.Avg('status') * 100
-        ).filter(percentage__lt=75)
+        summaries = list(AttendanceSummary.objects.filter(student=student, total__gt=0).only('present', 'total'))
+        total_sessions = sum(s.total for s in summaries)
+        attendance = sum(s.present for s in summaries) / total_sessions if total_sessions else 0
+        below_75_count = sum(1 for s in summaries if s.present * 100 < 75 * s.total)
         notifications = Notification.objects.filter(student=student, read=False).count()
         return Response({
             'success': True,
@@ -288,7 +284,7 @@ def dashboard_overview(request):
                 'next_class': classes[0] if classes else None,
                 'attendance_status': {
                     'average': round(attendance * 100, 2),
-                    'below_75_count': below_75.count()
+                    'below_75_count': below_75_count
                 },
                 'notifications': notifications
             }
@@ -335,21 +331,24 @@ def get_timetable(request):
 def get_student_attendance(request):
     try:
         student = Student.objects.get(user=request.user)
-        details = AttendanceDetail.objects.filter(student=student).select_related('record__subject')
+        summaries = AttendanceSummary.objects.filter(student=student, total__gt=0).select_related('subject')
         data = {}
-        for d in details:
-            subject = d.record.subject.name
-            if subject not in data:
-                data[subject] = {'records': [], 'present': 0, 'total': 0}
-            data[subject]['records'].append({
-                'date': d.record.date.strftime('%Y-%m-%d'),
-                'status': 'Present' if d.status else 'Absent'
-            })
-            data[subject]['total'] += 1
-            if d.status:
-                data[subject]['present'] += 1
+        subject_names = {}
+        for summary in summaries:
+            subject_names[summary.subject_id] = summary.subject.name
+            data[summary.subject.name] = {'records': [], 'present': summary.present, 'total': summary.total}
+        # Counts come from the summary; only the per-session list still reads the details
+        details = AttendanceDetail.objects.filter(student=student).values_list(
+            'record__subject_id', 'record__date', 'status'
+        ).order_by('record__date', 'record_id')
+        for subject_id, date, present in details:
+            if subject_id in subject_names:
+                data[subject_names[subject_id]]['records'].append({
+                    'date': date.strftime('%Y-%m-%d'),
+                    'status': 'Present' if present else 'Absent'
+                })
         for subject in data:
-            percentage = round((data[subject]['present'] / data[subject]['total']) * 100, 2) if data[subject]['total'] else 0
+            percentage = round((data[subject]['present'] / data[subject]['total']) * 100, 2)
             data[subject]['percentage'] = percentage
             if percentage < 75 and data[subject]['total'] >= 5:
                 Notification.objects.get_or_create(
@@ -763,40 +762,36 @@ def upload_face_encodings(request):
     
     try:
         student = Student.objects.get(user=request.user)
-        encodings = []
+        images = [file.read() for file in files]
         
-        for file in files:
-            img_bytes = file.read()
-            nparr = np.frombuffer(img_bytes, np.uint8)
-            img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-            
-            # Validate single face and quality using DLib
-            from .utils import face_detector, shape_predictor, face_recognizer
-            if not face_detector:
-                return Response({
-                    'success': False,
-                    'message': 'Face recognition system unavailable'
-                }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            
-            faces = face_detector(gray)
-            if len(faces) != 1:
+        # Validate single face and quality using DLib (in-process or via the face service)
+        from .utils import encode_faces_per_image
+        try:
+            image_encodings = encode_faces_per_image(images)
+        except ValueError as e:
+            logger.error("Face encoding unavailable: %s", str(e))
+            return Response({
+                'success': False,
+                'message': 'Face recognition system unavailable'
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        
+        encodings = []
+        for file, img_bytes, faces in zip(files, images, image_encodings):
+            if not faces or len(faces) != 1:
                 return Response({
                     'success': False,
                     'message': f'Image {file.name} must contain exactly one face'
                 }, status=status.HTTP_400_BAD_REQUEST)
             
             # Check lighting (basic brightness check)
+            gray = cv2.imdecode(np.frombuffer(img_bytes, np.uint8), cv2.IMREAD_GRAYSCALE)
             if np.mean(gray) < 50:
                 return Response({
                     'success': False,
                     'message': f'Image {file.name} is too dark'
                 }, status=status.HTTP_400_BAD_REQUEST)
             
-            # Extract encoding
-            shape = shape_predictor(img, faces[0])
-            encoding = np.array(face_recognizer.compute_face_descriptor(img, shape))
-            encodings.append(encoding)
+            encodings.append(faces[0])
         
         # Verify consistency across encodings
         from .utils import compute_face_distance
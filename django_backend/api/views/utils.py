@@ -1,10 +1,18 @@
 import os
 import cv2
+import json
+import bisect
 import dlib
+import threading
 import numpy as np
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import List, Dict, Tuple, Optional
+from typing import Callable, List, Dict, Iterable, Iterator, Tuple, Optional, Set
 from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils import timezone
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 from google.oauth2.service_account import Credentials
@@ -16,39 +24,161 @@ from django.core.exceptions import ValidationError
 # Set up logging
 logger = logging.getLogger(__name__)
 
-# Initialize face detection and recognition models
-try:
-    face_detector = dlib.get_frontal_face_detector()
-    shape_predictor = dlib.shape_predictor(os.path.join(settings.BASE_DIR, 'shape_predictor_68_face_landmarks.dat'))
-    face_recognizer = dlib.face_recognition_model_v1(os.path.join(settings.BASE_DIR, 'dlib_face_recognition_resnet_model_v1.dat'))
-    logger.info("Face recognition models loaded successfully")
-except Exception as e:
-    logger.error("Error loading face recognition models: %s", str(e))
-    face_detector = None
-    shape_predictor = None
-    face_recognizer = None
+# Face detection/recognition models and Google API clients are loaded lazily on first use
+# so processes that never touch them (most workers, manage.py, tests) skip the cost
+_face_models: Optional[Tuple] = None
+_face_models_lock = threading.Lock()
+_google_services: Optional[Tuple] = None
+_google_services_lock = threading.Lock()
 
 # Google Sheets API setup
 SCOPES = ['https://www.googleapis.com/auth/spreadsheets', 'https://www.googleapis.com/auth/drive']
 GOOGLE_CREDENTIALS_FILE = os.path.join(settings.BASE_DIR, 'credentials.json')
 
-try:
-    if not os.path.exists(GOOGLE_CREDENTIALS_FILE):
-        raise FileNotFoundError(f"Credentials file not found at {GOOGLE_CREDENTIALS_FILE}")
-    creds = Credentials.from_service_account_file(GOOGLE_CREDENTIALS_FILE, scopes=SCOPES)
-    sheets_service = build('sheets', 'v4', credentials=creds)
-    drive_service = build('drive', 'v3', credentials=creds)
-    logger.info("Google Sheets API initialized successfully")
-except Exception as e:
-    logger.error("Error setting up Google API with credentials.json: %s", str(e))
-    sheets_service = None
-    drive_service = None
+def get_face_models() -> Tuple:
+    """Return (face_detector, shape_predictor, face_recognizer), loading them on first call."""
+    global _face_models
+    if _face_models is None:
+        with _face_models_lock:
+            if _face_models is None:
+                try:
+                    face_detector = dlib.get_frontal_face_detector()
+                    shape_predictor = dlib.shape_predictor(os.path.join(settings.BASE_DIR, 'shape_predictor_68_face_landmarks.dat'))
+                    face_recognizer = dlib.face_recognition_model_v1(os.path.join(settings.BASE_DIR, 'dlib_face_recognition_resnet_model_v1.dat'))
+                    logger.info("Face recognition models loaded successfully")
+                except Exception as e:
+                    logger.error("Error loading face recognition models: %s", str(e))
+                    face_detector = shape_predictor = face_recognizer = None
+                _face_models = (face_detector, shape_predictor, face_recognizer)
+    return _face_models
+
+def get_google_services() -> Tuple:
+    """Return (sheets_service, drive_service), building the clients on first call."""
+    global _google_services
+    if _google_services is None:
+        with _google_services_lock:
+            if _google_services is None:
+                try:
+                    if getattr(settings, 'GOOGLE_SHEETS_FAKE', False):
+                        from ..fake_sheets import FakeSheetsService, FakeDriveService
+                        _google_services = (FakeSheetsService(), FakeDriveService())
+                        logger.info("Using in-memory fake Google Sheets service")
+                        return _google_services
+                    if not os.path.exists(GOOGLE_CREDENTIALS_FILE):
+                        raise FileNotFoundError(f"Credentials file not found at {GOOGLE_CREDENTIALS_FILE}")
+                    creds = Credentials.from_service_account_file(GOOGLE_CREDENTIALS_FILE, scopes=SCOPES)
+                    sheets_service = build('sheets', 'v4', credentials=creds)
+                    drive_service = build('drive', 'v3', credentials=creds)
+                    logger.info("Google Sheets API initialized successfully")
+                except Exception as e:
+                    logger.error("Error setting up Google API with credentials.json: %s", str(e))
+                    sheets_service = drive_service = None
+                _google_services = (sheets_service, drive_service)
+    return _google_services
+
+def warm_up_face_models() -> bool:
+    """Load the face models ahead of the first request; for workers serving AI attendance."""
+    face_detector, _, _ = get_face_models()
+    return face_detector is not None
 
 # Ensure student data directory exists
 if not os.path.exists(settings.STUDENT_DATA_PATH):
     os.makedirs(settings.STUDENT_DATA_PATH)
     logger.info("Created student data directory at %s", settings.STUDENT_DATA_PATH)
 
+# Bounded pool shared by all requests for decoding, detection and landmarking;
+# dlib and OpenCV release the GIL for most of this work
+_face_executor: Optional[ThreadPoolExecutor] = None
+_face_executor_lock = threading.Lock()
+# The recognition network keeps internal buffers, so descriptor batches run one at a time
+_face_recognizer_lock = threading.Lock()
+
+def _get_face_executor() -> ThreadPoolExecutor:
+    """Return the shared face-processing thread pool, creating it on first use."""
+    global _face_executor
+    with _face_executor_lock:
+        if _face_executor is None:
+            _face_executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'FACE_RECOGNITION_WORKERS', 4),
+                thread_name_prefix='face-recognition'
+            )
+        return _face_executor
+
+def detect_faces(gray: np.ndarray) -> List:
+    """Detect faces, on a downscaled copy if FACE_DETECTION_MAX_DIMENSION is set, and return full-resolution boxes."""
+    max_dimension = getattr(settings, 'FACE_DETECTION_MAX_DIMENSION', 0)
+    upsample = getattr(settings, 'FACE_DETECTION_UPSAMPLE', 0)
+    height, width = gray.shape[:2]
+    scale = 1.0
+    if max_dimension and max(height, width) > max_dimension:
+        scale = max_dimension / max(height, width)
+        gray = cv2.resize(gray, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_AREA)
+    face_detector, _, _ = get_face_models()
+    faces = face_detector(gray, upsample)
+    if scale == 1.0:
+        return list(faces)
+    logger.debug("Detected %d faces on %dx%d copy of %dx%d image", len(faces), gray.shape[1], gray.shape[0], width, height)
+    return [
+        dlib.rectangle(int(face.left() / scale), int(face.top() / scale), int(face.right() / scale), int(face.bottom() / scale))
+        for face in faces
+    ]
+
+def detect_face_landmarks(image_bytes: bytes) -> Tuple[np.ndarray, List]:
+    """Decode an image and return it with the landmarks of every detected face."""
+    img = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError("Could not decode image")
+    faces = detect_faces(cv2.cvtColor(img, cv2.COLOR_BGR2GRAY))
+    _, shape_predictor, _ = get_face_models()
+    return img, [shape_predictor(img, face) for face in faces]
+
+def _encode_faces_locally(images: List[bytes]) -> List[Optional[List[np.ndarray]]]:
+    """Encode every face in each image with the in-process models; None marks an unreadable image."""
+    face_detector, _, face_recognizer = get_face_models()
+    if not face_detector:
+        raise ValueError("Face recognition models not initialized")
+    executor = _get_face_executor()
+    futures = [executor.submit(detect_face_landmarks, image) for image in images]
+    results: List[Optional[List[np.ndarray]]] = [None] * len(images)
+    batch_indices = []
+    batch_images = []
+    batch_shapes = []
+    for index, future in enumerate(futures):
+        try:
+            img, shapes = future.result()
+        except Exception as e:
+            logger.warning("AI face recognition failed for image %d: %s", index, str(e))
+            continue
+        results[index] = []
+        if not shapes:
+            continue
+        detections = dlib.full_object_detections()
+        for shape in shapes:
+            detections.append(shape)
+        batch_indices.append(index)
+        batch_images.append(img)
+        batch_shapes.append(detections)
+    if batch_images:
+        # One batched forward pass over every face in every image
+        with _face_recognizer_lock:
+            descriptors = face_recognizer.compute_face_descriptor(batch_images, batch_shapes)
+        for index, image_descriptors in zip(batch_indices, descriptors):
+            results[index] = [np.array(descriptor) for descriptor in image_descriptors]
+    return results
+
+def encode_faces_per_image(images: List[bytes]) -> List[Optional[List[np.ndarray]]]:
+    """Return the encodings of every face in each image, using the face service when configured."""
+    if getattr(settings, 'FACE_SERVICE_SOCKET', ''):
+        from ..face_service import request_face_encodings
+        return request_face_encodings(images)
+    return _encode_faces_locally(images)
+
+def extract_face_encodings(images: List[bytes]) -> List[np.ndarray]:
+    """Detect and encode all faces across several images."""
+    encodings = [encoding for image_encodings in encode_faces_per_image(images) if image_encodings for encoding in image_encodings]
+    logger.info("Extracted %d face encodings from %d images", len(encodings), len(images))
+    return encodings
+
 def compute_face_distance(encoding1: np.ndarray, encoding2: np.ndarray) -> float:
     """Compute Euclidean distance between two face encodings."""
     return np.linalg.norm(encoding1 - encoding2)
@@ -67,27 +197,188 @@ def is_same_person(known_encodings: List[np.ndarray], test_encoding: np.ndarray,
     logger.debug("Face comparison: min_distance=%.2f, close_matches=%d, threshold=%.2f", min_distance, close_matches, threshold)
     return (min_distance < threshold and close_matches >= 2) if len(distances) > 1 else min_distance < threshold
 
-def get_google_sheet_id(branch_name: str, subject_name: str, section_name: str, semester_number: int) -> Optional[str]:
-    """Retrieve or create a Google Sheet ID for attendance tracking."""
-    sheet_id_file = os.path.join(settings.STUDENT_DATA_PATH, f'{branch_name}_{subject_name}_{section_name}_{semester_number}_sheet_id.txt')
-    if os.path.exists(sheet_id_file):
-        with open(sheet_id_file, 'r') as file:
-            sheet_id = file.read().strip()
+class FaceGallery:
+    """Section-level gallery of enrolled face encodings for batched matching.
+
+    All encodings are stacked into one contiguous float32 matrix with an
+    owner-index array mapping each row back to its student, so every face
+    detected in a photo is matched in a single distance computation.
+    """
+
+    def __init__(self, student_ids: List[int], encodings: np.ndarray, owners: np.ndarray):
+        self.student_ids = student_ids
+        self.encodings = np.ascontiguousarray(encodings, dtype=np.float32)
+        self.owners = np.ascontiguousarray(owners, dtype=np.intp)
+        self.sq_norms = np.einsum('ij,ij->i', self.encodings, self.encodings)
+        counts = np.bincount(self.owners, minlength=len(student_ids))
+        self.offsets = np.concatenate(([0], np.cumsum(counts)[:-1])).astype(np.intp)
+        # Same rule as is_same_person: at least two close matches, or one if only one is enrolled
+        self.required_matches = np.minimum(counts, 2)
+
+    @classmethod
+    def from_students(cls, students) -> 'FaceGallery':
+        """Build a gallery from students, skipping those without encodings."""
+        student_ids = []
+        blocks = []
+        owners = []
+        for student in students:
+            encodings = student.get_face_encoding_matrix()
+            if not len(encodings):
+                continue
+            owners.extend([len(student_ids)] * len(encodings))
+            student_ids.append(student.id)
+            blocks.append(encodings)
+        if not blocks:
+            return cls([], np.empty((0, 128), dtype=np.float32), np.empty(0, dtype=np.intp))
+        logger.debug("Built face gallery with %d encodings for %d students", len(owners), len(student_ids))
+        return cls(student_ids, np.vstack(blocks), np.asarray(owners, dtype=np.intp))
+
+    def __len__(self) -> int:
+        return len(self.student_ids)
+
+    def match(self, face_encodings: List[np.ndarray], threshold: float = 0.4) -> Set[int]:
+        """Return IDs of students matched by any of the detected face encodings."""
+        if not face_encodings or not self.student_ids:
+            return set()
+        faces = np.asarray(face_encodings, dtype=np.float32).reshape(-1, 128)
+        # Squared Euclidean distances for all faces x all enrolled encodings at once
+        sq_dists = np.einsum('ij,ij->i', faces, faces)[:, None] + self.sq_norms[None, :] - 2.0 * (faces @ self.encodings.T)
+        close = (sq_dists < threshold * threshold).astype(np.int32)
+        close_per_student = np.add.reduceat(close, self.offsets, axis=1)
+        matched = (close_per_student >= self.required_matches[None, :]).any(axis=0)
+        logger.debug("Matched %d faces against gallery: %d students present", len(faces), int(matched.sum()))
+        return {self.student_ids[i] for i in np.flatnonzero(matched)}
+
+# Process-wide LRU cache of section galleries keyed by (branch_id, semester_id, section_id)
+_gallery_cache: 'OrderedDict[Tuple[int, int, int], Tuple[Tuple, FaceGallery]]' = OrderedDict()
+_gallery_cache_lock = threading.Lock()
+
+def get_section_gallery(branch_id: int, semester_id: int, section_id: int) -> FaceGallery:
+    """Return the cached face gallery for a section, rebuilding it only when stale."""
+    from ..models import Student
+    key = (branch_id, semester_id, section_id)
+    students = Student.objects.filter(branch_id=branch_id, semester_id=semester_id, section_id=section_id)
+    # Cheap version stamp so edits made by other worker processes are also picked up
+    stamp = students.aggregate(count=Count('id'), last_modified=Max('last_modified'))
+    version = (stamp['count'], stamp['last_modified'])
+    with _gallery_cache_lock:
+        cached = _gallery_cache.get(key)
+        if cached and cached[0] == version:
+            _gallery_cache.move_to_end(key)
+            logger.debug("Face gallery cache hit for section %s", key)
+            return cached[1]
+    gallery = FaceGallery.from_students(students.only('id', 'face_encodings'))
+    with _gallery_cache_lock:
+        _gallery_cache[key] = (version, gallery)
+        _gallery_cache.move_to_end(key)
+        while len(_gallery_cache) > getattr(settings, 'FACE_GALLERY_CACHE_SIZE', 32):
+            _gallery_cache.popitem(last=False)
+    logger.info("Face gallery cache miss for section %s; built %d student entries", key, len(gallery))
+    return gallery
+
+def invalidate_section_gallery(branch_id: int, semester_id: int, section_id: int) -> None:
+    """Drop the cached face gallery for a section."""
+    with _gallery_cache_lock:
+        if _gallery_cache.pop((branch_id, semester_id, section_id), None) is not None:
+            logger.debug("Invalidated face gallery for section %s", (branch_id, semester_id, section_id))
+
+# In-process cache of sheet_key -> (sheet_id, verified_at), backed by the AttendanceSheet table
+_sheet_id_cache: Dict[str, Tuple[str, Optional[datetime]]] = {}
+_sheet_id_cache_lock = threading.Lock()
+
+def _sheet_key(branch_name: str, subject_name: str, section_name: str, semester_number: int) -> str:
+    return f'{branch_name}_{subject_name}_{section_name}_{semester_number}'
+
+def _sheet_is_fresh(verified_at: Optional[datetime]) -> bool:
+    ttl = getattr(settings, 'GOOGLE_SHEET_VERIFY_TTL', 86400)
+    return verified_at is not None and (timezone.now() - verified_at).total_seconds() < ttl
+
+def _remember_sheet_id(sheet_key: str, sheet_id: str, verified_at: Optional[datetime], tab_ids: Optional[Dict[str, int]] = None) -> None:
+    from ..models import AttendanceSheet
+    defaults = {'sheet_id': sheet_id, 'verified_at': verified_at}
+    if tab_ids:
+        defaults['tab_ids'] = tab_ids
+        _sheet_tab_ids[sheet_id] = tab_ids
+    AttendanceSheet.objects.update_or_create(sheet_key=sheet_key, defaults=defaults)
+    with _sheet_id_cache_lock:
+        _sheet_id_cache[sheet_key] = (sheet_id, verified_at)
+
+def get_google_sheet_id(branch_name: str, subject_name: str, section_name: str, semester_number: int, force_verify: bool = False) -> Optional[str]:
+    """Retrieve or create a Google Sheet ID for attendance tracking.
+
+    Known IDs are trusted until GOOGLE_SHEET_VERIFY_TTL expires; pass
+    force_verify=True after a write fails with 404. The registry row is
+    re-read before verifying, since another process may have replaced the sheet.
+    """
+    from ..models import AttendanceSheet
+    sheet_key = _sheet_key(branch_name, subject_name, section_name, semester_number)
+    with _sheet_id_cache_lock:
+        cached = _sheet_id_cache.get(sheet_key)
+    if cached is not None and not force_verify and _sheet_is_fresh(cached[1]):
+        return cached[0]
+
+    previous_id = cached[0] if cached else None
+    row = AttendanceSheet.objects.filter(sheet_key=sheet_key).values_list('sheet_id', 'verified_at').first()
+    if row is None and cached is None:
+        # Fall back to a sheet ID file written before the registry existed
+        sheet_id_file = os.path.join(settings.STUDENT_DATA_PATH, f'{sheet_key}_sheet_id.txt')
+        if os.path.exists(sheet_id_file):
+            with open(sheet_id_file, 'r') as file:
+                row = (file.read().strip(), None)
+    if row is not None:
+        cached = row
+        with _sheet_id_cache_lock:
+            _sheet_id_cache[sheet_key] = cached
+    if cached is not None and _sheet_is_fresh(cached[1]) and (not force_verify or previous_id not in (None, cached[0])):
+        # Still fresh in the registry, or freshly replaced by another process since we cached it
+        return cached[0]
+
+    sheets_service, _ = get_google_services()
+    if sheets_service is None:
+        logger.error("Cannot resolve sheet: Google Sheets service not initialized")
+        return None
+    if cached is not None:
+        sheet_id = cached[0]
         try:
-            sheets_service.spreadsheets().get(spreadsheetId=sheet_id).execute()
-            logger.info("Verified existing sheet ID: %s for %s_%s_%s_%s", sheet_id, branch_name, subject_name, section_name, semester_number)
+            spreadsheet = sheets_service.spreadsheets().get(spreadsheetId=sheet_id, fields='sheets.properties(sheetId,title)').execute()
+            _remember_sheet_id(sheet_key, sheet_id, timezone.now(), _tab_ids_from(spreadsheet))
+            logger.info("Verified existing sheet ID: %s for %s", sheet_id, sheet_key)
             return sheet_id
         except HttpError as e:
             if e.resp.status == 404:
-                logger.warning("Sheet with ID %s not found; creating a new sheet for %s_%s_%s_%s", sheet_id, branch_name, subject_name, section_name, semester_number)
-                return create_google_sheet(branch_name, subject_name, section_name, semester_number)
-            logger.error("Error verifying sheet %s for %s_%s_%s_%s: %s", sheet_id, branch_name, subject_name, section_name, semester_number, str(e))
+                logger.warning("Sheet with ID %s not found; creating a new sheet for %s", sheet_id, sheet_key)
+                return _create_google_sheet_once(branch_name, subject_name, section_name, semester_number, sheet_id)
+            logger.error("Error verifying sheet %s for %s: %s", sheet_id, sheet_key, str(e))
             return None
-    logger.info("No sheet ID file found; creating a new sheet for %s_%s_%s_%s", branch_name, subject_name, section_name, semester_number)
-    return create_google_sheet(branch_name, subject_name, section_name, semester_number)
+    logger.info("No sheet registered; creating a new sheet for %s", sheet_key)
+    return _create_google_sheet_once(branch_name, subject_name, section_name, semester_number)
+
+def _create_google_sheet_once(branch_name: str, subject_name: str, section_name: str, semester_number: int, missing_id: Optional[str] = None) -> Optional[str]:
+    """Create the sheet for a key (in place of ``missing_id``, if given) at most once across processes.
+
+    The registry row is created first if needed, so there is always a row to lock, and stays
+    locked through the Sheets and Drive calls; concurrent callers wait and then return the new
+    sheet. This ties the lock to Google's latency, but only on first use or after a 404.
+    """
+    from ..models import AttendanceSheet
+    sheet_key = _sheet_key(branch_name, subject_name, section_name, semester_number)
+    with transaction.atomic():
+        AttendanceSheet.objects.get_or_create(sheet_key=sheet_key, defaults={'sheet_id': missing_id or ''})
+        current = AttendanceSheet.objects.select_for_update().filter(sheet_key=sheet_key).values_list('sheet_id', 'verified_at').get()
+        if current[0] not in ('', missing_id):
+            logger.info("Sheet for %s was already created as %s", sheet_key, current[0])
+            with _sheet_id_cache_lock:
+                _sheet_id_cache[sheet_key] = current
+            return current[0]
+        sheet_id = create_google_sheet(branch_name, subject_name, section_name, semester_number)
+        if sheet_id is None:
+            # Leave no placeholder row behind for the next caller to trip over
+            transaction.set_rollback(True)
+        return sheet_id
 
 def create_google_sheet(branch_name: str, subject_name: str, section_name: str, semester_number: int) -> Optional[str]:
     """Create a new Google Sheet for attendance and return its ID."""
+    sheets_service, drive_service = get_google_services()
     if sheets_service is None or drive_service is None:
         logger.error("Google Sheets service not initialized due to credentials error")
         return None
@@ -101,8 +392,7 @@ def create_google_sheet(branch_name: str, subject_name: str, section_name: str,
         }
         sheet = sheets_service.spreadsheets().create(body=spreadsheet).execute()
         sheet_id = sheet['spreadsheetId']
-        with open(os.path.join(settings.STUDENT_DATA_PATH, f'{branch_name}_{subject_name}_{section_name}_{semester_number}_sheet_id.txt'), 'w') as file:
-            file.write(sheet_id)
+        _remember_sheet_id(_sheet_key(branch_name, subject_name, section_name, semester_number), sheet_id, timezone.now(), _tab_ids_from(sheet))
         drive_service.permissions().create(fileId=sheet_id, body={'type': 'anyone', 'role': 'writer'}).execute()
         logger.info("Created new sheet with ID: %s for %s_%s_%s_%s", sheet_id, branch_name, subject_name, section_name, semester_number)
         return sheet_id
@@ -110,88 +400,294 @@ def create_google_sheet(branch_name: str, subject_name: str, section_name: str,
         logger.error("Error creating or sharing sheet for %s_%s_%s_%s: %s", branch_name, semester_number, subject_name, section_name, str(err))
         return None
 
+def attendance_sheet_rows(present_students: List[Tuple[str, str]], absent_students: List[Tuple[str, str]], timestamp: str) -> Dict[str, List[List[str]]]:
+    """Build the rows one session adds to the 'Present' and 'Absent' tabs."""
+    return {
+        'Present': [[timestamp] + [f"{name} ({usn})" for name, usn in present_students]],
+        'Absent': [[timestamp] + [f"{name} ({usn})" for name, usn in absent_students]]
+    }
+
+# In-process cache of spreadsheet ID -> {tab title: numeric sheetId}, needed by appendCells
+_sheet_tab_ids: Dict[str, Dict[str, int]] = {}
+
+def _tab_ids_from(spreadsheet: Dict) -> Dict[str, int]:
+    return {sheet['properties']['title']: sheet['properties']['sheetId'] for sheet in spreadsheet.get('sheets', [])}
+
+def get_sheet_tab_ids(sheet_id: str, sheets_service=None) -> Dict[str, int]:
+    """Return the numeric tab IDs of a sheet, fetching them once and storing them in the registry."""
+    from ..models import AttendanceSheet
+    tab_ids = _sheet_tab_ids.get(sheet_id)
+    if tab_ids:
+        return tab_ids
+    tab_ids = AttendanceSheet.objects.filter(sheet_id=sheet_id).values_list('tab_ids', flat=True).first()
+    if not tab_ids:
+        if sheets_service is None:
+            sheets_service, _ = get_google_services()
+        spreadsheet = sheets_service.spreadsheets().get(spreadsheetId=sheet_id, fields='sheets.properties(sheetId,title)').execute()
+        tab_ids = _tab_ids_from(spreadsheet)
+        AttendanceSheet.objects.filter(sheet_id=sheet_id).update(tab_ids=tab_ids)
+    _sheet_tab_ids[sheet_id] = tab_ids
+    return tab_ids
+
+def append_sheet_rows(sheet_id: str, rows_by_tab: Dict[str, List[List[str]]], sheets_service=None) -> None:
+    """Append rows to any number of tabs of a sheet in a single batchUpdate request."""
+    if sheets_service is None:
+        sheets_service, _ = get_google_services()
+    if sheets_service is None:
+        raise ValueError("Google Sheets service not initialized")
+    tab_ids = get_sheet_tab_ids(sheet_id, sheets_service)
+    requests = [
+        {'appendCells': {
+            'sheetId': tab_ids[tab],
+            'rows': [{'values': [{'userEnteredValue': {'stringValue': str(value)}} for value in row]} for row in rows],
+            'fields': 'userEnteredValue'
+        }}
+        for tab, rows in rows_by_tab.items() if rows
+    ]
+    if requests:
+        sheets_service.spreadsheets().batchUpdate(spreadsheetId=sheet_id, body={'requests': requests}).execute()
+
 def update_attendance_in_sheet(sheet_id: str, present_students: List[Tuple[str, str]], absent_students: List[Tuple[str, str]], timestamp: str) -> None:
     """Update the Google Sheet with present and absent students."""
+    sheets_service, _ = get_google_services()
     if sheets_service is None:
         logger.error("Cannot update sheet: Google Sheets service not initialized")
         return
-    range_present = 'Present!A1'
-    range_absent = 'Absent!A1'
-    values_present = [[timestamp] + [f"{name} ({usn})" for name, usn in present_students]]
-    values_absent = [[timestamp] + [f"{name} ({usn})" for name, usn in absent_students]]
     try:
-        sheets_service.spreadsheets().values().append(
-            spreadsheetId=sheet_id, range=range_present, valueInputOption='RAW', body={'values': values_present}
-        ).execute()
-        sheets_service.spreadsheets().values().append(
-            spreadsheetId=sheet_id, range=range_absent, valueInputOption='RAW', body={'values': values_absent}
-        ).execute()
+        append_sheet_rows(sheet_id, attendance_sheet_rows(present_students, absent_students, timestamp), sheets_service)
         logger.info("Updated Google Sheet %s with attendance data", sheet_id)
     except HttpError as e:
         logger.error("Error updating Google Sheet %s: %s", sheet_id, str(e))
         raise
 
+def _parse_session_line(line: str, state: Dict) -> Optional[Dict]:
+    """Feed one stripped log line into the parser state; returns a session when one is completed."""
+    completed = None
+    if line.startswith("--- Attendance Session:"):
+        if state['date'] and (state['present'] or state['absent']):
+            completed = {"date": state['date'], "present": state['present'], "absent": state['absent'], "faculty": state['faculty']}
+        timestamp = line.split(": ")[1].strip().split(" ")[0]
+        state.update(date=datetime.strptime(timestamp, "%Y-%m-%d"), present=[], absent=[], faculty=None)
+    elif line.startswith("Faculty:"):
+        state['faculty'] = line.split(":")[1].strip()
+    elif line.startswith("Present Students:"):
+        state['present'] = [student.strip() for student in line.split(":")[1].split(",") if student.strip()]
+    elif line.startswith("Absent Students:"):
+        state['absent'] = [student.strip() for student in line.split(":")[1].split(",") if student.strip()]
+    return completed
+
+def _iter_sessions_with_offsets(file_path: str, offset: int = 0) -> Iterator[Tuple[int, Dict]]:
+    """Yield (header byte offset, session) pairs from offset onwards."""
+    state = {'date': None, 'present': [], 'absent': [], 'faculty': None}
+    header_offset = offset
+    with open(file_path, "rb") as file:
+        file.seek(offset)
+        for raw_line in file:
+            line = raw_line.decode("utf-8").strip()
+            session = _parse_session_line(line, state)
+            if session:
+                yield header_offset, session
+            if line.startswith("--- Attendance Session:"):
+                header_offset = offset
+            offset += len(raw_line)
+    if state['date'] and (state['present'] or state['absent']):
+        yield header_offset, {"date": state['date'], "present": state['present'], "absent": state['absent'], "faculty": state['faculty']}
+
+def iter_attendance_sessions(file_path: str, start_date: Optional[datetime] = None, end_date: Optional[datetime] = None) -> Iterator[Dict]:
+    """Yield sessions from an attendance log one at a time, optionally limited to a date range.
+
+    Given a start_date, the byte-offset index is used to seek straight to
+    the first session on or after it.
+    """
+    offset = 0
+    if start_date:
+        offset = _index_seek_offset(load_attendance_index(file_path), start_date)
+    for _, session in _iter_sessions_with_offsets(file_path, offset):
+        if _in_date_range(session['date'], start_date, end_date):
+            yield session
+
+def _in_date_range(session_date: datetime, start_date: Optional[datetime], end_date: Optional[datetime]) -> bool:
+    return (start_date is None or session_date >= start_date) and (end_date is None or session_date <= end_date)
+
+def _index_seek_offset(index: Dict, start_date: datetime) -> int:
+    """Byte offset of the first session header on or after start_date; 0 if the log is not in date order."""
+    entries = index['entries']
+    if not index['sorted']:
+        return 0
+    target = start_date.strftime("%Y-%m-%d")
+    position = bisect.bisect_left([entry[0] for entry in entries], target)
+    return entries[position][1] if position < len(entries) else index['size']
+
+def _read_sidecar(path: str) -> Optional[Dict]:
+    """Load a JSON sidecar; a missing or corrupt file reads as None so it gets rebuilt."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning("Ignoring unreadable sidecar %s: %s", path, str(e))
+        return None
+    return data if isinstance(data, dict) else None
+
+def _write_sidecar(path: str, data: Dict) -> None:
+    """Write a JSON sidecar atomically so readers never see a partial file."""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+def load_attendance_index(file_path: str) -> Dict:
+    """Return the (date, byte offset) index of session headers, extending the .idx sidecar as the log grows."""
+    index_path = f"{file_path}.idx"
+    size = os.path.getsize(file_path)
+    index = _read_sidecar(index_path)
+    if index is not None:
+        if index.get('size') == size:
+            return index
+        if index.get('size', 0) > size:
+            index = None  # Log was truncated or replaced; rebuild
+    if index is None:
+        index = {'size': 0, 'sorted': True, 'entries': []}
+    entries = index['entries']
+    with open(file_path, "rb") as file:
+        file.seek(index['size'])
+        offset = index['size']
+        for raw_line in file:
+            if raw_line.startswith(b"--- Attendance Session:"):
+                session_date = raw_line.decode("utf-8").split(": ")[1].strip().split(" ")[0]
+                if entries and session_date < entries[-1][0]:
+                    index['sorted'] = False
+                entries.append([session_date, offset])
+            offset += len(raw_line)
+    index['size'] = offset
+    _write_sidecar(index_path, index)
+    logger.info("Indexed %d attendance sessions in %s", len(entries), file_path)
+    return index
+
 def parse_attendance(file_path: str) -> List[Dict]:
     """Parse attendance data from a text file."""
     try:
-        attendance_records = []
-        with open(file_path, "r", encoding="utf-8") as file:
-            lines = file.readlines()
-            session_date = None
-            present = []
-            absent = []
-            faculty = None
-            for line in lines:
-                line = line.strip()
-                if line.startswith("--- Attendance Session:"):
-                    if session_date and (present or absent):
-                        attendance_records.append({"date": session_date, "present": present, "absent": absent, "faculty": faculty})
-                    timestamp = line.split(": ")[1].strip().split(" ")[0]
-                    session_date = datetime.strptime(timestamp, "%Y-%m-%d")
-                    present = []
-                    absent = []
-                    faculty = None
-                elif line.startswith("Faculty:"):
-                    faculty = line.split(":")[1].strip()
-                elif line.startswith("Present Students:"):
-                    present = [student.strip() for student in line.split(":")[1].split(",") if student.strip()]
-                elif line.startswith("Absent Students:"):
-                    absent = [student.strip() for student in line.split(":")[1].split(",") if student.strip()]
-            if session_date and (present or absent):
-                attendance_records.append({"date": session_date, "present": present, "absent": absent, "faculty": faculty})
+        attendance_records = list(iter_attendance_sessions(file_path))
         logger.info("Parsed %d attendance records from %s", len(attendance_records), file_path)
         return attendance_records
     except Exception as e:
         logger.error("Error parsing attendance file %s: %s", file_path, str(e))
         return []
 
-def calculate_statistics(attendance_records: List[Dict]) -> Dict[str, Tuple[int, float]]:
-    """Calculate attendance statistics from parsed records."""
-    total_sessions = len(attendance_records)
-    if total_sessions == 0:
+class AttendanceStatsAccumulator:
+    """Per-student present counters that sessions are folded into one at a time.
+
+    Key order matches the historical calculate_statistics output: first
+    session's present students, then every absent student, then students
+    first present in later sessions.
+    """
+
+    def __init__(self, total_sessions: int = 0, present_counts: Optional[Dict[str, int]] = None,
+                 first_present: Optional[List[str]] = None, absent_seen: Optional[List[str]] = None,
+                 later_present: Optional[List[str]] = None):
+        self.total_sessions = total_sessions
+        self.present_counts = dict(present_counts or {})
+        self.first_present = dict.fromkeys(first_present or [])
+        self.absent_seen = dict.fromkeys(absent_seen or [])
+        self.later_present = dict.fromkeys(later_present or [])
+
+    def add_session(self, session: Dict) -> None:
+        self.total_sessions += 1
+        for student in session["present"]:
+            self.present_counts[student] = self.present_counts.get(student, 0) + 1
+            (self.first_present if self.total_sessions == 1 else self.later_present).setdefault(student, None)
+        for student in session["absent"]:
+            self.absent_seen.setdefault(student, None)
+
+    def statistics(self) -> Dict[str, Tuple[int, float]]:
+        ordered = list(self.first_present)
+        ordered += [student for student in self.absent_seen if student not in self.first_present]
+        ordered += [student for student in self.later_present if student not in self.first_present and student not in self.absent_seen]
+        return {student: (self.present_counts.get(student, 0), (self.present_counts.get(student, 0) / self.total_sessions) * 100) for student in ordered}
+
+    def copy(self) -> 'AttendanceStatsAccumulator':
+        return AttendanceStatsAccumulator.from_dict(self.to_dict())
+
+    def to_dict(self) -> Dict:
+        return {
+            'total_sessions': self.total_sessions,
+            'present_counts': self.present_counts,
+            'first_present': list(self.first_present),
+            'absent_seen': list(self.absent_seen),
+            'later_present': list(self.later_present)
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'AttendanceStatsAccumulator':
+        return cls(**data)
+
+def calculate_statistics(attendance_records: Iterable[Dict]) -> Dict[str, Tuple[int, float]]:
+    """Calculate attendance statistics from parsed records in one pass; accepts a list or a session generator."""
+    accumulator = AttendanceStatsAccumulator()
+    for session in attendance_records:
+        accumulator.add_session(session)
+    if accumulator.total_sessions == 0:
         logger.warning("No attendance records provided for statistics calculation")
         return {}
-    attendance: Dict[str, int] = {}
-    for session in attendance_records:
-        for student in session["present"]:
-            attendance[student] = attendance.get(student, 0) + 1
-        for session in attendance_records:
-            for student in session["absent"]:
-                attendance.setdefault(student, 0)
-    stats = {student: (count, (count / total_sessions) * 100) for student, count in attendance.items()}
-    logger.info("Calculated attendance statistics for %d students over %d sessions", len(stats), total_sessions)
+    stats = accumulator.statistics()
+    logger.info("Calculated attendance statistics for %d students over %d sessions", len(stats), accumulator.total_sessions)
     return stats
 
-def generate_pdf(stats: Dict[str, Tuple[int, float]], output_file: str, record) -> None:
+def _update_attendance_accumulator(file_path: str) -> AttendanceStatsAccumulator:
+    """Bring the <log>.stats sidecar up to date and return counters including the open last session."""
+    stats_path = f"{file_path}.stats"
+    size = os.path.getsize(file_path)
+    state = _read_sidecar(stats_path)
+    if state is not None and state.get('size', 0) > size:
+        state = None  # Log was truncated or replaced; recount
+    if state is None:
+        state = {'size': 0, 'offset': 0, 'counters': AttendanceStatsAccumulator().to_dict()}
+    accumulator = AttendanceStatsAccumulator.from_dict(state['counters'])
+    committed_offset = state['offset']
+    last_session = None
+    for header_offset, session in _iter_sessions_with_offsets(file_path, state['offset']):
+        # A session is only final once the next one starts
+        if last_session is not None:
+            accumulator.add_session(last_session)
+            committed_offset = header_offset
+        last_session = session
+    if committed_offset != state['offset'] or state['size'] != size:
+        _write_sidecar(stats_path, {'size': size, 'offset': committed_offset, 'counters': accumulator.to_dict()})
+    result = accumulator.copy()
+    if last_session is not None:
+        result.add_session(last_session)
+    return result
+
+def attendance_log_path(file_path: str) -> str:
+    """Resolve an AttendanceRecord.file_path, stored relative to STUDENT_DATA_PATH, to a full path."""
+    return file_path if os.path.isabs(file_path) else os.path.join(settings.STUDENT_DATA_PATH, file_path)
+
+def count_attendance_sessions(file_path: str) -> int:
+    """Number of sessions in a log, served from the incremental counters rather than a full re-parse."""
+    try:
+        return _update_attendance_accumulator(attendance_log_path(file_path)).total_sessions
+    except Exception as e:
+        logger.error("Error parsing attendance file %s: %s", file_path, str(e))
+        return 0
+
+def generate_pdf(stats: Dict[str, Tuple[int, float]], output_file: str, record, total_sessions: Optional[int] = None) -> None:
     """Generate a PDF report with attendance statistics."""
+    if total_sessions is None:
+        total_sessions = count_attendance_sessions(record.file_path)
+    title = f"Attendance Statistics - {record.branch.name} Semester {record.semester.number} {record.subject.name} ({record.section.name})"
+    draw_statistics_pdf(title, total_sessions, stats, output_file)
+
+def draw_statistics_pdf(title: str, total_sessions: int, stats: Dict[str, Tuple[int, float]], output_file: str,
+                        progress: Optional[Callable[[int, int], None]] = None) -> None:
+    """Render statistics as a two-column PDF; progress(done, total) is called as rows are drawn."""
     try:
         c = canvas.Canvas(output_file, pagesize=letter)
         width, height = letter
         c.setFont("Helvetica-Bold", 16)
-        title = f"Attendance Statistics - {record.branch.name} Semester {record.semester.number} {record.subject.name} ({record.section.name})"
         c.drawString(100, height - 40, title)
         c.setFont("Helvetica", 12)
-        c.drawString(100, height - 60, f"Total Sessions: {len(parse_attendance(record.file_path))}")
+        c.drawString(100, height - 60, f"Total Sessions: {total_sessions}")
         c.drawString(100, height - 80, f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         c.setFont("Helvetica-Bold", 12)
         c.drawString(50, height - 120, "Above 75% Attendance")
@@ -199,6 +695,8 @@ def generate_pdf(stats: Dict[str, Tuple[int, float]], output_file: str, record)
         c.setFont("Helvetica", 10)
         above_75 = [(s, c, p) for s, (c, p) in stats.items() if p >= 75]
         below_75 = [(s, c, p) for s, (c, p) in stats.items() if p < 75]
+        total_rows = len(above_75) + len(below_75)
+        drawn = 0
         y_above = y_below = height - 140
         for student, count, percentage in sorted(above_75, key=lambda x: x[2], reverse=True):
             c.drawString(50, y_above, f"{student}: {count} ({percentage:.2f}%)")
@@ -207,6 +705,9 @@ def generate_pdf(stats: Dict[str, Tuple[int, float]], output_file: str, record)
                 c.showPage()
                 c.setFont("Helvetica", 10)
                 y_above = height - 50
+            drawn += 1
+            if progress and drawn % 200 == 0:
+                progress(drawn, total_rows)
         for student, count, percentage in sorted(below_75, key=lambda x: x[2], reverse=True):
             c.drawString(350, y_below, f"{student}: {count} ({percentage:.2f}%)")
             y_below -= 15
@@ -214,7 +715,12 @@ def generate_pdf(stats: Dict[str, Tuple[int, float]], output_file: str, record)
                 c.showPage()
                 c.setFont("Helvetica", 10)
                 y_below = height - 50
+            drawn += 1
+            if progress and drawn % 200 == 0:
+                progress(drawn, total_rows)
         c.save()
+        if progress:
+            progress(total_rows, total_rows)
         logger.info("Generated PDF report at %s", output_file)
     except Exception as e:
         logger.error("Error generating PDF at %s: %s", output_file, str(e))
@@ -142,6 +142,64 @@ CORS_ALLOW_HEADERS = ['Content-Type', 'Authorization']
 # Custom settings for attendance system
 STUDENT_DATA_PATH = os.path.join(BASE_DIR, 'student_data')
 GOOGLE_CREDENTIALS_FILE = os.path.join(BASE_DIR, 'credentials.json')
+FACE_GALLERY_CACHE_SIZE = config('FACE_GALLERY_CACHE_SIZE', default=32, cast=int)
+FACE_RECOGNITION_WORKERS = config('FACE_RECOGNITION_WORKERS', default=4, cast=int)
+# Longest side photos are shrunk to before HOG detection (0 = full resolution, the default). Shrinking a
+# 12 MP photo to 1600 px is ~2.5x faster but misses small back-row faces unless FACE_DETECTION_UPSAMPLE is raised.
+FACE_DETECTION_MAX_DIMENSION = config('FACE_DETECTION_MAX_DIMENSION', default=0, cast=int)
+FACE_DETECTION_UPSAMPLE = config('FACE_DETECTION_UPSAMPLE', default=0, cast=int)
+FACE_MODELS_WARMUP = config('FACE_MODELS_WARMUP', default=False, cast=bool)  # preload dlib models at startup
+ATTENDANCE_JOB_WORKER = config('ATTENDANCE_JOB_WORKER', default='thread')  # 'thread' (in-process) or 'command'
+ATTENDANCE_JOB_LEASE = config('ATTENDANCE_JOB_LEASE', default=900, cast=int)  # seconds before a 'running' job is presumed dead
+ATTENDANCE_JOB_MAX_ATTEMPTS = config('ATTENDANCE_JOB_MAX_ATTEMPTS', default=3, cast=int)
+ATTENDANCE_JOB_SWEEP_INTERVAL = config('ATTENDANCE_JOB_SWEEP_INTERVAL', default=60, cast=float)  # thread mode: seconds between sweeps
+FACE_SERVICE_SOCKET = config('FACE_SERVICE_SOCKET', default='')  # Unix socket of run_face_service; empty loads models per process
+FACE_SERVICE_BATCH_WINDOW_MS = config('FACE_SERVICE_BATCH_WINDOW_MS', default=20, cast=int)
+FACE_SERVICE_MAX_BATCH_IMAGES = config('FACE_SERVICE_MAX_BATCH_IMAGES', default=32, cast=int)
+FACE_SERVICE_TIMEOUT = config('FACE_SERVICE_TIMEOUT', default=120, cast=float)
+FACE_INDEX_ENABLED = config('FACE_INDEX_ENABLED', default=False, cast=bool)  # keep branch-wide ANN indexes current on enrollment
+FACE_INDEX_DIR = config('FACE_INDEX_DIR', default=os.path.join(BASE_DIR, 'face_index'))
+FACE_INDEX_NPROBE = config('FACE_INDEX_NPROBE', default=4, cast=int)
+ATTENDANCE_EXPORT_BACKEND = config('ATTENDANCE_EXPORT_BACKEND', default='auto')  # 'google', 'local', or 'auto' (google when credentials exist)
+ATTENDANCE_EXPORT_DIR = config('ATTENDANCE_EXPORT_DIR', default=os.path.join(BASE_DIR, 'attendance_exports'))
+ATTENDANCE_EXPORT_FORMAT = config('ATTENDANCE_EXPORT_FORMAT', default='csv')  # 'csv', 'xlsx' or 'parquet' (needs pyarrow)
+ATTENDANCE_EXPORT_BUFFER_ROWS = config('ATTENDANCE_EXPORT_BUFFER_ROWS', default=500, cast=int)
+REPORT_CACHE_DIR = os.path.join(MEDIA_ROOT, 'reports')
+REPORT_CACHE_MAX_AGE = config('REPORT_CACHE_MAX_AGE', default=7 * 24 * 3600, cast=int)  # seconds
+REPORT_WORKERS = config('REPORT_WORKERS', default=2, cast=int)  # report jobs rendered in parallel, one process each
+REPORT_JOB_WORKER = config('REPORT_JOB_WORKER', default='thread')  # 'thread' (in-process) or 'command' (process_report_jobs)
+REPORT_JOB_LEASE = config('REPORT_JOB_LEASE', default=1800, cast=int)  # seconds before a 'running' report is presumed dead
+REPORT_JOB_MAX_ATTEMPTS = config('REPORT_JOB_MAX_ATTEMPTS', default=2, cast=int)
+REPORT_JOB_SWEEP_INTERVAL = config('REPORT_JOB_SWEEP_INTERVAL', default=60, cast=float)  # thread mode: seconds between sweeps
+REPORT_CACHE_MAX_BYTES = config('REPORT_CACHE_MAX_BYTES', default=500 * 1024 * 1024, cast=int)
+REPORT_STALE_GRACE = config('REPORT_STALE_GRACE', default=600, cast=int)  # seconds a superseded report stays downloadable
+GOOGLE_SHEET_VERIFY_TTL = config('GOOGLE_SHEET_VERIFY_TTL', default=86400, cast=int)  # seconds a sheet ID is trusted without re-checking
+GOOGLE_SHEETS_FAKE = config('GOOGLE_SHEETS_FAKE', default=False, cast=bool)  # in-memory Sheets client for local development
+# 'thread' (in-process drainer) or 'command' (drain_sheet_outbox); follows ATTENDANCE_JOB_WORKER unless set
+SHEETS_OUTBOX_WORKER = config('SHEETS_OUTBOX_WORKER', default=ATTENDANCE_JOB_WORKER)
+SHEETS_OUTBOX_POLL_INTERVAL = config('SHEETS_OUTBOX_POLL_INTERVAL', default=30, cast=float)  # seconds between retry sweeps
+SHEETS_OUTBOX_BACKOFF_BASE = config('SHEETS_OUTBOX_BACKOFF_BASE', default=30, cast=int)
+SHEETS_OUTBOX_BACKOFF_MAX = config('SHEETS_OUTBOX_BACKOFF_MAX', default=3600, cast=int)
+SHEETS_OUTBOX_MAX_ATTEMPTS = config('SHEETS_OUTBOX_MAX_ATTEMPTS', default=8, cast=int)
+SHEETS_OUTBOX_LEASE = config('SHEETS_OUTBOX_LEASE', default=300, cast=int)  # reclaim writes stuck in 'sending' after this
+DASHBOARD_CACHE_BACKEND = config('DASHBOARD_CACHE_BACKEND', default='file')  # 'file' (shared by workers) or 'locmem' (per process)
+# Seconds; writes invalidate earlier via signals, but with locmem only in the process that handled the write
+DASHBOARD_CACHE_TTL = config('DASHBOARD_CACHE_TTL', default=300 if DASHBOARD_CACHE_BACKEND == 'file' else 60, cast=int)
+DASHBOARD_CACHE_DIR = config('DASHBOARD_CACHE_DIR', default=os.path.join(BASE_DIR, 'cache', 'dashboard'))
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'dashboard': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': DASHBOARD_CACHE_DIR,
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    } if DASHBOARD_CACHE_BACKEND == 'file' else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'dashboard',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+}
 os.makedirs(STUDENT_DATA_PATH, exist_ok=True)
 os.makedirs(MEDIA_ROOT, exist_ok=True)
 